@@ -3,11 +3,12 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from dotenv import load_dotenv
+from .utils.db_routing import RoutingSession
 
 # Load environment variables from .env
 load_dotenv()
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
 def create_app():
@@ -15,29 +16,87 @@ def create_app():
     
     # Basic Flask configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
+
+    # Client address and scheme from the trusted reverse proxies, so per-IP
+    # rate limits see the real client instead of the proxy
+    from .utils.config import Config
+    if Config.TRUSTED_PROXY_HOPS:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_HOPS, x_proto=Config.TRUSTED_PROXY_HOPS)
     
     # Use absolute path for database to avoid instance directory issues
     database_path = os.path.join(os.getcwd(), 'site.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Read replicas, selected per query by RoutingSession
+    from .utils.db_routing import replica_binds
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config['SQLALCHEMY_DATABASE_URI'])
+
     # Session configuration
     app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
     app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
     app.config['SESSION_COOKIE_HTTPONLY'] = True
 
+    # Template configuration: no per-render mtime checks in production
+    app.config['TEMPLATES_AUTO_RELOAD'] = os.getenv('FLASK_ENV') != 'production'
+
+    # Server-side session store (the cookie only carries the session id)
+    from .utils.sessions import init_sessions
+    init_sessions(app)
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
 
+    from .utils.db_routing import init_db_routing
+    init_db_routing(app, db)
+
+    # Batch request writes into shared SQLite transactions
+    from .utils.group_commit import init_group_commit
+    init_group_commit(app)
+
     # Initialize email service
     from .utils.emailer import init_mail
     init_mail(app)
 
+    # Fingerprinted static assets
+    from .utils.assets import init_assets
+    init_assets(app)
+
+    # Liveness and readiness probes
+    from .utils.health import init_health
+    init_health(app)
+
+    # Postal code directory for address autofill and validation
+    from .utils.postal import init_postal
+    init_postal(app)
+
     # Register blueprints
     from .routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    # Request profiling hooks (only installed when PROFILING_ENABLED)
+    from .utils.profiling import init_profiling
+    init_profiling(app)
+
+    # Worker RSS gauges, sampled allocation peaks and /debug/memory
+    from .utils.memory import init_memory
+    init_memory(app)
+
+    # Register CLI commands
+    from .cli import register_commands
+    register_commands(app)
+
+    # Relay order events from inside the web process when configured
+    if Config.OUTBOX_RELAY_IN_PROCESS:
+        from .utils.outbox import start_relay_thread
+        start_relay_thread(app)
+
+    # Precompile templates before the worker accepts traffic
+    from .utils.templates import init_templates
+    init_templates(app)
+
     # Database is managed by Alembic migrations, no need for db.create_all()
     print(f"✅ Flask app initialized with database at {app.config['SQLALCHEMY_DATABASE_URI']}")
 
@@ -0,0 +1,441 @@
+import csv
+import json
+import sys
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+
+from . import db
+from .models import User, Address, Order
+
+# Tables in foreign-key dependency order: users before addresses before orders
+MODELS = {
+    'users': User,
+    'addresses': Address,
+    'orders': Order,
+}
+
+# Internal bookkeeping columns: set on import instead of copied from the
+# file (exported orders are marked as counted, imported ones are not yet)
+IMPORT_OVERRIDES = {
+    'order': {'rolled_up': False},
+}
+
+data_cli = AppGroup('data', help='Bulk import and export of users, addresses and orders.')
+
+
+def _detect_format(path, fmt):
+    """Pick csv/ndjson from an explicit option or the file extension"""
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def _read_records(stream, fmt):
+    """Yield raw dict records from a CSV or NDJSON stream"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _parse_bool(value) -> bool:
+    """true/false/1/0 in any case (CSV exports write True/False)"""
+    text = str(value).strip().lower()
+    if text in ('true', '1'):
+        return True
+    if text in ('false', '0'):
+        return False
+    raise ValueError(f"Not a boolean value: {value!r}")
+
+
+def _coerce_value(column, value):
+    """Convert a raw CSV/NDJSON value to the python type of a column"""
+    if value is None or value == '':
+        return None
+    if isinstance(column.type, db.JSON):
+        return json.loads(value) if isinstance(value, str) else value
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if python_type is date:
+        return value if isinstance(value, date) else date.fromisoformat(value)
+    if python_type is bool:
+        return value if isinstance(value, bool) else _parse_bool(value)
+    if python_type is int:
+        return int(value)
+    return value
+
+
+def _coerce_record(table, record):
+    """
+    Map a raw record onto the table's columns.
+    Columns that are not in the current schema are ignored, and missing
+    columns fall back to their model defaults, so files exported before or
+    after a migration can still be loaded.
+    """
+    row = {}
+    overrides = IMPORT_OVERRIDES.get(table.name, {})
+    for column in table.columns:
+        if column.name in overrides:
+            row[column.name] = overrides[column.name]
+            continue
+        value = _coerce_value(column, record.get(column.name))
+        if value is None and column.primary_key:
+            continue  # let the database assign the key
+        if value is None and column.default is not None:
+            default = column.default.arg
+            value = default({}) if callable(default) else default
+        row[column.name] = value
+    return row
+
+
+def _existing(column, values):
+    """Return the subset of values already present in a column"""
+    values = {v for v in values if v is not None}
+    if not values:
+        return set()
+    return set(db.session.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _filter_chunk(model, rows, create_missing_users):
+    """
+    Resolve the email-based foreign keys for a chunk before inserting it.
+    Returns (rows_to_insert, skipped_count).
+    """
+    if model is User:
+        known = _existing(User.email, [r.get('email') for r in rows])
+        kept, seen = [], set()
+        for row in rows:
+            email = row.get('email')
+            if not email or email in known or email in seen:
+                continue
+            seen.add(email)
+            kept.append(row)
+        return kept, len(rows) - len(kept)
+
+    emails = {r.get('user_email') for r in rows}
+    known = _existing(User.email, emails)
+    missing = {e for e in emails - known if e}
+    if missing and create_missing_users:
+        db.session.execute(insert(User), [{'email': e, 'created_at': datetime.utcnow()} for e in sorted(missing)])
+        known |= missing
+
+    if model is Order:
+        known_addresses = _existing(Address.address_id, [r.get('address_id') for r in rows])
+        kept = [r for r in rows if r.get('user_email') in known and r.get('address_id') in known_addresses]
+    else:
+        kept = [r for r in rows if r.get('user_email') in known]
+    return kept, len(rows) - len(kept)
+
+
+def _insert_rows(model, rows):
+    """executemany-style insert, grouping rows that share the same key set"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    for group in groups.values():
+        db.session.execute(insert(model), group)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _report(action, table, count, skipped, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    message = f"{action} {count} {table} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)"
+    if skipped:
+        message += f", skipped {skipped}"
+    click.echo(message, err=True)
+
+
+@data_cli.command('import')
+@click.argument('table', type=click.Choice(list(MODELS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Input format (defaults to file extension).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows inserted per transaction.')
+@click.option('--create-missing-users', is_flag=True, help='Create bare users for unknown user_email values instead of skipping the rows.')
+def import_data(table, path, fmt, chunk_size, create_missing_users):
+    """Bulk load TABLE from a CSV or NDJSON file (use - for stdin)."""
+    model = MODELS[table]
+    fmt = _detect_format(path, fmt)
+    started = time.perf_counter()
+    imported = skipped = 0
+
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        records = (_coerce_record(model.__table__, r) for r in _read_records(stream, fmt))
+        for chunk in _chunks(records, chunk_size):
+            rows, chunk_skipped = _filter_chunk(model, chunk, create_missing_users)
+            try:
+                _insert_rows(model, rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            imported += len(rows)
+            skipped += chunk_skipped
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    _report('Imported', table, imported, skipped, started)
+
+
+def _serialize(value, fmt):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if fmt == 'csv' and isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+@data_cli.command('export')
+@click.argument('table', type=click.Choice(list(MODELS)))
+@click.argument('path', default='-', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Output format (defaults to file extension).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows fetched per server-side cursor batch.')
+def export_data(table, path, fmt, chunk_size):
+    """Stream TABLE to a CSV or NDJSON file (default stdout)."""
+    model = MODELS[table]
+    fmt = _detect_format(path, fmt)
+    columns = [c.name for c in model.__table__.columns]
+    started = time.perf_counter()
+    exported = 0
+
+    stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.writer(stream) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+
+        # Core select with yield_per streams rows through a server-side cursor
+        # without building ORM objects or an identity map
+        query = select(model.__table__).execution_options(yield_per=chunk_size)
+        for row in db.session.execute(query):
+            values = [_serialize(v, fmt) for v in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                stream.write(json.dumps(dict(zip(columns, values))) + '\n')
+            exported += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    _report('Exported', table, exported, 0, started)
+
+
+rollups_cli = AppGroup('rollups', help='Maintain the pickup reporting rollups.')
+
+
+@rollups_cli.command('catch-up')
+@click.option('--batch-size', default=1000, show_default=True, help='Orders rolled up per transaction.')
+@click.option('--rebuild', is_flag=True, help='Discard the rollup and recount every order.')
+def rollups_catch_up(batch_size, rebuild):
+    """Roll up orders that are not counted yet."""
+    from .utils import rollups
+    started = time.perf_counter()
+    count = rollups.rebuild(batch_size) if rebuild else rollups.catch_up(batch_size)
+    _report('Rolled up', 'orders', count, 0, started)
+
+
+assets_cli = AppGroup('assets', help='Build fingerprinted static assets.')
+
+
+@assets_cli.command('build')
+def assets_build():
+    """Fingerprint CSS and write gzip/brotli variants to static/dist."""
+    from flask import current_app
+    from .utils.assets import build_assets
+    manifest = build_assets(current_app.static_folder)
+    for logical, hashed in sorted(manifest.items()):
+        click.echo(f"{logical} -> {hashed}")
+
+
+templates_cli = AppGroup('templates', help='Manage the Jinja template bytecode cache.')
+
+
+@templates_cli.command('compile')
+def templates_compile():
+    """Precompile every template into the shared bytecode cache."""
+    from flask import current_app
+    from .utils.templates import warm_templates
+    click.echo(f"Compiled {warm_templates(current_app)} templates")
+
+
+outbox_cli = AppGroup('outbox', help='Publish order events from the outbox.')
+
+
+@outbox_cli.command('relay')
+@click.option('--batch-size', default=100, show_default=True, help='Events published per transaction.')
+@click.option('--once', is_flag=True, help='Drain the outbox once and exit.')
+def outbox_relay(batch_size, once):
+    """Publish outbox rows to the Redis event stream."""
+    from .utils import outbox
+    if not outbox.USE_REDIS:
+        # There is no stream to publish to; rows stay in outbox_event
+        raise click.ClickException('The outbox relay needs Redis (USE_REDIS is off)')
+    if not once:
+        click.echo('Relaying outbox events (Ctrl+C to stop)...', err=True)
+        outbox.relay_forever(batch_size=batch_size)
+        return
+    started = time.perf_counter()
+    total = 0
+    while True:
+        published = outbox.relay_once(batch_size)
+        total += published
+        if published < batch_size:
+            break
+    _report('Published', 'outbox', total, 0, started)
+
+
+sync_cli = AppGroup('sync', help='Maintain the collector delta-sync feed.')
+
+
+@sync_cli.command('prune-changes')
+def sync_prune_changes():
+    """Delete superseded changes and removals past SYNC_TOMBSTONE_RETENTION_DAYS."""
+    from .utils import sync
+    click.echo(f"Pruned {sync.prune_changes()} changes")
+
+
+addresses_cli = AppGroup('addresses', help='Maintain the address tables.')
+
+
+@addresses_cli.command('compact')
+@click.option('--batch-size', default=500, show_default=True, help='Rows moved per transaction.')
+def addresses_compact(batch_size):
+    """Move superseded, unreferenced addresses into address_history."""
+    from .utils import addresses
+    started = time.perf_counter()
+    _report('Compacted', 'address', addresses.compact_history(batch_size), 0, started)
+
+
+archive_cli = AppGroup('archive', help='Move old orders to cold storage.')
+
+
+@archive_cli.command('orders')
+@click.option('--older-than-days', type=int, help='Minimum order age (defaults to ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', default=500, show_default=True, help='Orders per segment and transaction.')
+@click.option('--all-statuses', is_flag=True, help='Archive old orders whatever their status.')
+def archive_orders(older_than_days, batch_size, all_statuses):
+    """Write old orders to compressed NDJSON segments and delete them from the live table."""
+    from .utils import archive
+    started = time.perf_counter()
+    count = archive.archive_orders(older_than_days, batch_size, [] if all_statuses else None)
+    _report('Archived', 'order', count, 0, started)
+
+
+@archive_cli.command('vacuum')
+@click.option('--pages', default=0, show_default=True, help='Maximum pages to free (0 frees all).')
+@click.option('--enable-incremental', is_flag=True, help='Switch to auto_vacuum=INCREMENTAL first (runs a full VACUUM once).')
+def archive_vacuum(pages, enable_incremental):
+    """Return free SQLite pages to the filesystem after archiving."""
+    from .utils import archive
+    result = archive.incremental_vacuum(pages, enable_incremental)
+    if 'skipped' in result:
+        click.echo(f"Skipped: {result['skipped']}")
+        return
+    click.echo(f"Free pages: {result['free_pages_before']} -> {result['free_pages_after']}")
+
+
+postal_cli = AppGroup('postal', help='Manage the postal code directory.')
+
+
+@postal_cli.command('build')
+@click.argument('csv_path', required=False, type=click.Path(exists=True, dir_okay=False))
+def postal_build(csv_path):
+    """Compile the postal code CSV (POSTAL_DATA_PATH by default) into the lookup index."""
+    from flask import current_app
+    from .utils.config import Config
+    from .utils import postal
+    started = time.perf_counter()
+    count = postal.build_index(csv_path or Config.POSTAL_DATA_PATH, postal.index_path_for(current_app))
+    _report('Indexed', 'postal code', count, 0, started)
+
+
+search_cli = AppGroup('search', help='Maintain the order search index.')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', default=5000, show_default=True, help='Orders indexed per transaction.')
+def search_rebuild(batch_size):
+    """Rebuild the full-text index over order descriptions and addresses."""
+    from .utils import search
+    started = time.perf_counter()
+    _report('Indexed', 'order', search.rebuild_index(batch_size), 0, started)
+
+
+images_cli = AppGroup('images', help='Manage stored pickup photos.')
+
+
+@images_cli.command('offload')
+@click.option('--batch-size', default=50, show_default=True, help='Orders rewritten per transaction.')
+def images_offload(batch_size):
+    """Move base64 photos out of order.images into files under IMAGE_DIR."""
+    from .utils import images
+    started = time.perf_counter()
+    _report('Offloaded', 'image', images.offload_inline_images(batch_size), 0, started)
+
+
+sessions_cli = AppGroup('sessions', help='Manage server-side sessions.')
+
+
+@sessions_cli.command('revoke')
+@click.argument('email')
+def sessions_revoke(email):
+    """Sign a user out of every device."""
+    from .utils import sessions
+    if not sessions.USE_REDIS:
+        # The fallback store lives in each server process; this CLI process
+        # holds none of their sessions and would report a false "0 revoked"
+        raise click.ClickException('Sessions can only be revoked from the CLI with Redis (USE_REDIS is off)')
+    click.echo(f"Revoked {sessions.revoke_user_sessions(email.strip().lower())} sessions")
+
+
+profile_cli = AppGroup('profile', help='On-demand request profiling.')
+
+
+@profile_cli.command('token')
+@click.option('--ttl', default=600, show_default=True, help='Seconds the token stays valid.')
+def profile_token(ttl):
+    """Print a signed X-Profile header value for profiling requests."""
+    from .utils.config import Config
+    from .utils import profiling
+    if not Config.PROFILE_SECRET:
+        raise click.ClickException('PROFILE_SECRET is not set')
+    click.echo(f"{profiling.PROFILE_HEADER}: {profiling.make_token(ttl)}")
+
+
+def register_commands(app):
+    """Attach the CLI command groups to the app"""
+    app.cli.add_command(data_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(sync_cli)
+    app.cli.add_command(addresses_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(postal_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(sessions_cli)
+    app.cli.add_command(profile_cli)
@@ -31,6 +31,8 @@ class Address(db.Model):
     postal_code  = db.Column(db.String(6))
     city         = db.Column(db.String(20))
     state        = db.Column(db.String(20))
+    updated_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_hash = db.Column(db.String(64))  # hash of the normalized address fields
 
     # relationships
     user   = db.relationship('User', back_populates='addresses')
@@ -52,12 +54,101 @@ class Order(db.Model):
     address_id   = db.Column(
         db.Integer,
         db.ForeignKey('address.address_id', ondelete='SET NULL'),
-        nullable=False
+        nullable=False,
+        index=True
     )
     contact_number = db.Column(db.String(10), nullable=False)
     description  = db.Column(db.Text)     # optional, Text for longer descriptions
     images       = db.Column(db.JSON)     # store list of image URLs/paths
+    status       = db.Column(db.String(20), nullable=False, default='scheduled', server_default='scheduled', index=True)
+    assigned_collector = db.Column(db.String(120), index=True)
+    updated_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    rolled_up    = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # counted in pickup_rollup
+
+    __table_args__ = (
+        # rollup catch-up scan: the orders not counted yet, by order_id
+        db.Index('ix_order_rollup_pending', 'rolled_up', 'order_id'),
+        # archived order_ids must never be handed out again
+        {'sqlite_autoincrement': True},
+    )
 
     # relationships
     user    = db.relationship('User',    back_populates='orders')
     address = db.relationship('Address', back_populates='orders')
+
+
+class PickupRollup(db.Model):
+    __tablename__ = 'pickup_rollup'
+
+    day     = db.Column(db.Date, primary_key=True)
+    city    = db.Column(db.String(20), primary_key=True, default='')
+    state   = db.Column(db.String(20), primary_key=True, default='')
+    pickups = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+
+    key        = db.Column(db.String(255), primary_key=True)
+    status     = db.Column(db.String(20), nullable=False)
+    result     = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_event'
+
+    id           = db.Column(db.Integer, primary_key=True)
+    order_id     = db.Column(db.Integer, nullable=False)  # no FK: events outlive archived orders
+    event_type   = db.Column(db.String(50), nullable=False)
+    payload      = db.Column(db.JSON, nullable=False)
+    created_at   = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime, index=True)
+
+
+class SyncChange(db.Model):
+    __tablename__ = 'sync_change'
+
+    # AUTOINCREMENT ids are handed out in commit order (SQLite runs one write
+    # transaction at a time) and never reused, so they make the sync cursor
+    id         = db.Column(db.Integer, primary_key=True)
+    collector  = db.Column(db.String(120), nullable=False)
+    order_id   = db.Column(db.Integer, nullable=False)
+    removed    = db.Column(db.Boolean, nullable=False, default=False)  # order taken away from the collector
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # feed scan, and the newest change per order
+        db.Index('ix_sync_change_feed', 'collector', 'id'),
+        db.Index('ix_sync_change_order', 'collector', 'order_id', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+
+
+class AddressHistory(db.Model):
+    __tablename__ = 'address_history'
+
+    address_id   = db.Column(db.Integer, primary_key=True)
+    user_email   = db.Column(db.String(120), nullable=False, index=True)
+    google_maps  = db.Column(db.String(2083))
+    address      = db.Column(db.String(500), nullable=False)
+    postal_code  = db.Column(db.String(6))
+    city         = db.Column(db.String(20))
+    state        = db.Column(db.String(20))
+    last_address = db.Column(db.Integer)
+    updated_at   = db.Column(db.DateTime, nullable=False)
+    content_hash = db.Column(db.String(64))
+    archived_at  = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchivedOrder(db.Model):
+    __tablename__ = 'archived_order'
+
+    order_id    = db.Column(db.Integer, primary_key=True)
+    user_email  = db.Column(db.String(120), nullable=False, index=True)
+    date        = db.Column(db.DateTime, nullable=False)
+    status      = db.Column(db.String(20), nullable=False)
+    segment     = db.Column(db.String(255), nullable=False)  # NDJSON.gz file under ARCHIVE_DIR
+    line        = db.Column(db.Integer, nullable=False)      # 0-based line within the segment
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -1,10 +1,17 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
-from .utils.otp import generate_otp, store_otp, verify_otp, cleanup_expired_otps
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, g, current_app
+from .utils.otp import issue_otp, release_resend, verify_otp, cleanup_expired_otps
 from .utils.emailer import send_otp_email_html
+from .utils.api_auth import api_token_required, bearer_client
+from .utils.rate_limit import rate_limited, form_email, session_email
+from .utils.sessions import regenerate_session
+from .utils import rollups, autosave, idempotency, order_status, sync, addresses, archive, search, postal, images
+from .utils.group_commit import run_write
+from .utils.config import Config
 from .models import User, Address, Order
 from . import db
 import re
-import base64
+import hashlib
+import json
 from datetime import datetime, timedelta
 import logging
 
@@ -24,6 +31,7 @@ def index():
     return render_template('index.html')
 
 @main.route('/login', methods=['GET', 'POST'])
+@rate_limited('login', Config.RATE_LIMIT_LOGIN_IP, Config.RATE_LIMIT_LOGIN_EMAIL, form_email)
 def login():
     if request.method == 'POST':
         email = request.form.get('email', '').strip().lower()
@@ -40,19 +48,23 @@ def login():
             return render_template('login.html', message='Please enter a valid email address', error=True)
         
         try:
-            # Generate OTP
-            otp_code = generate_otp()
-            logger.info(f"📧 Generated OTP for {email}: {otp_code}")
-            
-            # Store OTP with session management
-            session_id = store_otp(email, otp_code)
-            logger.info(f"💾 Stored OTP with session_id: {session_id}")
+            # Reuse the email's active OTP, or generate and store a new one
+            session_id, otp_code, retry_after = issue_otp(email)
+            logger.info(f"📧 OTP for {email}: {otp_code}, session_id: {session_id}")
             
             # Store session ID in Flask session
             session['otp_session_id'] = session_id
             session['email'] = email
             logger.info(f"📝 Stored session data - session_id: {session_id}, email: {email}")
             
+            if retry_after:
+                # Sent moments ago; don't send the same code again yet
+                logger.info(f"⏳ OTP resend throttled for {email}, retry in {retry_after}s")
+                return render_template('login.html', 
+                                     message=f'OTP already sent. Please check your email, or request it again in {retry_after} seconds.', 
+                                     show_otp_form=True,
+                                     email=email)
+            
             # Send OTP email
             email_sent = send_otp_email_html(email, otp_code)
             
@@ -64,6 +76,7 @@ def login():
                                      email=email)
             else:
                 logger.error(f"❌ Failed to send OTP email to {email}")
+                release_resend(email)
                 return render_template('login.html', 
                                      message='Failed to send OTP. Please try again.', 
                                      error=True)
@@ -77,6 +90,7 @@ def login():
     return render_template('login.html')
 
 @main.route('/verify-otp', methods=['POST'])
+@rate_limited('verify', Config.RATE_LIMIT_VERIFY_IP, Config.RATE_LIMIT_VERIFY_EMAIL, session_email)
 def verify_otp_route():
     otp_code = request.form.get('otp', '').strip()
     session_id = session.get('otp_session_id')
@@ -107,36 +121,37 @@ def verify_otp_route():
         logger.info(f"✅ OTP verified successfully for {email}")
         # OTP is valid, create or update user
         try:
-            logger.info(f"👤 Checking if user exists for email: {email}")
-            user = User.query.filter_by(email=email).first()
-            
-            if not user:
-                logger.info(f"🆕 Creating new user for email: {email}")
-                user = User(email=email)
-                db.session.add(user)
-                logger.info(f"💾 Added user to session: {user.email}")
-                db.session.commit()
-                logger.info(f"✅ User created successfully: {user.email} (ID: {user.id})")
-            else:
-                logger.info(f"👤 User already exists: {user.email} (ID: {user.id})")
+            # Create the user if needed and record the login in one write
+            def sign_in(write_session):
+                user = write_session.query(User).filter_by(email=email).first()
+                created = user is None
+                if created:
+                    user = User(email=email)
+                    write_session.add(user)
+                user.last_login_at = datetime.utcnow()
+                write_session.flush()
+                return user.id, created
             
-            # Update last login time
-            user.last_login_at = datetime.utcnow()
-            db.session.commit()
-            logger.info(f"🕐 Updated last login time for user: {user.email}")
+            user_id, created = run_write(sign_in)
+            if created:
+                logger.info(f"✅ User created successfully: {email} (ID: {user_id})")
+            else:
+                logger.info(f"👤 User already exists: {email} (ID: {user_id})")
+            logger.info(f"🕐 Updated last login time for user: {email}")
             
             # Clear session data
             session.pop('otp_session_id', None)
             session.pop('email', None)
             logger.info("🧹 Cleared OTP session data")
             
-            # Set user session
-            session['user_id'] = user.id
-            session['email'] = user.email
-            logger.info(f"📝 Set user session - user_id: {user.id}, email: {user.email}")
+            # Set user session, under a new session id
+            regenerate_session()
+            session['user_id'] = user_id
+            session['email'] = email
+            logger.info(f"📝 Set user session - user_id: {user_id}, email: {email}")
             
             # Check if user has an address
-            logger.info(f"🏠 Checking if user has address: {user.email}")
+            logger.info(f"🏠 Checking if user has address: {email}")
             address = Address.query.filter_by(user_email=email).first()
             if not address:
                 logger.info(f"🆕 New user - redirecting to address form")
@@ -194,25 +209,34 @@ def address_form():
                 flash('Address is required', 'error')
                 return render_template('address_form.html')
             
-            # Update user's name
-            user = User.query.get(session['user_id'])
-            if user:
-                user.name = name
-                logger.info(f"👤 Updated user name: {user.email} -> {name}")
+            # Check the postal code against the directory and fill in city/state
+            place, error = postal.validate_address_fields(postal_code, city, state)
+            if error:
+                logger.warning(f"❌ Address form validation failed: {error}")
+                flash(error, 'error')
+                return render_template('address_form.html')
+            postal_code, city, state = place['postal_code'], place['city'], place['state']
             
-            # Create new address
-            new_address = Address(
-                user_email=session['email'],
-                google_maps=google_maps,
-                address=address,
-                postal_code=postal_code,
-                city=city,
-                state=state
-            )
+            fields = {
+                'user_email': session['email'],
+                'google_maps': google_maps,
+                'address': address,
+                'postal_code': postal_code,
+                'city': city,
+                'state': state,
+            }
+            fields['content_hash'] = addresses.content_hash(fields)
+            user_id = session['user_id']
             
-            db.session.add(new_address)
-            db.session.commit()
-            logger.info(f"✅ Address created successfully for user: {session['email']}")
+            # Update the user's name and create the address in one write
+            def save_address(write_session):
+                user = write_session.get(User, user_id)
+                if user:
+                    user.name = name
+                write_session.add(Address(**fields))
+            
+            run_write(save_address)
+            logger.info(f"✅ Address created successfully for user: {session['email']} (name: {name})")
             
             flash('Address added successfully!', 'success')
             return redirect(url_for('main.dashboard'))
@@ -239,18 +263,28 @@ def dashboard():
         session.clear()
         return redirect(url_for('main.login'))
     
-    # Get user's most recent address (the one without a last_address value)
-    address = Address.query.filter_by(user_email=user.email, last_address=None).first()
-    if not address:
-        # Fallback to any address if no current address found
-        address = Address.query.filter_by(user_email=user.email).first()
+    # Get user's most recent address
+    address = addresses.get_current_address(user.email)
     
     # Get user's orders
     orders = Order.query.filter_by(user_email=user.email).order_by(Order.date.desc()).all()
     
+    # Archived orders live in cold storage; only read them when asked
+    show_archived = request.args.get('archived') == '1'
+    archived_orders = archive.archived_orders_for_user(user.email) if show_archived else []
+    archived_count = archive.count_archived_orders(user.email)
+    
     logger.info(f"📊 Dashboard data - User: {user.email}, Address: {address is not None}, Orders: {len(orders)}")
     
-    return render_template('dashboard.html', user=user, address=address, orders=orders)
+    return render_template(
+        'dashboard.html',
+        user=user,
+        address=address,
+        orders=orders,
+        show_archived=show_archived,
+        archived_orders=archived_orders,
+        archived_count=archived_count
+    )
 
 @main.route('/update-address', methods=['GET', 'POST'])
 def update_address():
@@ -260,7 +294,7 @@ def update_address():
     
     logger.info(f"✏️ Update address accessed by user_id: {session.get('user_id')}")
     
-    address = Address.query.filter_by(user_email=session['email']).first()
+    address = addresses.get_current_address(session['email'])
     if not address:
         logger.warning(f"❌ No address found for user: {session.get('email')}")
         return redirect(url_for('main.address_form'))
@@ -270,16 +304,28 @@ def update_address():
             # Store the current address_id as last_address before updating
             current_address_id = address.address_id
             
+            # Check the postal code against the directory and fill in city/state
+            place, error = postal.validate_address_fields(
+                request.form.get('postal_code', ''),
+                request.form.get('city', ''),
+                request.form.get('state', '')
+            )
+            if error:
+                logger.warning(f"❌ Address update validation failed: {error}")
+                flash(error, 'error')
+                return render_template('update_address.html', address=address)
+            
             # Create a new address record with the updated data
             new_address = Address(
                 user_email=session['email'],
                 google_maps=request.form.get('google_maps', '').strip(),
                 address=request.form.get('address', '').strip(),
-                postal_code=request.form.get('postal_code', '').strip(),
-                city=request.form.get('city', '').strip(),
-                state=request.form.get('state', '').strip(),
+                postal_code=place['postal_code'],
+                city=place['city'],
+                state=place['state'],
                 last_address=current_address_id  # Link to the previous address
             )
+            new_address.content_hash = addresses.address_hash(new_address)
             
             logger.info(f"📝 Address update submitted - User: {session.get('email')}, New Address: {new_address.address}, Last Address ID: {current_address_id}")
             
@@ -289,11 +335,25 @@ def update_address():
                 flash('Address is required', 'error')
                 return render_template('update_address.html', address=address)
             
+            # Unchanged submissions don't grow the address chain
+            if new_address.content_hash == addresses.address_hash(address):
+                logger.info(f"⏭️ Address unchanged for user: {session['email']} - keeping Address ID: {current_address_id}")
+                flash('Address is unchanged', 'success')
+                return redirect(url_for('main.dashboard'))
+            
             # Add the new address
-            db.session.add(new_address)
-            db.session.commit()
+            fields = {column: getattr(new_address, column) for column in (
+                'user_email', 'google_maps', 'address', 'postal_code', 'city', 'state', 'last_address', 'content_hash'
+            )}
             
-            logger.info(f"✅ Address updated successfully for user: {session['email']} - New Address ID: {new_address.address_id}")
+            def add_address(write_session):
+                added = Address(**fields)
+                write_session.add(added)
+                write_session.flush()
+                return added.address_id
+            
+            new_address_id = run_write(add_address)
+            logger.info(f"✅ Address updated successfully for user: {session['email']} - New Address ID: {new_address_id}")
             flash('Address updated successfully!', 'success')
             return redirect(url_for('main.dashboard'))
             
@@ -313,11 +373,8 @@ def schedule_pickup():
     
     logger.info(f"🚚 Schedule pickup accessed by user_id: {session.get('user_id')}")
     
-    # Get user's most recent address (the one without a last_address value)
-    address = Address.query.filter_by(user_email=session['email'], last_address=None).first()
-    if not address:
-        # Fallback to any address if no current address found
-        address = Address.query.filter_by(user_email=session['email']).first()
+    # Get user's most recent address
+    address = addresses.get_current_address(session['email'])
     
     if not address:
         logger.warning(f"❌ No address found for user: {session.get('email')}")
@@ -325,6 +382,18 @@ def schedule_pickup():
         return redirect(url_for('main.address_form'))
     
     if request.method == 'POST':
+        # The idempotency key travels in a header or the query string so a
+        # duplicate is answered before the multipart body is parsed
+        idempotency_key = request.headers.get('Idempotency-Key') or request.args.get('idempotency_key')
+        if not idempotency.is_valid_key(idempotency_key):
+            idempotency_key = None
+        scope = f"pickup:{session['email']}"
+        if idempotency_key:
+            existing = idempotency.claim(scope, idempotency_key)
+            if existing:
+                return _duplicate_pickup_response(scope, idempotency_key, existing)
+
+        completed = False
         try:
             # Get form data
             contact_number = request.form.get('contact_number', '').strip()
@@ -336,10 +405,10 @@ def schedule_pickup():
             if not contact_number:
                 logger.warning("❌ Pickup form validation failed: Contact number is required")
                 flash('Contact number is required', 'error')
-                return render_template('schedule_pickup.html')
+                return _render_pickup_form(address)
             
             # Handle file uploads
-            images = []
+            order_images = []
             if 'images' in request.files:
                 uploaded_files = request.files.getlist('images')
                 for file in uploaded_files:
@@ -352,37 +421,85 @@ def schedule_pickup():
                         if file_size > 5 * 1024 * 1024:  # 5MB in bytes
                             logger.warning(f"❌ File too large: {file.filename} ({file_size} bytes)")
                             flash(f'File {file.filename} is too large. Maximum size is 5MB.', 'error')
-                            return render_template('schedule_pickup.html')
+                            return _render_pickup_form(address)
                         
-                        # Convert to base64
-                        file_content = file.read()
-                        base64_string = base64.b64encode(file_content).decode('utf-8')
-                        images.append(base64_string)
+                        # base64 in the order row, or a file under IMAGE_DIR
+                        order_images.append(images.encode_upload(file.read()))
                         logger.info(f"📸 Image uploaded: {file.filename} ({file_size} bytes)")
             
-            # Create new order
-            new_order = Order(
-                user_email=session['email'],
-                address_id=address.address_id,
-                contact_number=contact_number,
-                description=description,
-                images=images if images else None
-            )
+            # Create new order, with its rollup count, outbox event and
+            # idempotency result, in one write
+            # (the address is already loaded; record_pickup only reads its
+            # city and state from the writer thread)
+            user_email, address_id = session['email'], address.address_id
+            
+            def create_order(write_session):
+                new_order = Order(
+                    user_email=user_email,
+                    address_id=address_id,
+                    contact_number=contact_number,
+                    description=description,
+                    images=order_images if order_images else None
+                )
+                rollups.record_pickup(new_order, address, write_session)
+                write_session.add(new_order)
+                write_session.flush()
+                order_status.record_created(new_order, write_session)
+                if idempotency_key:
+                    idempotency.complete(scope, idempotency_key, {'order_id': new_order.order_id}, write_session)
+                return new_order.order_id
             
-            db.session.add(new_order)
-            db.session.commit()
-            logger.info(f"✅ Pickup scheduled successfully for user: {session['email']}")
+            order_id = run_write(create_order)
+            completed = True
+            if idempotency_key:
+                try:
+                    idempotency.complete_committed(scope, idempotency_key, {'order_id': order_id})
+                except Exception as e:
+                    # The order exists; the claim stays in flight until its TTL
+                    logger.error(f"❌ Could not record pickup result for order {order_id}: {str(e)}")
+            logger.info(f"✅ Pickup scheduled successfully for user: {session['email']} - Order ID: {order_id}")
             
             flash('Pickup scheduled successfully!', 'success')
             return redirect(url_for('main.dashboard'))
             
+        except TimeoutError:
+            # The queued write may still commit: keep the key claimed (until
+            # its TTL) so a retry cannot create a second order
+            completed = True
+            logger.error(f"❌ Timed out scheduling pickup for user: {session['email']}")
+            flash('Your pickup request is being processed', 'success')
+            return redirect(url_for('main.dashboard'))
         except Exception as e:
             logger.error(f"❌ Error scheduling pickup: {str(e)}")
             db.session.rollback()
             flash('An error occurred while scheduling pickup', 'error')
-            return render_template('schedule_pickup.html')
+            return _render_pickup_form(address)
+        finally:
+            if idempotency_key and not completed:
+                idempotency.release(scope, idempotency_key)
     
-    return render_template('schedule_pickup.html', address=address)
+    return _render_pickup_form(address)
+
+def _render_pickup_form(address):
+    """Render the pickup form with a fresh idempotency key"""
+    return render_template('schedule_pickup.html', address=address, idempotency_key=idempotency.generate_key())
+
+def _duplicate_pickup_response(scope, idempotency_key, record):
+    """Answer a repeated pickup submission with the original outcome"""
+    if record['status'] == idempotency.IN_FLIGHT:
+        record = idempotency.wait_for_result(scope, idempotency_key)
+
+    if record is None:
+        # The original attempt failed and released the key
+        flash('An error occurred while scheduling pickup', 'error')
+        return redirect(url_for('main.schedule_pickup'))
+    if record['status'] == idempotency.COMPLETED:
+        logger.info(f"🔁 Duplicate pickup submission for order {record['result']['order_id']} - returning original result")
+        flash('Pickup scheduled successfully!', 'success')
+    else:
+        logger.info(f"🔁 Duplicate pickup submission while the original is still in flight")
+        flash('Your pickup request is being processed', 'success')
+    return redirect(url_for('main.dashboard'))
 
 @main.route('/logout')
 def logout():
@@ -395,28 +512,165 @@ def verify():
     # Legacy endpoint - redirect to new verification flow
     return redirect(url_for('main.verify_otp_route'))
 
-@main.route('/api/form-submit', methods=['POST'])
+@main.route('/api/form-submit', methods=['GET', 'POST'])
 def form_submit():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
-    
-    data = request.json
+
     try:
-        user = User.query.get(session['user_id'])
-        if user:
-            user.last_submitted_form_data = data
-            db.session.commit()
-            return '', 204
-        else:
-            return jsonify({'error': 'User not found'}), 404
+        if request.method == 'GET':
+            return jsonify(autosave.get_form_data(session['user_id'])), 200
+
+        # Reject oversized autosaves before parsing the body
+        if request.content_length and request.content_length > Config.AUTOSAVE_MAX_BYTES:
+            return jsonify({'error': 'Payload too large'}), 413
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+
+        # Buffered and flushed to the database in batches
+        autosave.buffer_patch(session['user_id'], data)
+        return '', 204
+    except autosave.PayloadTooLarge:
+        return jsonify({'error': 'Payload too large'}), 413
+    except autosave.UnknownUser:
+        return jsonify({'error': 'User not found'}), 404
     except Exception as e:
-        db.session.rollback()
+        logger.error(f"❌ Error saving form data: {str(e)}")
         return jsonify({'error': 'Failed to save data'}), 500
 
 @main.route('/api/notify', methods=['POST'])
+@api_token_required('collector', 'staff')
 def notify():
-    # Placeholder for future integration
-    return jsonify({'status': 'received'}), 200
+    # Batched status updates from the field: {"updates": [{"order_id", "status", ...}]}
+    data = request.get_json(silent=True)
+    updates = data.get('updates') if isinstance(data, dict) else data
+    if not isinstance(updates, list) or not updates or not all(isinstance(u, dict) for u in updates):
+        return jsonify({'error': 'Expected a non-empty list of updates'}), 400
+    if len(updates) > Config.NOTIFY_MAX_BATCH:
+        return jsonify({'error': f'At most {Config.NOTIFY_MAX_BATCH} updates per request'}), 413
+
+    # One query for the whole batch
+    order_ids = {u.get('order_id') for u in updates if isinstance(u.get('order_id'), int)}
+    orders = {o.order_id: o for o in Order.query.filter(Order.order_id.in_(order_ids))} if order_ids else {}
+
+    results = []
+    for item in updates:
+        order = orders.get(item.get('order_id'))
+        status = item.get('status')
+        collector = item.get('collector')
+        if order is None:
+            results.append({'order_id': item.get('order_id'), 'ok': False, 'error': 'Order not found'})
+            continue
+
+        if g.api_role == 'collector':
+            # Collectors only act on pickups assigned to them; assigning is for staff
+            if order.assigned_collector != g.api_client:
+                results.append({'order_id': order.order_id, 'ok': False, 'error': 'Order is not assigned to you'})
+                continue
+            if status == order_status.ASSIGNED:
+                results.append({'order_id': order.order_id, 'ok': False, 'error': 'Only staff can assign orders'})
+                continue
+
+        try:
+            order_status.change_status(
+                order, status,
+                collector=collector,
+                actor=g.api_client,
+                occurred_at=item.get('occurred_at')
+            )
+            results.append({'order_id': order.order_id, 'ok': True, 'status': order.status})
+        except order_status.InvalidTransition as e:
+            results.append({'order_id': order.order_id, 'ok': False, 'error': str(e)})
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"❌ Error applying status updates: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to apply updates'}), 500
+
+    accepted = sum(1 for r in results if r['ok'])
+    logger.info(f"📬 Status updates from {g.api_client}: {accepted}/{len(results)} accepted")
+    return jsonify({'accepted': accepted, 'results': results}), 200
+
+@main.route('/api/collector/sync', methods=['GET'])
+@api_token_required('collector')
+def collector_sync():
+    try:
+        limit = min(int(request.args.get('limit', Config.SYNC_PAGE_SIZE)), Config.SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        changes = sync.changes_since(g.api_client, request.args.get('cursor'), limit)
+    except sync.InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except sync.CursorExpired as e:
+        return jsonify({'error': str(e)}), 410
+
+    body = json.dumps(changes, separators=(',', ':'))
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha256(body.encode()).hexdigest()[:32])
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@main.route('/api/reports/pickups', methods=['GET'])
+@api_token_required()
+def pickup_report():
+    group_by = [g for g in request.args.get('group_by', 'day,city,state').split(',') if g]
+    if any(g not in rollups.GROUP_COLUMNS for g in group_by):
+        return jsonify({'error': 'group_by must be any of day, city, state'}), 400
+
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    return jsonify({'group_by': group_by, 'rows': rollups.pickup_report(group_by, start, end)}), 200
+
+@main.route('/api/search/orders', methods=['GET'])
+@api_token_required()
+def search_orders():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', Config.SEARCH_PAGE_SIZE)), Config.SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'page and per_page must be positive'}), 400
+    if page * per_page > Config.SEARCH_MAX_RESULTS:
+        # Deep pages cost a scan of every better match; refine the query instead
+        return jsonify({'error': f'Only the first {Config.SEARCH_MAX_RESULTS} results can be paged through'}), 400
+
+    return jsonify(search.search_orders(query, page, per_page)), 200
+
+@main.route('/orders/<int:order_id>/images/<int:index>', methods=['GET'])
+def order_image(order_id, index):
+    """One pickup photo, for the order's owner, staff, or its assigned collector"""
+    client = bearer_client()
+    if client is None and 'user_id' not in session:
+        if request.headers.get('Authorization'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return redirect(url_for('main.login'))
+
+    image = images.find_image(order_id, index)
+    allowed = image is not None and (
+        (client is None and image.user_email == session.get('email'))
+        or (client is not None and client[1] == 'staff')
+        or (client is not None and client[1] == 'collector' and image.assigned_collector == client[0])
+    )
+    if not allowed:
+        # Someone else's photo looks the same as a missing one
+        return 'Image not found', 404, {'Content-Type': 'text/plain'}
+    return images.image_response(image)
 
 # Cleanup expired OTPs periodically
 @main.before_request
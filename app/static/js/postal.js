@@ -0,0 +1,33 @@
+// Fill in city and state from the postal code directory once a full
+// 6-digit code is typed. Fields the user edited by hand are left alone.
+(function () {
+  var postal = document.getElementById('postal_code');
+  var city = document.getElementById('city');
+  var state = document.getElementById('state');
+  if (!postal || !city || !state) return;
+
+  [city, state].forEach(function (field) {
+    field.dataset.autofilled = field.value ? 'false' : 'true';
+    field.addEventListener('input', function () { field.dataset.autofilled = 'false'; });
+  });
+
+  function fill(field, value) {
+    if (!field.value || field.dataset.autofilled === 'true') {
+      field.value = value;
+      field.dataset.autofilled = 'true';
+    }
+  }
+
+  postal.addEventListener('input', function () {
+    var code = postal.value.replace(/\s+/g, '');
+    if (!/^[1-9][0-9]{5}$/.test(code)) return;
+    fetch('/api/postal-codes/' + code)
+      .then(function (response) { return response.ok ? response.json() : null; })
+      .then(function (place) {
+        if (!place || postal.value.replace(/\s+/g, '') !== code) return;
+        fill(city, place.city);
+        fill(state, place.state);
+      })
+      .catch(function () {});
+  });
+})();
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, update, delete, func, exists, literal
+from sqlalchemy.orm import aliased
+from .. import db
+from ..models import Address, AddressHistory, Order
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+HASHED_FIELDS = ('google_maps', 'address', 'postal_code', 'city', 'state')
+# Hashed verbatim: short links are case-sensitive (maps.app.goo.gl/AbC != /abc)
+VERBATIM_FIELDS = ('google_maps',)
+HISTORY_COLUMNS = (
+    'address_id', 'user_email', 'google_maps', 'address', 'postal_code',
+    'city', 'state', 'last_address', 'updated_at', 'content_hash'
+)
+
+
+def _normalize(value: Optional[str]) -> str:
+    """
+    Trim and collapse whitespace so whitespace-only edits hash equal. Case is
+    kept: a capitalization fix is a real edit the user expects to be saved.
+    """
+    return re.sub(r'\s+', ' ', (value or '').strip())
+
+
+def content_hash(fields: dict) -> str:
+    """
+    Hash the address fields, normalized except for VERBATIM_FIELDS
+    Args:
+        fields: Mapping with google_maps, address, postal_code, city, state
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    normalized = [
+        (fields.get(name) or '') if name in VERBATIM_FIELDS else _normalize(fields.get(name))
+        for name in HASHED_FIELDS
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode('utf-8')).hexdigest()
+
+
+def address_hash(address: Address) -> str:
+    """Stored hash of an address row, computed for rows that predate it"""
+    return address.content_hash or content_hash({name: getattr(address, name) for name in HASHED_FIELDS})
+
+
+def get_current_address(email: str) -> Optional[Address]:
+    """The user's current address: the newest row in their address chain"""
+    return (
+        Address.query
+        .filter_by(user_email=email)
+        .order_by(Address.address_id.desc())
+        .first()
+    )
+
+
+def compact_history(batch_size: int = 500) -> int:
+    """
+    Move superseded addresses that no order references into address_history.
+    A row qualifies once a newer address for the same user has existed for
+    ADDRESS_COMPACTION_GRACE_MINUTES, so a request still holding the old
+    current address cannot attach an order to a row that was just moved.
+    Returns:
+        int: Number of rows moved
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=Config.ADDRESS_COMPACTION_GRACE_MINUTES)
+    newer = aliased(Address)
+    moved = 0
+
+    while True:
+        newest_settled = (
+            select(func.max(newer.address_id))
+            .where(newer.user_email == Address.user_email, newer.updated_at < cutoff)
+            .scalar_subquery()
+        )
+        ids = db.session.execute(
+            select(Address.address_id)
+            .where(
+                Address.address_id < newest_settled,
+                ~exists().where(Order.address_id == Address.address_id)
+            )
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return moved
+
+        try:
+            columns = [getattr(Address, name) for name in HISTORY_COLUMNS]
+            db.session.execute(
+                insert(AddressHistory).from_select(
+                    list(HISTORY_COLUMNS) + ['archived_at'],
+                    select(*columns, literal(datetime.utcnow(), db.DateTime)).where(Address.address_id.in_(ids))
+                )
+            )
+            # Same effect as the FK's ON DELETE SET NULL; a user's versions
+            # stay ordered by address_id across both tables
+            db.session.execute(
+                update(Address)
+                .where(Address.last_address.in_(ids))
+                .values(last_address=None, updated_at=Address.updated_at)
+            )
+            db.session.execute(delete(Address).where(Address.address_id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        moved += len(ids)
+        logger.info(f"🗜️ Moved {len(ids)} superseded addresses to address_history")
@@ -0,0 +1,62 @@
+import hmac
+from functools import wraps
+from flask import request, jsonify, g
+from .config import Config
+
+
+def parse_api_tokens(raw: str) -> dict:
+    """
+    Parse API_TOKENS into {token: (client_name, role)}
+    Args:
+        raw: Comma separated "name:token[:role]" entries, role defaults to staff
+    Returns:
+        dict mapping token to (client_name, role)
+    """
+    tokens = {}
+    for entry in raw.split(','):
+        parts = [p.strip() for p in entry.split(':')]
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            continue
+        role = parts[2] if len(parts) > 2 and parts[2] else 'staff'
+        tokens[parts[1]] = (parts[0], role)
+    return tokens
+
+
+_api_tokens = parse_api_tokens(Config.API_TOKENS)
+
+
+def authenticate_token(token: str):
+    """Return (client_name, role) for a bearer token, or None"""
+    for known, client in _api_tokens.items():
+        if hmac.compare_digest(known, token):
+            return client
+    return None
+
+
+def bearer_client():
+    """(client_name, role) for the request's "Authorization: Bearer" token, or None"""
+    header = request.headers.get('Authorization', '')
+    token = header[7:].strip() if header.startswith('Bearer ') else ''
+    return authenticate_token(token) if token else None
+
+
+def api_token_required(*roles: str):
+    """
+    Require an "Authorization: Bearer <token>" header with one of the given
+    roles (staff when none are given).
+    Sets g.api_client to the token's client name and g.api_role to its role.
+    """
+    roles = roles or ('staff',)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            client = bearer_client()
+            if not client:
+                return jsonify({'error': 'Unauthorized'}), 401
+            if client[1] not in roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            g.api_client, g.api_role = client
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
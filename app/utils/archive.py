@@ -0,0 +1,189 @@
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, delete, insert, text
+from .. import db
+from ..models import Order, Address, ArchivedOrder
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_FIELDS = ('address_id', 'address', 'google_maps', 'postal_code', 'city', 'state')
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _write_segment(name: str, records: list):
+    """Write a gzip NDJSON segment atomically (temp file, fsync, rename)"""
+    os.makedirs(Config.ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(Config.ARCHIVE_DIR, name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+            for record in records:
+                f.write(json.dumps(record, default=_json_default, separators=(',', ':')).encode('utf-8') + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+
+def archive_orders(older_than_days: Optional[int] = None, batch_size: int = 500,
+                   statuses: Optional[list] = None) -> int:
+    """
+    Move old orders out of the live table into compressed NDJSON segments.
+    Each batch becomes one segment; its orders are indexed in archived_order
+    and deleted from the live table in the same transaction. The address is
+    embedded in each record, so the address rows can be compacted later.
+    A crash between writing a segment and committing leaves an unreferenced
+    segment file behind, and the orders are archived again on the next run.
+    Args:
+        older_than_days: Minimum order age (defaults to ARCHIVE_AFTER_DAYS)
+        batch_size: Orders per segment and transaction
+        statuses: Only archive orders in these statuses (defaults to ARCHIVE_STATUSES, [] for all)
+    Returns:
+        int: Number of orders archived
+    """
+    days = Config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    statuses = Config.ARCHIVE_STATUSES if statuses is None else statuses
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    address_columns = [getattr(Address, name).label(f"address_{name}") for name in ADDRESS_FIELDS]
+    archived = 0
+
+    while True:
+        query = (
+            select(Order.__table__, *address_columns)
+            .join(Address, Address.address_id == Order.address_id, isouter=True)
+            # Orders the rollup has not counted yet stay until catch-up runs
+            .where(Order.date < cutoff, Order.rolled_up.is_(True))
+            .order_by(Order.order_id)
+            .limit(batch_size)
+        )
+        if statuses:
+            query = query.where(Order.status.in_(statuses))
+        rows = db.session.execute(query).mappings().all()
+        if not rows:
+            return archived
+
+        records = []
+        for row in rows:
+            record = {c.name: row[c.name] for c in Order.__table__.columns}
+            record['address'] = {name: row[f"address_{name}"] for name in ADDRESS_FIELDS}
+            records.append(record)
+
+        segment = f"orders-{datetime.utcnow():%Y%m%dT%H%M%S}-{rows[0]['order_id']}-{rows[-1]['order_id']}.ndjson.gz"
+        _write_segment(segment, records)
+
+        try:
+            now = datetime.utcnow()
+            db.session.execute(insert(ArchivedOrder), [
+                {
+                    'order_id': r['order_id'],
+                    'user_email': r['user_email'],
+                    'date': r['date'],
+                    'status': r['status'],
+                    'segment': segment,
+                    'line': line,
+                    'archived_at': now,
+                }
+                for line, r in enumerate(records)
+            ])
+            db.session.execute(delete(Order).where(Order.order_id.in_([r['order_id'] for r in records])))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        archived += len(records)
+        logger.info(f"🗄️ Archived {len(records)} orders to {segment}")
+
+
+def _read_segment_lines(segment: str, lines: set) -> dict:
+    """Decode only the wanted lines of a segment, stopping after the last one"""
+    found = {}
+    last = max(lines)
+    with gzip.open(os.path.join(Config.ARCHIVE_DIR, segment), 'rb') as f:
+        for number, raw in enumerate(f):
+            if number in lines:
+                found[number] = json.loads(raw)
+            if number >= last:
+                break
+    return found
+
+
+def load_archived_orders(entries: list) -> list:
+    """Load full records for archived_order index entries, one pass per segment"""
+    by_segment = defaultdict(set)
+    for entry in entries:
+        by_segment[entry.segment].add(entry.line)
+
+    loaded = {}
+    for segment, lines in by_segment.items():
+        try:
+            for line, record in _read_segment_lines(segment, lines).items():
+                loaded[(segment, line)] = record
+        except OSError as e:
+            logger.error(f"❌ Archive segment unreadable: {segment}: {str(e)}")
+
+    records = []
+    for entry in entries:
+        record = loaded.get((entry.segment, entry.line))
+        if record is not None:
+            record['date'] = datetime.fromisoformat(record['date'])
+            records.append(record)
+    return records
+
+
+def archived_orders_for_user(email: str, limit: int = 50) -> list:
+    """A user's archived orders, newest first"""
+    entries = (
+        ArchivedOrder.query
+        .filter_by(user_email=email)
+        .order_by(ArchivedOrder.date.desc())
+        .limit(limit)
+        .all()
+    )
+    return load_archived_orders(entries)
+
+
+def count_archived_orders(email: str) -> int:
+    return ArchivedOrder.query.filter_by(user_email=email).count()
+
+
+def incremental_vacuum(pages: int = 0, enable: bool = False) -> dict:
+    """
+    Return free SQLite pages to the filesystem.
+    Incremental vacuum needs auto_vacuum=INCREMENTAL, which an existing
+    database only picks up after one full VACUUM (enable=True; this blocks
+    writers while it rewrites the file).
+    Args:
+        pages: Maximum pages to free, 0 for all
+        enable: Switch the database to incremental auto-vacuum first
+    Returns:
+        dict with auto_vacuum mode and freelist counts before and after
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return {'skipped': 'incremental vacuum is SQLite only'}
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if enable:
+            conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+            conn.execute(text('VACUUM'))
+        mode = conn.execute(text('PRAGMA auto_vacuum')).scalar()
+        before = conn.execute(text('PRAGMA freelist_count')).scalar()
+        if mode == 2:
+            # sqlite3's execute() steps a pragma once, freeing a single page;
+            # executescript() runs it to completion
+            conn.connection.driver_connection.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+        after = conn.execute(text('PRAGMA freelist_count')).scalar()
+
+    if mode != 2:
+        logger.warning("⚠️ auto_vacuum is not INCREMENTAL; run with --enable-incremental once")
+    return {'auto_vacuum': mode, 'free_pages_before': before, 'free_pages_after': after}
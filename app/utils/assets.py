@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from flask import current_app, request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_DIRS = ('css', 'js')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+
+def _fingerprinted(path: str, content: bytes) -> str:
+    """css/login.css -> css/login.<hash>.css"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def build_assets(static_folder: str) -> dict:
+    """
+    Fingerprint static assets and write precompressed variants
+    Args:
+        static_folder: The app's static folder
+    Returns:
+        dict: Manifest mapping logical paths to fingerprinted paths
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(static_folder, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            if os.path.splitext(name)[1] not in MIMETYPES:
+                continue
+            logical = f"{asset_dir}/{name}"
+            with open(os.path.join(source_dir, name), 'rb') as f:
+                content = f.read()
+
+            hashed = _fingerprinted(logical, content)
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+            # mtime=0 keeps the gzip bytes reproducible between builds
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as f:
+                    f.write(brotli.compress(content, quality=11))
+            manifest[logical] = hashed
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        logger.warning("⚠️ brotli not installed, only gzip variants were built")
+    return manifest
+
+
+def load_manifest(static_folder: str) -> dict:
+    """Load the asset manifest, or an empty one if assets were never built"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """
+    URL for a static asset: the fingerprinted, cacheable copy when it has been
+    built, otherwise the plain /static file (development without a build)
+    """
+    hashed = current_app.extensions['assets'].get(path)
+    if hashed:
+        return url_for('assets', filename=hashed)
+    return url_for('static', filename=path)
+
+
+def serve_asset(filename: str):
+    """Serve a fingerprinted asset, preferring a precompressed variant"""
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    mimetype = MIMETYPES.get(os.path.splitext(filename)[1])
+    if mimetype is None:
+        abort(404)
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(dist, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+
+    response = send_from_directory(dist, filename, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Load the asset manifest and expose asset_url() to templates"""
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    # Registered on the app rather than the blueprint so asset requests skip
+    # the blueprint's before_request hooks
+    app.add_url_rule('/assets/<path:filename>', endpoint='assets', view_func=serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,234 @@
+import atexit
+import json
+import logging
+import threading
+from typing import Optional
+import redis
+from sqlalchemy import select, update
+from .. import db
+from ..models import User
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'autosave:pending'
+FLUSH_LOCK_KEY = 'autosave:flush-lock'
+# Longer than a flush batch should ever take; renewed before every commit
+FLUSH_LOCK_TIMEOUT = 60
+
+# Delete a pending entry only if it still holds the value that was flushed
+_COMPARE_AND_DELETE = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# Fallback in-memory buffer (per process) for development
+_pending = {}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_event = threading.Event()
+_flusher = None
+_compare_and_delete = redis_client.register_script(_COMPARE_AND_DELETE) if USE_REDIS else None
+
+
+class PayloadTooLarge(ValueError):
+    """Autosave payload exceeds AUTOSAVE_MAX_BYTES"""
+
+
+class UnknownUser(LookupError):
+    """Autosave for a user that does not exist"""
+
+
+def merge_patch(target, patch):
+    """
+    Apply an RFC 7386 JSON merge patch: objects merge recursively, null
+    removes a key and any other value replaces the target outright
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _encode(document) -> str:
+    encoded = json.dumps(document, separators=(',', ':'), sort_keys=True)
+    if len(encoded.encode('utf-8')) > Config.AUTOSAVE_MAX_BYTES:
+        raise PayloadTooLarge(f"Form data exceeds {Config.AUTOSAVE_MAX_BYTES} bytes")
+    return encoded
+
+
+def _load_saved(user_id: int):
+    """Read the flushed form data for a user straight from the database"""
+    row = db.session.execute(
+        select(User.last_submitted_form_data).where(User.id == user_id)
+    ).first()
+    if row is None:
+        raise UnknownUser(f"User {user_id} not found")
+    return row[0]
+
+
+def buffer_patch(user_id: int, patch) -> int:
+    """
+    Merge a partial form update into the user's buffered document.
+    The first patch after a flush starts from the saved database value;
+    later ones merge into the buffer without touching the database.
+    Args:
+        user_id: User the form data belongs to
+        patch: JSON merge patch (a non-object replaces the whole document)
+    Returns:
+        int: Number of users with unflushed data
+    """
+    field = str(user_id)
+    if USE_REDIS:
+        with redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(PENDING_KEY)
+                    current = pipe.hget(PENDING_KEY, field)
+                    base = json.loads(current) if current is not None else _load_saved(user_id)
+                    encoded = _encode(merge_patch(base, patch))
+                    pipe.multi()
+                    pipe.hset(PENDING_KEY, field, encoded)
+                    pipe.hlen(PENDING_KEY)
+                    pending_count = pipe.execute()[-1]
+                    break
+                except redis.WatchError:
+                    continue
+    else:
+        # Read, merge and write under one hold, or concurrent patches for the
+        # same user would merge from the same base and one would be lost
+        with _lock:
+            current = _pending.get(field)
+            base = json.loads(current) if current is not None else _load_saved(user_id)
+            _pending[field] = _encode(merge_patch(base, patch))
+            pending_count = len(_pending)
+
+    _ensure_flusher()
+    if pending_count >= Config.AUTOSAVE_FLUSH_THRESHOLD:
+        _flush_event.set()
+    return pending_count
+
+
+def get_form_data(user_id: int):
+    """Return the user's latest form data, including unflushed autosaves"""
+    field = str(user_id)
+    if USE_REDIS:
+        current = redis_client.hget(PENDING_KEY, field)
+    else:
+        with _lock:
+            current = _pending.get(field)
+    if current is not None:
+        return json.loads(current)
+    return _load_saved(user_id)
+
+
+def flush(batch_size: Optional[int] = None) -> int:
+    """
+    Write buffered form data to the database in one transaction per batch.
+    Entries are removed from the buffer only after the commit, and only if
+    no newer autosave replaced them in the meantime.
+    One flusher at a time owns the buffer: with Redis, a lock shared by every
+    worker (a worker that finds it taken skips this round); in memory, a
+    process lock. Two flushers committing different snapshots of the same
+    entry could otherwise leave the older one in the database.
+    Returns:
+        int: Number of users flushed
+    """
+    if USE_REDIS:
+        lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return 0
+    else:
+        lock = _flush_lock
+        lock.acquire()
+    try:
+        return _flush_owned(lock, batch_size)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # Expired during the flush; the next flusher picks up what is left
+            pass
+
+
+def _flush_owned(lock, batch_size: Optional[int]) -> int:
+    if USE_REDIS:
+        snapshot = redis_client.hgetall(PENDING_KEY)
+    else:
+        with _lock:
+            snapshot = dict(_pending)
+    if not snapshot:
+        return 0
+
+    items = list(snapshot.items())
+    batch_size = batch_size or Config.AUTOSAVE_FLUSH_THRESHOLD
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        try:
+            db.session.execute(
+                update(User),
+                [{'id': int(field), 'last_submitted_form_data': json.loads(value)} for field, value in batch]
+            )
+            if USE_REDIS:
+                # Raises LockNotOwnedError once another flusher may have taken over
+                lock.reacquire()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if USE_REDIS:
+            for field, value in batch:
+                _compare_and_delete(keys=[PENDING_KEY], args=[field, value])
+        else:
+            with _lock:
+                for field, value in batch:
+                    if _pending.get(field) is value:
+                        del _pending[field]
+
+    logger.info(f"💾 Flushed autosaved form data for {len(items)} users")
+    return len(items)
+
+
+def _run_flusher(app):
+    while True:
+        _flush_event.wait(Config.AUTOSAVE_FLUSH_INTERVAL)
+        _flush_event.clear()
+        try:
+            with app.app_context():
+                flush()
+        except Exception as e:
+            logger.error(f"❌ Autosave flush failed: {str(e)}")
+
+
+def _flush_at_exit(app):
+    try:
+        with app.app_context():
+            flush()
+    except Exception as e:
+        logger.error(f"❌ Autosave flush at exit failed: {str(e)}")
+
+
+def _ensure_flusher():
+    """Start this process's background flush thread on first use"""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    from flask import current_app
+    app = current_app._get_current_object()
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_run_flusher, args=(app,), name='autosave-flusher', daemon=True)
+            _flusher.start()
+            if not USE_REDIS:
+                # The in-memory buffer dies with the process
+                atexit.register(_flush_at_exit, app)
+
@@ -19,7 +19,129 @@ class Config:
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
     REDIS_DB = int(os.getenv("REDIS_DB", 0))
+    REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2))
+    
+    # Read replicas: comma-separated URLs; without any, a read-only pool on
+    # the primary SQLite file is used when DATABASE_LOCAL_REPLICA is set
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(',') if u.strip()]
+    DATABASE_LOCAL_REPLICA = os.getenv("DATABASE_LOCAL_REPLICA", "True").lower() in ('true', '1', 't')
+    # After a user's write commits, their reads go to the primary for this long
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
     
     # OTP Configuration
     OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 300))  # 5 minutes
     OTP_LENGTH = int(os.getenv("OTP_LENGTH", 6))
+    # Repeat logins reuse the active OTP; its email is re-sent at most once per cooldown
+    OTP_RESEND_COOLDOWN_SECONDS = int(os.getenv("OTP_RESEND_COOLDOWN_SECONDS", 30))
+    # An active OTP with less lifetime left than this is replaced rather than reused
+    OTP_REUSE_MIN_TTL_SECONDS = int(os.getenv("OTP_REUSE_MIN_TTL_SECONDS", 60))
+
+    # Readiness probes (/readyz): per-check timeout, result cache, and the
+    # checks whose failure makes the instance unready (others are reported only)
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 1))
+    HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", 5))
+    HEALTH_CRITICAL_CHECKS = [c.strip() for c in os.getenv("HEALTH_CRITICAL_CHECKS", "database,redis").split(',') if c.strip()]
+
+    # On-demand request profiling. Off means no hook is installed at all.
+    # Profiled requests are a PROFILE_SAMPLE_RATE fraction of calls to
+    # PROFILE_ENDPOINTS (all when empty), plus any request carrying a valid
+    # X-Profile header signed with PROFILE_SECRET (see `flask profile token`)
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() in ('true', '1', 't')
+    PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_ENDPOINTS = [e.strip() for e in os.getenv("PROFILE_ENDPOINTS", "main.schedule_pickup,main.verify_otp_route,main.login,main.dashboard").split(',') if e.strip()]
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+    # Empty: an owner-only "profiles" directory in the app's instance folder
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+
+    # Memory instrumentation: worker RSS gauges are always kept; with
+    # MEMORY_TRACE_ENABLED, tracemalloc records the allocation peak of a
+    # MEMORY_TRACE_SAMPLE_RATE fraction of requests (see /debug/memory)
+    MEMORY_TRACE_ENABLED = os.getenv("MEMORY_TRACE_ENABLED", "False").lower() in ('true', '1', 't')
+    MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", 10))
+    MEMORY_TRACE_SAMPLE_RATE = float(os.getenv("MEMORY_TRACE_SAMPLE_RATE", 0.1))
+    MEMORY_PEAK_LOG_MB = float(os.getenv("MEMORY_PEAK_LOG_MB", 50))
+    MEMORY_GAUGE_INTERVAL = float(os.getenv("MEMORY_GAUGE_INTERVAL", 10))
+
+    # Token-bucket rate limits for the OTP routes, as "count/seconds"
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ('true', '1', 't')
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are
+    # trusted (0 when clients connect directly, or they could spoof their IP)
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
+    RATE_LIMIT_LOGIN_IP = os.getenv("RATE_LIMIT_LOGIN_IP", "20/60")
+    RATE_LIMIT_LOGIN_EMAIL = os.getenv("RATE_LIMIT_LOGIN_EMAIL", "5/300")
+    RATE_LIMIT_VERIFY_IP = os.getenv("RATE_LIMIT_VERIFY_IP", "30/60")
+    RATE_LIMIT_VERIFY_EMAIL = os.getenv("RATE_LIMIT_VERIFY_EMAIL", "10/300")
+
+    # API tokens for staff/collector JSON endpoints, as "name:token[:role]" pairs
+    API_TOKENS = os.getenv("API_TOKENS", "")
+
+    # Jinja template bytecode cache: "filesystem", "redis" or "none"
+    TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "filesystem").lower()
+    # Owner-only directory; empty uses instance/jinja-cache
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "")
+    TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "True").lower() in ('true', '1', 't')
+
+    # Autosave write-behind buffer for /api/form-submit
+    AUTOSAVE_MAX_BYTES = int(os.getenv("AUTOSAVE_MAX_BYTES", 64 * 1024))
+    AUTOSAVE_FLUSH_INTERVAL = float(os.getenv("AUTOSAVE_FLUSH_INTERVAL", 5))
+    AUTOSAVE_FLUSH_THRESHOLD = int(os.getenv("AUTOSAVE_FLUSH_THRESHOLD", 200))
+
+    # Idempotency keys for form submissions
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 5))
+
+    # Order event outbox relay
+    OUTBOX_STREAM = os.getenv("OUTBOX_STREAM", "orders:events")
+    OUTBOX_STREAM_MAXLEN = int(os.getenv("OUTBOX_STREAM_MAXLEN", 100000))
+    OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", 1))
+    OUTBOX_RELAY_IN_PROCESS = os.getenv("OUTBOX_RELAY_IN_PROCESS", "False").lower() in ('true', '1', 't')
+    NOTIFY_MAX_BATCH = int(os.getenv("NOTIFY_MAX_BATCH", 500))
+
+    # Collector delta-sync API
+    SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 100))
+    SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", 500))
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+    # Postal code directory (postal_code,city,state,state_code CSV), compiled
+    # to a memory-mapped index shared by the workers on a host. The bundled
+    # CSV is a placeholder of a few dozen codes: point POSTAL_DATA_PATH at the
+    # full PIN directory in production. An empty index path uses the
+    # instance folder.
+    POSTAL_DATA_PATH = os.getenv("POSTAL_DATA_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'postal_codes.sample.csv'))
+    POSTAL_INDEX_PATH = os.getenv("POSTAL_INDEX_PATH", "")
+    # Reject postal codes missing from the directory (enable with a complete dataset)
+    POSTAL_REQUIRE_KNOWN = os.getenv("POSTAL_REQUIRE_KNOWN", "False").lower() in ('true', '1', 't')
+
+    # Group commit: request writes are batched into one SQLite transaction by
+    # a writer thread, collecting for up to GROUP_COMMIT_WINDOW_MS
+    GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "True").lower() in ('true', '1', 't')
+    GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 2))
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+    GROUP_COMMIT_TIMEOUT = float(os.getenv("GROUP_COMMIT_TIMEOUT", 30))
+    GROUP_COMMIT_BUSY_TIMEOUT = float(os.getenv("GROUP_COMMIT_BUSY_TIMEOUT", 10))
+
+    # "server" keeps session data in Redis (process memory without Redis)
+    # behind an opaque cookie id; "cookie" uses Flask's signed cookie
+    SESSION_STORE = os.getenv("SESSION_STORE", "server").lower()
+    SESSION_LOCAL_MAX_ENTRIES = int(os.getenv("SESSION_LOCAL_MAX_ENTRIES", 10000))
+
+    # Order search API
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 20))
+    SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", 100))
+    SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 1000))
+
+    # Address history compaction: only rows superseded for this long are moved
+    ADDRESS_COMPACTION_GRACE_MINUTES = int(os.getenv("ADDRESS_COMPACTION_GRACE_MINUTES", 60))
+
+    # Pickup photos: "inline" keeps new uploads as base64 in order.images,
+    # "disk" writes them to IMAGE_DIR (see `flask images offload`)
+    IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "inline").lower()
+    IMAGE_DIR = os.getenv("IMAGE_DIR", os.path.join(os.getcwd(), 'images'))
+    # Internal nginx location mapped to IMAGE_DIR; empty serves files from the app
+    IMAGE_ACCEL_REDIRECT_PREFIX = os.getenv("IMAGE_ACCEL_REDIRECT_PREFIX", "")
+
+    # Order archival tier
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.getcwd(), 'archive'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+    ARCHIVE_STATUSES = [s.strip() for s in os.getenv("ARCHIVE_STATUSES", "collected,cancelled").split(',') if s.strip()]
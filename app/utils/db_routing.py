@@ -0,0 +1,133 @@
+import logging
+import random
+import re
+import time
+from flask import has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.elements import TextClause
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = 'replica_'
+STICKY_SESSION_KEY = '_db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Raw text() statements that only read; anything else (WITH ... DELETE,
+# PRAGMA, DDL) is treated as a write
+_TEXT_SELECT = re.compile(r'^\s*(?:--[^\n]*\n\s*)*\(?\s*SELECT\b', re.IGNORECASE)
+
+
+def replica_binds(primary_uri: str) -> dict:
+    """
+    SQLALCHEMY_BINDS entries for the read replicas: DATABASE_REPLICA_URLS,
+    or a read-only connection pool on the primary SQLite file when
+    DATABASE_LOCAL_REPLICA is set
+    """
+    urls = Config.DATABASE_REPLICA_URLS
+    if not urls and Config.DATABASE_LOCAL_REPLICA:
+        url = make_url(primary_uri)
+        if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+            urls = [f"sqlite:///file:{url.database}?mode=ro&uri=true"]
+    return {f"{REPLICA_PREFIX}{i}": url for i, url in enumerate(urls)}
+
+
+def _is_read(clause) -> bool:
+    """Whether a statement only reads: judged by what it does, not its class"""
+    if isinstance(clause, TextClause):
+        return bool(_TEXT_SELECT.match(clause.text))
+    return bool(getattr(clause, 'is_select', False))
+
+
+def _primary_is_sticky() -> bool:
+    return flask_session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica and everything else to the primary.
+    Only SELECTs issued while handling a GET/HEAD request are routed; CLI
+    jobs, background threads and POST handlers (which read-modify-write)
+    stay on the primary. Once the session writes, it stays on the primary,
+    and after a write commits the user's next requests read from the
+    primary for REPLICA_STICKY_SECONDS, so they see their own changes
+    despite replication lag.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+
+        if clause is None:
+            return engine
+        if not _is_read(clause):
+            if not self._flushing:
+                # Core INSERT/UPDATE/DELETE (or raw write SQL) through session.execute()
+                self.info['wrote'] = True
+            return engine
+
+        if self._use_replica(clause):
+            return self._replica() or engine
+        return engine
+
+    def _use_replica(self, clause) -> bool:
+        if self._flushing or self.info.get('wrote') or self.info.get('use_primary'):
+            return False
+        if getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if not has_request_context() or request.method not in SAFE_METHODS:
+            return False
+        return not _primary_is_sticky()
+
+    def _replica(self):
+        """Pick a replica once per session so its reads see one snapshot"""
+        if 'replica' not in self.info:
+            keys = [key for key in self._db.engines if isinstance(key, str) and key.startswith(REPLICA_PREFIX)]
+            self.info['replica'] = random.choice(keys) if keys else None
+        key = self.info['replica']
+        return self._db.engines[key] if key else None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+def mark_primary_sticky():
+    """Keep this user's reads on the primary for a while after a committed write"""
+    if has_request_context() and Config.REPLICA_STICKY_SECONDS > 0:
+        # Only browser sessions read their writes back; an empty session
+        # (token API clients) would otherwise be stored just for this flag
+        if flask_session:
+            flask_session[STICKY_SESSION_KEY] = time.time() + Config.REPLICA_STICKY_SECONDS
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if session.info.get('wrote'):
+        mark_primary_sticky()
+
+
+def use_primary(session):
+    """Send every remaining query of this session to the primary"""
+    session.info['use_primary'] = True
+
+
+def init_db_routing(app, db):
+    """Switch the primary SQLite database to WAL so the read-only pool does not block writers"""
+    if not any(key.startswith(REPLICA_PREFIX) for key in app.config.get('SQLALCHEMY_BINDS', {})):
+        return
+    with app.app_context():
+        primary = db.engines[None]
+        if primary.dialect.name != 'sqlite':
+            return
+
+        @event.listens_for(primary, 'connect')
+        def _enable_wal(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.close()
+
+    logger.info(f"📚 Routing reads to {len(app.config['SQLALCHEMY_BINDS'])} replica(s)")
@@ -0,0 +1,183 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+from flask import current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from .. import db
+from .config import Config
+from .db_routing import mark_primary_sticky
+
+logger = logging.getLogger(__name__)
+
+# A write unit is a callable taking the writer's Session. It adds or changes
+# rows (flushing when it needs generated ids) and returns plain values, e.g.
+# the new order_id. It must not commit, should create its ORM objects itself
+# (not reuse ones attached to the request's db.session), and may run twice:
+# when another unit of its batch fails, the batch is rolled back and replayed
+# without that unit.
+WriteUnit = Callable[[Session], Any]
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that commits many requests' write units in one
+    SQLite transaction, so one fsync covers the whole batch
+    """
+
+    def __init__(self, app):
+        self._app = app
+        self._queue = queue.Queue()
+        self._thread = None
+        self._engine = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.units = 0
+
+    def submit(self, unit: WriteUnit) -> Future:
+        """Queue a unit for the next batch; the future resolves once it is committed"""
+        future = Future()
+        if self._thread is None:
+            # Started on first use, so the thread lives in the serving process
+            # (gunicorn forks workers after create_app)
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                    self._thread.start()
+        self._queue.put((unit, future))
+        return future
+
+    def stop(self, timeout: float = 5):
+        """Commit what is queued, then stop the thread and close its connections"""
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def _create_engine(self):
+        # A connection of its own where SQLAlchemy, not pysqlite, starts the
+        # transaction: BEGIN IMMEDIATE takes the write lock up front, waiting
+        # on the busy timeout instead of failing later with "database is locked"
+        engine = create_engine(
+            db.engines[None].url,
+            connect_args={'timeout': Config.GROUP_COMMIT_BUSY_TIMEOUT, 'check_same_thread': False},
+        )
+
+        @event.listens_for(engine, 'connect')
+        def _autocommit(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, 'begin')
+        def _begin_immediate(connection):
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+        return engine
+
+    def _next_batch(self) -> tuple:
+        """Block for one unit, then gather whatever else arrives within the window"""
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return [], True
+        deadline = time.monotonic() + Config.GROUP_COMMIT_WINDOW_MS / 1000
+        while len(batch) < Config.GROUP_COMMIT_MAX_BATCH:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        with self._app.app_context():
+            if self._engine is None:
+                self._engine = self._create_engine()
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list):
+        pending = [(unit, future) for unit, future in batch if future.set_running_or_notify_cancel()]
+        while pending:
+            done = []
+            failed = None
+            with Session(self._engine, expire_on_commit=False) as session:
+                try:
+                    for unit, future in pending:
+                        try:
+                            result = unit(session)
+                            session.flush()
+                        except Exception as e:
+                            failed = (future, e)
+                            break
+                        done.append((future, result))
+                    if failed is None:
+                        session.commit()
+                except Exception as e:
+                    logger.error(f"❌ Group commit of {len(pending)} writes failed: {str(e)}")
+                    for _, future in pending:
+                        future.set_exception(e)
+                    return
+
+            if failed is None:
+                self.batches += 1
+                self.units += len(done)
+                for future, result in done:
+                    future.set_result(result)
+                return
+
+            # Closing the session rolled the whole batch back: fail that unit
+            # and replay the others (failures are rare, savepoints per unit
+            # would cost two extra statements on every write)
+            failed[0].set_exception(failed[1])
+            pending = [(unit, future) for unit, future in pending if future is not failed[0]]
+
+
+def run_write(unit: WriteUnit, timeout: Optional[float] = None) -> Any:
+    """
+    Run a write unit and return its result once it is committed. With group
+    commit it joins the writer's next batch; otherwise it runs on db.session
+    and commits right away.
+    Raises:
+        Whatever the unit raised, or the error of the failed commit
+    """
+    writer = current_app.extensions.get('group_commit')
+    if writer is None:
+        try:
+            result = unit(db.session)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+
+    result = writer.submit(unit).result(timeout or Config.GROUP_COMMIT_TIMEOUT)
+    # The writer's session is not a RoutingSession; keep read-your-writes
+    mark_primary_sticky()
+    return result
+
+
+def init_group_commit(app):
+    """Route request writes through a group-commit writer when the primary is SQLite"""
+    if not Config.GROUP_COMMIT_ENABLED:
+        return
+    with app.app_context():
+        if db.engines[None].dialect.name != 'sqlite':
+            return
+    writer = GroupCommitWriter(app)
+    app.extensions['group_commit'] = writer
+    atexit.register(writer.stop)
+    logger.info(f"🧺 Group commit enabled ({Config.GROUP_COMMIT_WINDOW_MS}ms window, up to {Config.GROUP_COMMIT_MAX_BATCH} writes)")
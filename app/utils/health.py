@@ -0,0 +1,114 @@
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import jsonify
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from sqlalchemy import text
+from .config import Config
+from .redis_store import create_redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='readiness')
+_cache = {'checked_at': 0.0, 'result': None}
+_lock = threading.Lock()
+
+
+def create_redis_probe():
+    """
+    Redis client for the readiness probe. The shared client has no read
+    timeout, so a hung Redis would block a probe thread forever (and the
+    pool after three); this one gives up after one HEALTH_CHECK_TIMEOUT
+    instead of retrying.
+    """
+    return create_redis_client(socket_timeout=Config.HEALTH_CHECK_TIMEOUT, retry=Retry(NoBackoff(), 0))
+
+
+_redis_probe = create_redis_probe() if USE_REDIS else None
+
+
+def _check_database(app):
+    from .. import db
+    with app.app_context():
+        with db.engines[None].connect() as conn:
+            conn.execute(text('SELECT 1'))
+    return 'ok'
+
+
+def _check_redis(app):
+    if not USE_REDIS:
+        return 'disabled'
+    _redis_probe.ping()
+    return 'ok'
+
+
+def _check_mail(app):
+    # A TCP connect is enough to know the SMTP server is reachable, without
+    # spending a login (and quota) every few seconds
+    if not Config.MAIL_USERNAME:
+        return 'disabled'
+    with socket.create_connection((Config.MAIL_SERVER, Config.MAIL_PORT), timeout=Config.HEALTH_CHECK_TIMEOUT):
+        pass
+    return 'ok'
+
+
+CHECKS = {
+    'database': _check_database,
+    'redis': _check_redis,
+    'mail': _check_mail,
+}
+
+
+def run_checks(app) -> dict:
+    """
+    Probe every dependency concurrently, each bounded by HEALTH_CHECK_TIMEOUT
+    Returns:
+        dict mapping check name to 'ok', 'disabled', or an error description
+    """
+    futures = {name: _executor.submit(check, app) for name, check in CHECKS.items()}
+    wait(futures.values(), timeout=Config.HEALTH_CHECK_TIMEOUT)
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            results[name] = 'timeout'
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = f"error: {type(e).__name__}"
+            logger.warning(f"⚠️ Readiness check {name} failed: {str(e)}")
+    return results
+
+
+def readiness(app) -> dict:
+    """Cached readiness; one request re-probes per HEALTH_CACHE_SECONDS while others wait for it"""
+    with _lock:
+        now = time.monotonic()
+        if _cache['result'] is None or now - _cache['checked_at'] >= Config.HEALTH_CACHE_SECONDS:
+            checks = run_checks(app)
+            ready = all(checks.get(name) in ('ok', 'disabled') for name in Config.HEALTH_CRITICAL_CHECKS)
+            _cache['result'] = {'ready': ready, 'checks': checks}
+            _cache['checked_at'] = now
+        return _cache['result']
+
+
+def init_health(app):
+    """
+    Register /healthz (liveness) and /readyz (readiness) on the app itself,
+    outside the main blueprint, so its before_request hooks never run for them
+    """
+    def healthz():
+        return 'ok\n', 200, {'Content-Type': 'text/plain; charset=utf-8', 'Cache-Control': 'no-store'}
+
+    def readyz():
+        result = readiness(app)
+        response = jsonify(result)
+        response.status_code = 200 if result['ready'] else 503
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    app.add_url_rule('/healthz', endpoint='healthz', view_func=healthz)
+    app.add_url_rule('/readyz', endpoint='readyz', view_func=readyz)
@@ -0,0 +1,133 @@
+import json
+import re
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from .. import db
+from ..models import IdempotencyKey
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+IN_FLIGHT = 'in_flight'
+COMPLETED = 'completed'
+
+_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,100}$')
+
+
+def generate_key() -> str:
+    """Generate a key to embed in a form"""
+    return secrets.token_urlsafe(24)
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(key) and _KEY_PATTERN.match(key) is not None
+
+
+def _store_key(scope: str, key: str) -> str:
+    return f"idem:{scope}:{key}"
+
+
+def claim(scope: str, key: str) -> Optional[dict]:
+    """
+    Atomically claim a key for processing, across all workers
+    Args:
+        scope: Namespace for the key, e.g. "pickup:<email>"
+        key: Client-supplied idempotency key
+    Returns:
+        None if the caller now owns the key, otherwise the existing record
+        ({'status': 'in_flight'} or {'status': 'completed', 'result': ...})
+    """
+    store_key = _store_key(scope, key)
+    ttl = Config.IDEMPOTENCY_TTL_SECONDS
+
+    if USE_REDIS:
+        if redis_client.set(store_key, json.dumps({'status': IN_FLIGHT}), nx=True, ex=ttl):
+            return None
+        existing = redis_client.get(store_key)
+        # The key may have expired between SET and GET
+        return json.loads(existing) if existing else claim(scope, key)
+
+    now = datetime.utcnow()
+    try:
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+        db.session.add(IdempotencyKey(key=store_key, status=IN_FLIGHT, expires_at=now + timedelta(seconds=ttl)))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+        return get_record(scope, key) or claim(scope, key)
+
+
+def get_record(scope: str, key: str) -> Optional[dict]:
+    """Return the stored record for a key, or None"""
+    store_key = _store_key(scope, key)
+    if USE_REDIS:
+        existing = redis_client.get(store_key)
+        return json.loads(existing) if existing else None
+
+    row = db.session.get(IdempotencyKey, store_key, populate_existing=True)
+    if row is None or row.expires_at < datetime.utcnow():
+        return None
+    return {'status': row.status, 'result': row.result}
+
+
+def complete(scope: str, key: str, result: dict, session=None):
+    """
+    Record the result of a claimed key inside the write it describes.
+    With the database store this joins the caller's transaction, so the
+    result is committed atomically with the work. Redis cannot join the
+    transaction: there the result is written by complete_committed() once
+    the work has committed, and this is a no-op.
+    """
+    if USE_REDIS:
+        return
+
+    session = session or db.session
+    row = session.get(IdempotencyKey, _store_key(scope, key))
+    if row is not None:
+        row.status = COMPLETED
+        row.result = result
+
+
+def complete_committed(scope: str, key: str, result: dict):
+    """
+    Record the result of a claimed key after its write has committed (Redis
+    store; the database store already committed it with complete()). Until
+    then, duplicates see the key in flight, never a result that could still
+    be rolled back.
+    """
+    if USE_REDIS:
+        redis_client.set(
+            _store_key(scope, key),
+            json.dumps({'status': COMPLETED, 'result': result}),
+            ex=Config.IDEMPOTENCY_TTL_SECONDS
+        )
+
+
+def release(scope: str, key: str):
+    """Drop an in-flight claim after a failure so the client can retry"""
+    store_key = _store_key(scope, key)
+    if USE_REDIS:
+        redis_client.delete(store_key)
+        return
+
+    try:
+        db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == store_key, IdempotencyKey.status == IN_FLIGHT)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+def wait_for_result(scope: str, key: str, timeout: Optional[float] = None) -> Optional[dict]:
+    """Poll an in-flight key until it completes, is released or times out"""
+    deadline = time.monotonic() + (Config.IDEMPOTENCY_WAIT_SECONDS if timeout is None else timeout)
+    while True:
+        record = get_record(scope, key)
+        if record is None or record['status'] == COMPLETED or time.monotonic() >= deadline:
+            return record
+        time.sleep(0.1)
@@ -0,0 +1,272 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+from flask import Response, request, send_file
+from sqlalchemy import select, update
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from .. import db
+from ..models import Order
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Order.images holds one entry per photo: either the original base64 string,
+# or a reference to a content-addressed file under IMAGE_DIR:
+#   {"sha256": "<hex digest>", "type": "image/jpeg", "size": 123456}
+# Entries are never edited after the order is inserted, except by
+# `flask images offload`, which swaps a string for a reference to the same bytes.
+CACHE_MAX_AGE = 365 * 24 * 3600
+DECODE_CHUNK_CHARS = 64 * 1024  # base64 characters per decoded chunk (multiple of 4)
+
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+def sniff_type(head: bytes) -> str:
+    """Content type from the first bytes of an image; uploads carry no trustworthy type"""
+    for signature, mimetype in _SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def image_path(sha256: str) -> str:
+    return os.path.join(Config.IMAGE_DIR, sha256[:2], sha256)
+
+
+def store_image(content: bytes) -> dict:
+    """
+    Write image bytes under IMAGE_DIR, named by their SHA-256, through a temp
+    file and rename so readers never see a partial file
+    Returns:
+        dict: Order.images entry referencing the file
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = image_path(sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    return {'sha256': sha256, 'type': sniff_type(content[:16]), 'size': len(content)}
+
+
+def encode_upload(content: bytes):
+    """Order.images entry for an uploaded photo, stored as IMAGE_STORAGE says"""
+    if Config.IMAGE_STORAGE == 'disk':
+        return store_image(content)
+    return base64.b64encode(content).decode('ascii')
+
+
+@dataclass
+class StoredImage:
+    order_id: int
+    index: int
+    user_email: str
+    assigned_collector: Optional[str]
+    etag: str
+    mimetype: str
+    size: int
+    path: Optional[str] = None  # on-disk images only
+
+
+def _element(index: int):
+    return db.func.json_extract(Order.images, f'$[{index}]')
+
+
+def find_image(order_id: int, index: int, session=None) -> Optional[StoredImage]:
+    """
+    Describe one photo of an order without reading the others. SQLite picks
+    the element out of the JSON column and returns only its length, first
+    bytes and padding, or the small reference object of an on-disk image.
+    Returns:
+        StoredImage, or None when the order or photo does not exist
+    """
+    session = session or db.session
+    element = _element(index)
+    kind = db.func.json_type(Order.images, f'$[{index}]')
+    row = session.execute(
+        select(
+            Order.user_email, Order.assigned_collector, Order.date, kind.label('kind'),
+            db.case((kind == 'object', element)).label('reference'),
+            db.case((kind == 'text', db.func.length(element))).label('length'),
+            db.case((kind == 'text', db.func.substr(element, 1, 24))).label('head'),
+            db.case((kind == 'text', db.func.substr(element, -2))).label('tail'),
+        ).where(Order.order_id == order_id)
+    ).one_or_none()
+    if row is None or row.kind not in ('text', 'object'):
+        return None
+
+    if row.kind == 'object':
+        reference = json.loads(row.reference)
+        return StoredImage(
+            order_id, index, row.user_email, row.assigned_collector,
+            etag=reference['sha256'], mimetype=reference.get('type') or 'application/octet-stream',
+            size=reference.get('size', 0), path=image_path(reference['sha256'])
+        )
+
+    try:
+        head = base64.b64decode(row.head)
+    except (binascii.Error, ValueError):
+        logger.warning(f"⚠️ Order {order_id} image {index} is not valid base64")
+        return None
+    # Inline entries never change while the order exists; the order date
+    # tells a reused order_id apart
+    return StoredImage(
+        order_id, index, row.user_email, row.assigned_collector,
+        etag=f"{order_id}-{index}-{row.date.timestamp():.6f}-{row.length}",
+        mimetype=sniff_type(head), size=row.length // 4 * 3 - row.tail.count('=')
+    )
+
+
+def _set_cache_headers(response: Response, image: StoredImage):
+    response.set_etag(image.etag)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+
+
+def _requested_span(image: StoredImage) -> Optional[Tuple[int, int]]:
+    """(start, stop) of a single satisfiable Range request, or None to send everything"""
+    byte_range = request.range
+    if byte_range is None or byte_range.units != 'bytes' or image.size == 0:
+        return None
+    if_range = request.if_range
+    if if_range.date is not None or (if_range.etag is not None and if_range.etag != image.etag):
+        return None
+    if len(byte_range.ranges) != 1:
+        # Multipart ranges are rare for images; the whole body is a valid answer
+        return None
+    span = byte_range.range_for_length(image.size)
+    if span is None:
+        raise RequestedRangeNotSatisfiable(length=image.size)
+    return span
+
+
+def _decode_chunks(encoded: str, skip: int, length: int) -> Iterator[bytes]:
+    """Decode base64 a chunk at a time, dropping `skip` leading bytes and stopping after `length`"""
+    for offset in range(0, len(encoded), DECODE_CHUNK_CHARS):
+        chunk = base64.b64decode(encoded[offset:offset + DECODE_CHUNK_CHARS])
+        if skip:
+            chunk, skip = chunk[skip:], 0
+        chunk = chunk[:length]
+        length -= len(chunk)
+        if chunk:
+            yield chunk
+        if not length:
+            break
+
+
+def _inline_response(image: StoredImage, session=None) -> Response:
+    session = session or db.session
+    response = Response(mimetype=image.mimetype)
+    response.accept_ranges = 'bytes'
+    _set_cache_headers(response, image)
+    if request.if_none_match.contains_weak(image.etag):
+        response.status_code = 304
+        return response
+
+    span = _requested_span(image)
+    start, stop = span or (0, image.size)
+    if span:
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, stop, image.size)
+    response.content_length = stop - start
+    if request.method == 'HEAD' or start == stop:
+        return response
+
+    # Fetch only the base64 characters covering the requested bytes (4 chars
+    # per 3 bytes), then decode them lazily as the response is written
+    first_char = start // 3 * 4
+    end_char = -(-stop // 3) * 4
+    encoded = session.execute(
+        select(db.func.substr(_element(image.index), first_char + 1, end_char - first_char))
+        .where(Order.order_id == image.order_id)
+    ).scalar() or ''
+    response.response = _decode_chunks(encoded, start % 3, stop - start)
+    return response
+
+
+def _file_response(image: StoredImage) -> Response:
+    if Config.IMAGE_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the file from an internal location, ranges included
+        response = Response(mimetype=image.mimetype)
+        _set_cache_headers(response, image)
+        response.make_conditional(request)
+        if response.status_code != 304:
+            relative = os.path.relpath(image.path, Config.IMAGE_DIR)
+            response.headers['X-Accel-Redirect'] = f"{Config.IMAGE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative}"
+        return response
+
+    # send_file handles conditional and range requests itself, and hands the
+    # file to the server's wsgi.file_wrapper (sendfile under gunicorn)
+    response = send_file(
+        image.path, mimetype=image.mimetype, etag=image.etag, conditional=True, max_age=CACHE_MAX_AGE
+    )
+    _set_cache_headers(response, image)
+    return response
+
+
+def image_response(image: StoredImage, session=None) -> Response:
+    """
+    Serve one photo with a strong ETag, conditional GET, single byte ranges
+    and a year-long private cache lifetime
+    """
+    if image.path:
+        if not os.path.exists(image.path):
+            logger.error(f"❌ Image file missing for order {image.order_id}: {image.path}")
+            return Response('Image not found', status=404, mimetype='text/plain')
+        return _file_response(image)
+    return _inline_response(image, session)
+
+
+def offload_inline_images(batch_size: int = 50) -> int:
+    """
+    Move base64 photos out of Order.images into IMAGE_DIR, in order_id
+    batches with a commit per batch. updated_at is left alone: the photos
+    themselves do not change.
+    Returns:
+        int: Number of photos moved
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Order.order_id, Order.images)
+            .where(Order.order_id > last_id)
+            .order_by(Order.order_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for order_id, entries in rows:
+            inline = [entry for entry in entries or [] if isinstance(entry, str)]
+            if not inline:
+                continue
+            references = [store_image(base64.b64decode(entry)) if isinstance(entry, str) else entry for entry in entries]
+            db.session.execute(
+                update(Order).where(Order.order_id == order_id)
+                .values(images=references, updated_at=Order.updated_at)
+            )
+            moved += len(inline)
+        db.session.commit()
+        last_id = rows[-1].order_id
+        logger.info(f"🖼️ Offloaded {moved} images up to order_id {last_id}")
+    return moved
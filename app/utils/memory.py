@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from typing import Optional
+from flask import g, jsonify, request
+from .api_auth import api_token_required
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+# Every worker publishes its gauges under one hash field (its pid), so the
+# debug endpoint can show all workers, whichever one answers
+WORKERS_KEY = 'memory:workers'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Only one request at a time owns tracemalloc's peak counter
+_trace_lock = threading.Lock()
+_stats_lock = threading.Lock()
+# endpoint -> {'requests', 'total', 'max'} of traced peak bytes
+_endpoint_peaks = {}
+_gauges = {'requests': 0, 'published_at': 0.0}
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """Highest RSS this process has reached (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def worker_gauges() -> dict:
+    return {
+        'pid': os.getpid(),
+        'rss_bytes': rss_bytes(),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'requests': _gauges['requests'],
+        'traced_bytes': tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        'updated_at': time.time(),
+    }
+
+
+def _publish_gauges():
+    """Report this worker's gauges at most every MEMORY_GAUGE_INTERVAL seconds"""
+    now = time.time()
+    if now - _gauges['published_at'] < Config.MEMORY_GAUGE_INTERVAL:
+        return
+    _gauges['published_at'] = now
+    if not USE_REDIS:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(WORKERS_KEY, str(os.getpid()), json.dumps(worker_gauges()))
+        pipe.expire(WORKERS_KEY, int(Config.MEMORY_GAUGE_INTERVAL * 10))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not publish memory gauges: {str(e)}")
+
+
+def all_worker_gauges() -> list:
+    """Gauges of every worker that reported recently, this one freshly measured"""
+    workers = {os.getpid(): worker_gauges()}
+    if USE_REDIS:
+        stale_before = time.time() - Config.MEMORY_GAUGE_INTERVAL * 3
+        for pid, raw in redis_client.hgetall(WORKERS_KEY).items():
+            gauges = json.loads(raw)
+            if int(pid) not in workers and gauges['updated_at'] >= stale_before:
+                workers[int(pid)] = gauges
+    return sorted(workers.values(), key=lambda w: w['pid'])
+
+
+def top_allocations(limit: int = 20, key_type: str = 'lineno') -> Optional[list]:
+    """
+    Largest live allocation sites from a tracemalloc snapshot
+    Args:
+        limit: Number of sites to return
+        key_type: Group by 'lineno', 'filename' or 'traceback'
+    Returns:
+        list of sites, or None when tracing is off
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+    return [
+        {
+            'size_bytes': stat.size,
+            'count': stat.count,
+            'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        }
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+def _start_trace():
+    if not tracemalloc.is_tracing() or random.random() >= Config.MEMORY_TRACE_SAMPLE_RATE:
+        return
+    if _trace_lock.acquire(blocking=False):
+        tracemalloc.reset_peak()
+        g._memory_trace_start = tracemalloc.get_traced_memory()[0]
+
+
+def _finish_trace(exc):
+    start = g.pop('_memory_trace_start', None)
+    if start is not None:
+        peak = tracemalloc.get_traced_memory()[1] - start
+        _trace_lock.release()
+        endpoint = request.endpoint or 'unmatched'
+        with _stats_lock:
+            stats = _endpoint_peaks.setdefault(endpoint, {'requests': 0, 'total': 0, 'max': 0})
+            stats['requests'] += 1
+            stats['total'] += peak
+            stats['max'] = max(stats['max'], peak)
+        if peak >= Config.MEMORY_PEAK_LOG_MB * 1024 * 1024:
+            logger.warning(f"🧠 {request.method} {request.path} peaked at {peak / 1048576:.1f} MiB above its baseline")
+
+    with _stats_lock:
+        _gauges['requests'] += 1
+    _publish_gauges()
+
+
+def endpoint_peaks() -> dict:
+    with _stats_lock:
+        return {
+            endpoint: {
+                'requests': stats['requests'],
+                'mean_peak_bytes': stats['total'] // stats['requests'],
+                'max_peak_bytes': stats['max'],
+            }
+            for endpoint, stats in sorted(_endpoint_peaks.items(), key=lambda item: -item[1]['max'])
+        }
+
+
+def init_memory(app):
+    """
+    Track worker RSS on every request and, with MEMORY_TRACE_ENABLED, the
+    allocation peak of a MEMORY_TRACE_SAMPLE_RATE fraction of requests.
+    Registers the staff-only /debug/memory endpoint.
+    """
+    if Config.MEMORY_TRACE_ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start(Config.MEMORY_TRACE_FRAMES)
+        logger.info(f"🧠 tracemalloc started ({Config.MEMORY_TRACE_FRAMES} frames, sampling {Config.MEMORY_TRACE_SAMPLE_RATE:.0%} of requests)")
+
+    app.before_request(_start_trace)
+    app.teardown_request(_finish_trace)
+
+    @api_token_required()
+    def memory_debug():
+        try:
+            limit = min(int(request.args.get('limit', 20)), 100)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        key_type = request.args.get('group_by', 'lineno')
+        if key_type not in ('lineno', 'filename', 'traceback'):
+            return jsonify({'error': 'group_by must be lineno, filename or traceback'}), 400
+        return jsonify({
+            'workers': all_worker_gauges(),
+            'endpoints': endpoint_peaks(),
+            'top_allocations': top_allocations(limit, key_type),
+            'tracing': tracemalloc.is_tracing(),
+        }), 200
+
+    app.add_url_rule('/debug/memory', endpoint='memory_debug', view_func=memory_debug)
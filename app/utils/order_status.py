@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Optional
+from ..models import Order
+from . import outbox, sync
+
+SCHEDULED = 'scheduled'
+ASSIGNED = 'assigned'
+COLLECTED = 'collected'
+CANCELLED = 'cancelled'
+
+STATUSES = (SCHEDULED, ASSIGNED, COLLECTED, CANCELLED)
+
+# Allowed status changes; collected and cancelled are terminal
+TRANSITIONS = {
+    SCHEDULED: {ASSIGNED, CANCELLED},
+    ASSIGNED: {ASSIGNED, SCHEDULED, COLLECTED, CANCELLED},
+    COLLECTED: set(),
+    CANCELLED: set(),
+}
+
+
+class InvalidTransition(ValueError):
+    """Requested status change is not allowed from the order's current status"""
+
+
+def _payload(order: Order, **extra) -> dict:
+    payload = {
+        'order_id': order.order_id,
+        'user_email': order.user_email,
+        'status': order.status,
+        'assigned_collector': order.assigned_collector,
+    }
+    payload.update(extra)
+    return payload
+
+
+def record_created(order: Order, session=None):
+    """Emit the order.scheduled event for a newly inserted (flushed) order"""
+    outbox.add_event(order.order_id, f"order.{SCHEDULED}", _payload(order, status=SCHEDULED), session)
+
+
+def change_status(order: Order, status: str, collector: Optional[str] = None,
+                  actor: Optional[str] = None, occurred_at: Optional[str] = None, session=None):
+    """
+    Move an order to a new status and write the matching outbox event in
+    the same transaction
+    Args:
+        order: Order to update
+        status: Target status
+        collector: Collector to assign (required when status is assigned)
+        actor: Who reported the change, recorded in the event
+        occurred_at: Client-side timestamp of the change, recorded in the event
+        session: Session to write through (defaults to db.session)
+    Raises:
+        InvalidTransition: If the change is not allowed
+    """
+    if status not in STATUSES:
+        raise InvalidTransition(f"Unknown status '{status}'")
+    if status not in TRANSITIONS[order.status]:
+        raise InvalidTransition(f"Cannot change order {order.order_id} from {order.status} to {status}")
+    if status == ASSIGNED and not collector:
+        raise InvalidTransition("A collector is required to assign an order")
+
+    previous = order.status
+    previous_collector = order.assigned_collector
+    order.status = status
+    if status == ASSIGNED:
+        order.assigned_collector = collector
+    elif status == SCHEDULED:
+        order.assigned_collector = None
+    if previous_collector and previous_collector != order.assigned_collector:
+        sync.record_change(previous_collector, order.order_id, removed=True, session=session)
+    if order.assigned_collector:
+        sync.record_change(order.assigned_collector, order.order_id, session=session)
+
+    outbox.add_event(
+        order.order_id,
+        f"order.{status}",
+        _payload(
+            order,
+            previous_status=previous,
+            actor=actor,
+            occurred_at=occurred_at or datetime.utcnow().isoformat()
+        ),
+        session
+    )
@@ -1,34 +1,35 @@
 import secrets
 import string
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 from flask import session
-import redis
 import json
+import redis
 from .config import Config
-
-# Initialize Redis connection for session storage
-try:
-    redis_client = redis.Redis(
-        host=Config.REDIS_HOST if hasattr(Config, 'REDIS_HOST') else 'localhost',
-        port=Config.REDIS_PORT if hasattr(Config, 'REDIS_PORT') else 6379,
-        db=0,
-        decode_responses=True
-    )
-    # Test connection
-    redis_client.ping()
-    USE_REDIS = True
-except:
-    USE_REDIS = False
-    print("Warning: Redis not available, falling back to in-memory storage")
+from .redis_store import redis_client, USE_REDIS
 
 # Fallback in-memory storage for development
 _otp_storage = {}
+# email -> active OTP session id, and email -> time a resend is allowed again
+_otp_email_index = {}
+_otp_resend_after = {}
+_otp_lock = threading.Lock()
 
 def generate_otp() -> str:
     """Generate a secure 6-digit OTP"""
     return ''.join(secrets.choice(string.digits) for _ in range(6))
 
+def _otp_record(email: str, otp_code: str, ttl_seconds: int) -> dict:
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    return {
+        'email': email,
+        'otp_code': otp_code,
+        'expires_at': expires_at.isoformat(),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
 def store_otp(email: str, otp_code: str, ttl_seconds: int = 300) -> str:
     """
     Store OTP with TTL and return session ID
@@ -40,14 +41,7 @@ def store_otp(email: str, otp_code: str, ttl_seconds: int = 300) -> str:
         session_id: Unique session identifier
     """
     session_id = secrets.token_urlsafe(32)
-    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-    
-    otp_data = {
-        'email': email,
-        'otp_code': otp_code,
-        'expires_at': expires_at.isoformat(),
-        'created_at': datetime.utcnow().isoformat()
-    }
+    otp_data = _otp_record(email, otp_code, ttl_seconds)
     
     if USE_REDIS:
         # Store in Redis with TTL
@@ -87,6 +81,137 @@ def get_otp_data(session_id: str) -> Optional[dict]:
     
     return None
 
+def _remaining_seconds(otp_data: dict) -> float:
+    return (datetime.fromisoformat(otp_data['expires_at']) - datetime.utcnow()).total_seconds()
+
+
+def _reusable(otp_data: Optional[dict], email: str) -> bool:
+    """An OTP is reused only while enough of its lifetime is left to type it in"""
+    return (
+        otp_data is not None
+        and otp_data['email'] == email
+        and _remaining_seconds(otp_data) >= Config.OTP_REUSE_MIN_TTL_SECONDS
+    )
+
+
+def _issue_redis(email: str, ttl_seconds: int) -> Tuple[str, str, bool]:
+    index_key = f"otp:email:{email}"
+    while True:
+        with redis_client.pipeline() as pipe:
+            try:
+                # Optimistic lock on the index: concurrent logins for the same
+                # email either see the winner's session or retry
+                pipe.watch(index_key)
+                session_id = pipe.get(index_key)
+                otp_data = get_otp_data(session_id) if session_id else None
+                if _reusable(otp_data, email):
+                    pipe.unwatch()
+                    return session_id, otp_data['otp_code'], False
+
+                otp_code = generate_otp()
+                session_id = secrets.token_urlsafe(32)
+                pipe.multi()
+                pipe.setex(f"otp:{session_id}", ttl_seconds, json.dumps(_otp_record(email, otp_code, ttl_seconds)))
+                pipe.setex(index_key, ttl_seconds, session_id)
+                pipe.execute()
+                return session_id, otp_code, True
+            except redis.WatchError:
+                continue
+
+
+def _issue_memory(email: str, ttl_seconds: int) -> Tuple[str, str, bool]:
+    session_id = _otp_email_index.get(email)
+    otp_data = get_otp_data(session_id) if session_id else None
+    if _reusable(otp_data, email):
+        return session_id, otp_data['otp_code'], False
+
+    otp_code = generate_otp()
+    session_id = store_otp(email, otp_code, ttl_seconds)
+    _otp_email_index[email] = session_id
+    return session_id, otp_code, True
+
+
+def _claim_resend(email: str, force: bool) -> int:
+    """
+    Start the resend cooldown for an email.
+    Returns 0 if an email may be sent now, else seconds until the next resend
+    """
+    cooldown = Config.OTP_RESEND_COOLDOWN_SECONDS
+    if USE_REDIS:
+        key = f"otp:cooldown:{email}"
+        if force:
+            redis_client.setex(key, cooldown, 1)
+            return 0
+        if redis_client.set(key, 1, nx=True, ex=cooldown):
+            return 0
+        return max(redis_client.ttl(key), 1)
+
+    now = time.time()
+    resend_after = _otp_resend_after.get(email, 0)
+    if force or now >= resend_after:
+        _otp_resend_after[email] = now + cooldown
+        return 0
+    return max(int(resend_after - now), 1)
+
+
+def issue_otp(email: str, ttl_seconds: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    Get the email's active OTP, creating one if there is none.
+    Repeat logins for the same email reuse the active code (through an
+    email -> session reverse index) instead of issuing another, and its
+    email is only re-sent once OTP_RESEND_COOLDOWN_SECONDS have passed.
+    Args:
+        email: User's email address
+        ttl_seconds: Lifetime of a new OTP (defaults to OTP_TTL_SECONDS)
+    Returns:
+        Tuple of (session_id, otp_code, retry_after); send the email only
+        when retry_after is 0, otherwise it is the seconds until a resend
+    """
+    ttl_seconds = ttl_seconds or Config.OTP_TTL_SECONDS
+    if USE_REDIS:
+        session_id, otp_code, created = _issue_redis(email, ttl_seconds)
+        return session_id, otp_code, _claim_resend(email, force=created)
+
+    with _otp_lock:
+        session_id, otp_code, created = _issue_memory(email, ttl_seconds)
+        return session_id, otp_code, _claim_resend(email, force=created)
+
+
+def release_resend(email: str):
+    """Clear the resend cooldown, e.g. when sending the email failed"""
+    if USE_REDIS:
+        redis_client.delete(f"otp:cooldown:{email}")
+    else:
+        with _otp_lock:
+            _otp_resend_after.pop(email, None)
+
+
+def _forget_otp(session_id: str, email: Optional[str]):
+    """Delete an OTP and its reverse index entry (if it still points at it)"""
+    if USE_REDIS:
+        redis_client.delete(f"otp:{session_id}")
+        if email:
+            index_key = f"otp:email:{email}"
+            with redis_client.pipeline() as pipe:
+                try:
+                    pipe.watch(index_key)
+                    if pipe.get(index_key) == session_id:
+                        pipe.multi()
+                        pipe.delete(index_key, f"otp:cooldown:{email}")
+                        pipe.execute()
+                    else:
+                        pipe.unwatch()
+                except redis.WatchError:
+                    # A new OTP was issued meanwhile; leave its index alone
+                    pass
+    else:
+        with _otp_lock:
+            _otp_storage.pop(session_id, None)
+            if email and _otp_email_index.get(email) == session_id:
+                del _otp_email_index[email]
+                _otp_resend_after.pop(email, None)
+
+
 def verify_otp(session_id: str, otp_code: str) -> Tuple[bool, str]:
     """
     Verify OTP for a session
@@ -105,10 +230,7 @@ def verify_otp(session_id: str, otp_code: str) -> Tuple[bool, str]:
         return False, "Invalid OTP code"
     
     # OTP is valid, clean up
-    if USE_REDIS:
-        redis_client.delete(f"otp:{session_id}")
-    else:
-        _otp_storage.pop(session_id, None)
+    _forget_otp(session_id, otp_data['email'])
     
     return True, "OTP verified successfully"
 
@@ -125,3 +247,12 @@ def cleanup_expired_otps():
         
         for key in expired_keys:
             del _otp_storage[key]
+        
+        # Drop index entries whose OTP is gone and cooldowns that have passed
+        now = time.time()
+        for email, session_id in list(_otp_email_index.items()):
+            if session_id not in _otp_storage:
+                _otp_email_index.pop(email, None)
+        for email, resend_after in list(_otp_resend_after.items()):
+            if resend_after <= now:
+                _otp_resend_after.pop(email, None)
@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+import redis
+from sqlalchemy import select, update
+from .. import db
+from ..models import OutboxEvent
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+# Events are only published to the Redis stream: an in-process queue would
+# lose them on exit after their rows were marked published. Without Redis
+# they wait in outbox_event until a relay with Redis runs.
+_relay_thread = None
+
+
+class StreamUnavailable(RuntimeError):
+    """The event stream needs Redis, and Redis is not available"""
+
+
+def _require_stream():
+    if not USE_REDIS:
+        raise StreamUnavailable('The outbox event stream needs Redis (USE_REDIS is off)')
+
+
+def add_event(order_id: int, event_type: str, payload: dict, session=None) -> OutboxEvent:
+    """
+    Queue an event in the outbox as part of the caller's transaction, so it
+    is published if and only if the change it describes commits
+    """
+    session = session or db.session
+    event = OutboxEvent(order_id=order_id, event_type=event_type, payload=payload)
+    session.add(event)
+    return event
+
+
+def _publish(event: OutboxEvent):
+    fields = {
+        'event_id': event.id,
+        'type': event.event_type,
+        'order_id': event.order_id,
+        'payload': json.dumps(event.payload),
+        'created_at': event.created_at.isoformat(),
+    }
+    redis_client.xadd(Config.OUTBOX_STREAM, fields, maxlen=Config.OUTBOX_STREAM_MAXLEN, approximate=True)
+
+
+def relay_once(batch_size: int = 100) -> int:
+    """
+    Publish one batch of unpublished outbox rows, oldest first.
+    Delivery is at-least-once: a crash after publishing but before the
+    commit re-sends the batch, so consumers dedupe on event_id.
+    Returns:
+        int: Number of events published
+    Raises:
+        StreamUnavailable: Without Redis; the rows are left unpublished
+    """
+    _require_stream()
+    query = (
+        select(OutboxEvent)
+        .where(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    )
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Lets several relays share the outbox without double-publishing
+        query = query.with_for_update(skip_locked=True)
+
+    events = db.session.execute(query).scalars().all()
+    if not events:
+        db.session.rollback()
+        return 0
+
+    try:
+        for event in events:
+            _publish(event)
+        db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_([e.id for e in events]))
+            .values(published_at=datetime.utcnow())
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(events)
+
+
+def relay_forever(stop_event: Optional[threading.Event] = None, batch_size: int = 100):
+    """Relay loop: drain the outbox, then sleep for OUTBOX_RELAY_INTERVAL"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            while relay_once(batch_size) == batch_size:
+                pass
+        except Exception as e:
+            logger.error(f"❌ Outbox relay failed: {str(e)}")
+        stop_event.wait(Config.OUTBOX_RELAY_INTERVAL)
+
+
+def start_relay_thread(app):
+    """Run the relay inside this process (for single-process deployments)"""
+    global _relay_thread
+    if not USE_REDIS:
+        logger.warning("⚠️ Outbox relay not started: it needs Redis; events stay in outbox_event")
+        return
+    if _relay_thread is not None and _relay_thread.is_alive():
+        return
+
+    def run():
+        with app.app_context():
+            relay_forever()
+
+    _relay_thread = threading.Thread(target=run, name='outbox-relay', daemon=True)
+    _relay_thread.start()
+
+
+def ensure_consumer_group(group: str):
+    """Create a consumer group on the event stream if it does not exist"""
+    if not USE_REDIS:
+        return
+    try:
+        redis_client.xgroup_create(Config.OUTBOX_STREAM, group, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def consume(group: str, consumer: str, count: int = 100, block_ms: int = 5000) -> list:
+    """
+    Read events for a consumer group member.
+    Returns a list of (message_id, fields); pass the ids to ack() once handled.
+    """
+    _require_stream()
+    ensure_consumer_group(group)
+    response = redis_client.xreadgroup(group, consumer, {Config.OUTBOX_STREAM: '>'}, count=count, block=block_ms)
+    return [message for _, stream_messages in response for message in stream_messages]
+
+
+def ack(group: str, message_ids: list):
+    """Acknowledge processed stream messages"""
+    _require_stream()
+    if message_ids:
+        redis_client.xack(Config.OUTBOX_STREAM, group, *message_ids)
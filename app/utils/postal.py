@@ -0,0 +1,212 @@
+import bisect
+import csv
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+from array import array
+from typing import Optional, Tuple
+from flask import jsonify, request
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Index file: header, then three parallel arrays sorted by postal code
+# (uint32 codes, uint16 city ids, uint16 state ids), then a JSON table of
+# names. Arrays use native byte order; the index is built on the host that
+# reads it.
+MAGIC = b'PINIDX1\0'
+HEADER = struct.Struct('=8sII')  # magic, entry count, names length
+POSTAL_CODE = re.compile(r'^[1-9][0-9]{5}$')
+MAX_PLACE_LENGTH = 20  # Address.city / Address.state column size
+
+_directory = None
+
+
+def build_index(csv_path: str, index_path: str) -> int:
+    """
+    Compile the postal_code,city,state,state_code CSV into the binary index,
+    written to a temp file and renamed so workers never see a partial file
+    Returns:
+        int: Number of postal codes indexed
+    """
+    places = {}
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = (row.get('postal_code') or '').strip()
+            if not POSTAL_CODE.match(code):
+                continue
+            # First row wins for codes listed once per locality
+            places.setdefault(int(code), (row['city'].strip(), row['state'].strip(), (row.get('state_code') or '').strip()))
+
+    cities, states = {}, {}
+    codes, city_ids, state_ids = array('I'), array('H'), array('H')
+    for code in sorted(places):
+        city, state, state_code = places[code]
+        codes.append(code)
+        city_ids.append(cities.setdefault(city, len(cities)))
+        state_ids.append(states.setdefault((state, state_code), len(states)))
+
+    names = json.dumps({'cities': list(cities), 'states': [list(s) for s in states]}).encode('utf-8')
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), mode=0o700, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(codes), len(names)))
+        codes.tofile(f)
+        city_ids.tofile(f)
+        state_ids.tofile(f)
+        f.write(names)
+    os.replace(tmp_path, index_path)
+    return len(codes)
+
+
+class PostalDirectory:
+    """
+    Read-only view over a memory-mapped index. Pages come from the OS page
+    cache, so every worker on the host shares one copy of the data.
+    """
+
+    def __init__(self, index_path: str):
+        with open(index_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, names_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not a postal code index")
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        self._codes = view[offset:offset + 4 * count].cast('I')
+        offset += 4 * count
+        self._cities = view[offset:offset + 2 * count].cast('H')
+        offset += 2 * count
+        self._states = view[offset:offset + 2 * count].cast('H')
+        offset += 2 * count
+        names = json.loads(bytes(view[offset:offset + names_length]))
+        self._city_names = names['cities']
+        self._state_names = names['states']
+
+    def __len__(self):
+        return len(self._codes)
+
+    def _entry(self, i: int) -> dict:
+        state, state_code = self._state_names[self._states[i]]
+        return {
+            'postal_code': str(self._codes[i]),
+            'city': self._city_names[self._cities[i]],
+            'state': state,
+            'state_code': state_code,
+        }
+
+    def lookup(self, postal_code: str) -> Optional[dict]:
+        """Place for an exact 6-digit postal code, or None"""
+        if not POSTAL_CODE.match(postal_code or ''):
+            return None
+        code = int(postal_code)
+        i = bisect.bisect_left(self._codes, code)
+        if i < len(self._codes) and self._codes[i] == code:
+            return self._entry(i)
+        return None
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """Places whose postal code starts with prefix (1-6 digits), in code order"""
+        if not prefix.isdigit() or not 1 <= len(prefix) <= 6 or prefix[0] == '0':
+            return []
+        scale = 10 ** (6 - len(prefix))
+        low = int(prefix) * scale
+        start = bisect.bisect_left(self._codes, low)
+        end = bisect.bisect_left(self._codes, low + scale)
+        return [self._entry(i) for i in range(start, min(end, start + limit))]
+
+
+def index_path_for(app) -> str:
+    """POSTAL_INDEX_PATH, or postal-codes.idx in the app's (owner-only) instance folder"""
+    return Config.POSTAL_INDEX_PATH or os.path.join(app.instance_path, 'postal-codes.idx')
+
+
+def load_directory(index_path: str, csv_path: Optional[str] = None) -> PostalDirectory:
+    """Open the index, rebuilding it first when it is missing or older than the CSV"""
+    csv_path = csv_path or Config.POSTAL_DATA_PATH
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(csv_path):
+        count = build_index(csv_path, index_path)
+        logger.info(f"📮 Built postal code index with {count} codes at {index_path}")
+    return PostalDirectory(index_path)
+
+
+def get_directory() -> Optional[PostalDirectory]:
+    return _directory
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r'\s+', ' ', value or '').strip()
+
+
+def validate_address_fields(postal_code: str, city: str, state: str) -> Tuple[dict, Optional[str]]:
+    """
+    Check and complete the postal code, city and state of an address form.
+    A known postal code fills in a blank city and state and must agree with
+    a given state (full name or state code, case-insensitive).
+    Returns:
+        Tuple of (cleaned fields, error message or None)
+    """
+    fields = {
+        'postal_code': re.sub(r'\s+', '', postal_code or ''),
+        'city': _normalize(city),
+        'state': _normalize(state),
+    }
+    if fields['postal_code'] and not POSTAL_CODE.match(fields['postal_code']):
+        return fields, 'Postal code must be 6 digits'
+
+    place = _directory.lookup(fields['postal_code']) if _directory and fields['postal_code'] else None
+    if place:
+        if not fields['city']:
+            fields['city'] = place['city']
+        if not fields['state']:
+            fields['state'] = place['state']
+        elif fields['state'].casefold() not in (place['state'].casefold(), place['state_code'].casefold()):
+            return fields, f"Postal code {fields['postal_code']} is in {place['state']}, not {fields['state']}"
+    elif fields['postal_code'] and Config.POSTAL_REQUIRE_KNOWN and _directory:
+        return fields, f"Unknown postal code {fields['postal_code']}"
+
+    for name in ('city', 'state'):
+        if len(fields[name]) > MAX_PLACE_LENGTH:
+            return fields, f"{name.capitalize()} must be at most {MAX_PLACE_LENGTH} characters"
+    return fields, None
+
+
+def init_postal(app):
+    """
+    Load the postal code directory and register its lookup endpoints on the
+    app itself, so they skip the blueprint's before_request hooks
+    """
+    global _directory
+    try:
+        _directory = load_directory(index_path_for(app))
+        logger.info(f"📮 Postal code directory loaded: {len(_directory)} codes")
+    except (OSError, ValueError) as e:
+        _directory = None
+        logger.error(f"❌ Postal code directory unavailable: {str(e)}")
+
+    def postal_code_lookup(postal_code):
+        place = _directory.lookup(postal_code) if _directory else None
+        if place is None:
+            return jsonify({'error': 'Unknown postal code'}), 404
+        response = jsonify(place)
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+        return response
+
+    def postal_code_search():
+        try:
+            limit = min(int(request.args.get('limit', 10)), 50)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        places = _directory.complete(request.args.get('prefix', ''), limit) if _directory else []
+        response = jsonify({'results': places})
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+        return response
+
+    app.add_url_rule('/api/postal-codes/<postal_code>', endpoint='postal_code_lookup', view_func=postal_code_lookup)
+    app.add_url_rule('/api/postal-codes', endpoint='postal_code_search', view_func=postal_code_search)
@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import logging
+import os
+import random
+import stat
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+from flask import request
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+
+def _signature(expires: int) -> str:
+    return hmac.new(Config.PROFILE_SECRET.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+
+
+def make_token(ttl_seconds: int = 600) -> str:
+    """Signed X-Profile header value, valid for ttl_seconds"""
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_signature(expires)}"
+
+
+def verify_token(token: str) -> bool:
+    """Check an X-Profile header value's signature and expiry"""
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread: a background thread records the
+    target thread's stack every `interval` seconds, and the samples are
+    written in the folded format read by flamegraph.pl and speedscope
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while True:
+            self._sample()
+            if self._stop.wait(self.interval):
+                return
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _private_profile_dir(path: str) -> bool:
+    """
+    Create the profile directory owner-only (0700): profiles show request
+    internals, and a directory another user owns could be read or have
+    files planted in it
+    Returns:
+        bool: True if the directory is safe to write to
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        logger.error(f"❌ Profile directory {path} is not a directory owned by this user; profiling disabled")
+        return False
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return True
+
+
+def _should_profile() -> bool:
+    token = request.headers.get(PROFILE_HEADER)
+    if token and Config.PROFILE_SECRET:
+        if verify_token(token):
+            return True
+        logger.warning("⚠️ Ignoring X-Profile header with a bad or expired signature")
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def _profiled(endpoint: str, view, profile_dir: str):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not _should_profile():
+            return view(*args, **kwargs)
+
+        started = time.perf_counter()
+        with StackSampler(threading.get_ident(), Config.PROFILE_INTERVAL) as sampler:
+            response = view(*args, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        name = f"{endpoint.replace('.', '-')}-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{elapsed_ms:.0f}ms.folded"
+        try:
+            os.makedirs(profile_dir, mode=0o700, exist_ok=True)
+            sampler.write(os.path.join(profile_dir, name))
+            logger.info(f"🔬 Profiled {endpoint} ({elapsed_ms:.0f} ms, {sum(sampler.samples.values())} samples) -> {name}")
+        except OSError as e:
+            logger.error(f"❌ Could not write profile {name}: {str(e)}")
+        return response
+    return wrapped
+
+
+def init_profiling(app) -> Optional[list]:
+    """
+    Wrap the PROFILE_ENDPOINTS views (all views when empty) with the
+    sampler. Nothing is installed unless PROFILING_ENABLED is set, so
+    leaving this deployed costs nothing.
+    Returns:
+        list of wrapped endpoints, or None when profiling is off
+    """
+    if not Config.PROFILING_ENABLED:
+        return None
+    profile_dir = Config.PROFILE_DIR or os.path.join(app.instance_path, 'profiles')
+    if not _private_profile_dir(profile_dir):
+        return None
+    endpoints = Config.PROFILE_ENDPOINTS or [e for e in app.view_functions if e != 'static']
+    wrapped = []
+    for endpoint in endpoints:
+        view = app.view_functions.get(endpoint)
+        if view is None:
+            logger.warning(f"⚠️ PROFILE_ENDPOINTS names unknown endpoint {endpoint}")
+            continue
+        app.view_functions[endpoint] = _profiled(endpoint, view, profile_dir)
+        wrapped.append(endpoint)
+    logger.info(f"🔬 Profiling enabled for {len(wrapped)} endpoint(s), output in {profile_dir}")
+    return wrapped
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from typing import Callable, Optional, Tuple
+from flask import request, session
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+# Token bucket in a hash {tokens, ts}. Uses the server clock so every app
+# host refills at the same rate; the key expires once the bucket is full again.
+# Returns {allowed, milliseconds until a token is available}
+_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local refill_ms = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) / refill_ms)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) * refill_ms)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) * refill_ms) + 1000)
+return {allowed, wait}
+"""
+
+# Fallback per-process buckets: key -> (tokens, monotonic timestamp, capacity, refill seconds)
+_buckets = {}
+_lock = threading.Lock()
+_MAX_LOCAL_BUCKETS = 100000
+_token_bucket = redis_client.register_script(_TOKEN_BUCKET) if USE_REDIS else None
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parse a "count/seconds" rate, e.g. "5/300" for 5 requests per 5 minutes
+    Returns:
+        Tuple of (capacity, seconds to refill one token)
+    """
+    count, seconds = rate.split('/', 1)
+    capacity = int(count)
+    return capacity, float(seconds) / capacity
+
+
+def _consume_local(key: str, capacity: int, refill_seconds: float) -> Tuple[bool, float]:
+    now = time.monotonic()
+    with _lock:
+        tokens, ts = _buckets.get(key, (capacity, now))[:2]
+        tokens = min(capacity, tokens + (now - ts) / refill_seconds)
+        if tokens >= 1:
+            tokens -= 1
+            allowed, wait = True, 0.0
+        else:
+            allowed, wait = False, (1 - tokens) * refill_seconds
+        _buckets[key] = (tokens, now, capacity, refill_seconds)
+
+        if len(_buckets) > _MAX_LOCAL_BUCKETS:
+            # Drop buckets that have refilled; they are equivalent to new ones
+            for k, (t, stamp, cap, refill) in list(_buckets.items()):
+                if t + (now - stamp) / refill >= cap:
+                    del _buckets[k]
+    return allowed, wait
+
+
+def consume(key: str, rate: str) -> Tuple[bool, int]:
+    """
+    Take one token from a bucket
+    Args:
+        key: Bucket key, e.g. "login:ip:203.0.113.7"
+        rate: Bucket size and refill as "count/seconds"
+    Returns:
+        Tuple of (allowed, retry_after_seconds)
+    """
+    capacity, refill_seconds = parse_rate(rate)
+    if USE_REDIS:
+        try:
+            allowed, wait_ms = _token_bucket(keys=[f"ratelimit:{key}"], args=[capacity, refill_seconds * 1000])
+            return bool(allowed), math.ceil(int(wait_ms) / 1000)
+        except Exception as e:
+            # Fail open: a Redis outage must not lock everyone out
+            logger.error(f"❌ Rate limiter unavailable: {str(e)}")
+            return True, 0
+    allowed, wait = _consume_local(key, capacity, refill_seconds)
+    return allowed, math.ceil(wait)
+
+
+def _email_key(email: Optional[str]) -> Optional[str]:
+    email = (email or '').strip().lower()
+    return hashlib.sha256(email.encode('utf-8')).hexdigest()[:32] if email else None
+
+
+def form_email() -> Optional[str]:
+    """Email submitted in the request form (the login form)"""
+    return _email_key(request.form.get('email'))
+
+
+def session_email() -> Optional[str]:
+    """Email of the OTP login in progress (the verify form)"""
+    return _email_key(session.get('email'))
+
+
+def rate_limited(name: str, ip_rate: str, email_rate: Optional[str] = None,
+                 email_key: Optional[Callable[[], Optional[str]]] = None):
+    """
+    Limit a view with token buckets per client IP and, optionally, per email.
+    Runs before the view, so a limited request does no database or SMTP work
+    and gets a bare 429 with Retry-After.
+    Args:
+        name: Bucket namespace, e.g. "login"
+        ip_rate: "count/seconds" per client IP
+        email_rate: "count/seconds" per email
+        email_key: Returns the (hashed) email for the request, or None
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not Config.RATE_LIMIT_ENABLED or request.method != 'POST':
+                return view(*args, **kwargs)
+
+            buckets = [(f"{name}:ip:{request.remote_addr}", ip_rate)]
+            email = email_key() if email_rate and email_key else None
+            if email:
+                buckets.append((f"{name}:email:{email}", email_rate))
+
+            for key, rate in buckets:
+                allowed, retry_after = consume(key, rate)
+                if not allowed:
+                    logger.warning(f"🚦 Rate limited {key}, retry in {retry_after}s")
+                    return 'Too many requests, please try again later.\n', 429, {
+                        'Retry-After': str(max(retry_after, 1)),
+                        'Content-Type': 'text/plain; charset=utf-8',
+                    }
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,31 @@
+from typing import Optional
+import redis
+from .config import Config
+
+
+def create_redis_client(decode_responses: bool = True, socket_timeout: Optional[float] = None,
+                        **options) -> redis.Redis:
+    """Create a Redis client from the app configuration; options go to redis.Redis"""
+    return redis.Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        password=Config.REDIS_PASSWORD,
+        db=Config.REDIS_DB,
+        decode_responses=decode_responses,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        socket_timeout=socket_timeout,
+        **options
+    )
+
+
+# Shared Redis connection; every Redis-backed feature falls back to
+# in-process storage when it is unavailable
+try:
+    redis_client = create_redis_client()
+    # Test connection
+    redis_client.ping()
+    USE_REDIS = True
+except Exception:
+    redis_client = None
+    USE_REDIS = False
+    print("Warning: Redis not available, falling back to in-memory storage")
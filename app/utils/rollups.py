@@ -0,0 +1,145 @@
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .. import db
+from ..models import Order, Address, PickupRollup
+
+logger = logging.getLogger(__name__)
+
+GROUP_COLUMNS = {
+    'day': PickupRollup.day,
+    'city': PickupRollup.city,
+    'state': PickupRollup.state,
+}
+
+
+def _rollup_key(order_date, city, state) -> tuple:
+    """Normalize an order into its (day, city, state) rollup bucket"""
+    return (order_date.date(), (city or '').strip()[:20], (state or '').strip()[:20])
+
+
+def _add_counts(session, counts: Counter):
+    """Upsert per-bucket pickup increments into the rollup table"""
+    if not counts:
+        return
+    insert = pg_insert if session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    rows = [
+        {'day': day, 'city': city, 'state': state, 'pickups': n}
+        for (day, city, state), n in counts.items()
+    ]
+    stmt = insert(PickupRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'city', 'state'],
+        set_={'pickups': PickupRollup.pickups + stmt.excluded.pickups}
+    )
+    session.execute(stmt)
+
+
+def _mark_rolled_up(session, order_ids: list) -> int:
+    """Mark orders as counted, returning how many were still uncounted"""
+    result = session.execute(
+        update(Order)
+        .where(Order.order_id.in_(order_ids), Order.rolled_up.is_(False))
+        # keep updated_at: being counted is not a change collectors sync
+        .values(rolled_up=True, updated_at=Order.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def record_pickup(order: Order, address: Address, session=None):
+    """
+    Count a new order in the rollup and mark it as counted.
+    Must run in the same transaction as the order insert, before its flush,
+    so the marker is part of the INSERT and no shared row is touched beyond
+    the order's own (day, city, state) bucket.
+    Args:
+        order: Newly created, not yet flushed order
+        address: The order's pickup address
+        session: Session to write through (defaults to db.session)
+    """
+    session = session or db.session
+    if order.date is None:
+        order.date = datetime.utcnow()
+    order.rolled_up = True
+    _add_counts(session, Counter([_rollup_key(order.date, address.city, address.state)]))
+
+
+def catch_up(batch_size: int = 1000) -> int:
+    """
+    Count the orders not rolled up yet (imports, history, failed increments)
+    in order_id batches. Orders are marked in the same transaction as their
+    counts, so a batch that another run already marked is retried, never
+    counted twice.
+    Returns:
+        int: Number of orders processed
+    """
+    processed = 0
+    while True:
+        batch = db.session.execute(
+            select(Order.order_id, Order.date, Address.city, Address.state)
+            .join(Address, Address.address_id == Order.address_id, isouter=True)
+            .where(Order.rolled_up.is_(False))
+            .order_by(Order.order_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            db.session.commit()
+            return processed
+
+        if _mark_rolled_up(db.session, [r.order_id for r in batch]) != len(batch):
+            # Another catch-up run counted some of these; retry with what is left
+            db.session.rollback()
+            continue
+        _add_counts(db.session, Counter(_rollup_key(r.date, r.city, r.state) for r in batch))
+        db.session.commit()
+        processed += len(batch)
+        logger.info(f"📈 Rolled up {len(batch)} orders up to order_id {batch[-1].order_id}")
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    """Discard the rollup and recount every order from scratch"""
+    db.session.execute(PickupRollup.__table__.delete())
+    db.session.execute(
+        update(Order)
+        .where(Order.rolled_up.is_(True))
+        .values(rolled_up=False, updated_at=Order.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return catch_up(batch_size)
+
+
+def pickup_report(group_by: list, start: Optional[date] = None, end: Optional[date] = None) -> list:
+    """
+    Summarize pickup counts from the rollup table
+    Args:
+        group_by: Any of 'day', 'city', 'state'
+        start: First day to include
+        end: Last day to include
+    Returns:
+        list of dicts with the group columns and a 'pickups' total
+    """
+    columns = [GROUP_COLUMNS[name].label(name) for name in group_by]
+    query = select(*columns, func.sum(PickupRollup.pickups).label('pickups'))
+    if start:
+        query = query.where(PickupRollup.day >= start)
+    if end:
+        query = query.where(PickupRollup.day <= end)
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+
+    rows = []
+    for row in db.session.execute(query):
+        item = dict(row._mapping)
+        if isinstance(item.get('day'), date):
+            item['day'] = item['day'].isoformat()
+        item['pickups'] = int(item['pickups'] or 0)
+        rows.append(item)
+    return rows
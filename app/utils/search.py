@@ -0,0 +1,211 @@
+import logging
+import re
+from typing import List, Optional
+from sqlalchemy import DDL, event, select, text, or_
+from .. import db
+from ..models import Order, Address
+
+logger = logging.getLogger(__name__)
+
+# Full-text index over orders, one row per order (rowid = order_id). The
+# address text is copied in from the order's address row; address rows are
+# not edited in place (an update inserts a new row), so it stays valid.
+SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5(
+        description, address, city, postal_code,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Store the column weights (description, address, city, postal_code) as
+    # the table's rank function, so ORDER BY rank uses FTS5's own ranking
+    """
+    INSERT INTO order_search (order_search, rank) VALUES ('rank', 'bm25(4.0, 2.0, 2.0, 1.0)')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_search_ai AFTER INSERT ON "order" BEGIN
+        INSERT INTO order_search (rowid, description, address, city, postal_code)
+        SELECT new.order_id, new.description, a.address, a.city, a.postal_code
+        FROM (SELECT 1) LEFT JOIN address a ON a.address_id = new.address_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_search_au AFTER UPDATE OF description, address_id ON "order" BEGIN
+        DELETE FROM order_search WHERE rowid = old.order_id;
+        INSERT INTO order_search (rowid, description, address, city, postal_code)
+        SELECT new.order_id, new.description, a.address, a.city, a.postal_code
+        FROM (SELECT 1) LEFT JOIN address a ON a.address_id = new.address_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_search_ad AFTER DELETE ON "order" BEGIN
+        DELETE FROM order_search WHERE rowid = old.order_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS order_search_address_au AFTER UPDATE OF address, city, postal_code ON address BEGIN
+        UPDATE order_search SET address = new.address, city = new.city, postal_code = new.postal_code
+        WHERE rowid IN (SELECT order_id FROM "order" WHERE address_id = new.address_id);
+    END
+    """,
+]
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# db.create_all() (tests, fresh development databases) builds the index too;
+# migrated databases get it from the order_search migration
+for _statement in SEARCH_DDL:
+    event.listen(Order.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Order.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS order_search').execute_if(dialect='sqlite'))
+
+
+def is_fts_available(session=None) -> bool:
+    session = session or db.session
+    return session.get_bind().dialect.name == 'sqlite'
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match, the last one
+    as a prefix (so "koram" finds Koramangala). Words are quoted, so user
+    input can never be parsed as FTS5 syntax.
+    """
+    tokens = _TOKEN.findall(query or '')[:10]
+    if not tokens:
+        return None
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _serialize(row) -> dict:
+    return {
+        'order_id': row.order_id,
+        'user_email': row.user_email,
+        'status': row.status,
+        'date': row.date.isoformat(),
+        'description': row.description,
+        'address': row.address,
+        'city': row.city,
+        'postal_code': row.postal_code,
+    }
+
+
+def search_orders(query: str, page: int = 1, per_page: int = 20) -> dict:
+    """
+    Ranked order search over descriptions and addresses
+    Args:
+        query: Free text, e.g. "fridge koramangala"
+        page: 1-based page number
+        per_page: Results per page
+    Returns:
+        dict with results (best match first), page and has_more
+    """
+    match = build_match_query(query)
+    if match is None:
+        return {'results': [], 'page': page, 'has_more': False}
+    offset = (page - 1) * per_page
+
+    if is_fts_available():
+        # Rank and page inside the FTS table first, then join only that page
+        rows = db.session.execute(
+            text("""
+                SELECT o.order_id, o.user_email, o.status, o.date, o.description,
+                       s.address, s.city, s.postal_code, s.snippet, s.rank
+                FROM (
+                    SELECT rowid, address, city, postal_code, rank,
+                           snippet(order_search, 0, '[', ']', '…', 12) AS snippet
+                    FROM order_search
+                    WHERE order_search MATCH :match
+                    ORDER BY rank
+                    LIMIT :limit OFFSET :offset
+                ) AS s
+                JOIN "order" AS o ON o.order_id = s.rowid
+                ORDER BY s.rank
+            """).columns(date=db.DateTime),
+            {'match': match, 'limit': per_page + 1, 'offset': offset}
+        ).all()
+        results = [dict(_serialize(r), snippet=r.snippet, score=round(-r.rank, 6)) for r in rows[:per_page]]
+    else:
+        # No FTS5 on this database: unranked substring match, newest first
+        terms = _TOKEN.findall(query)[:10]
+        conditions = [
+            or_(Order.description.ilike(f'%{t}%'), Address.address.ilike(f'%{t}%'), Address.city.ilike(f'%{t}%'))
+            for t in terms
+        ]
+        rows = db.session.execute(
+            select(
+                Order.order_id, Order.user_email, Order.status, Order.date, Order.description,
+                Address.address, Address.city, Address.postal_code
+            )
+            .join(Address, Address.address_id == Order.address_id, isouter=True)
+            .where(*conditions)
+            .order_by(Order.order_id.desc())
+            .limit(per_page + 1)
+            .offset(offset)
+        ).all()
+        results = [_serialize(r) for r in rows[:per_page]]
+
+    return {'results': results, 'page': page, 'has_more': len(rows) > per_page}
+
+
+def _index_batch(after_id: int, limit: int) -> List[int]:
+    """
+    Reindex the next `limit` orders after `after_id`, replacing their rows
+    (the insert trigger may have added some already)
+    Returns:
+        list: The order_ids indexed, empty when there are none left
+    """
+    order_ids = db.session.execute(
+        select(Order.order_id).where(Order.order_id > after_id).order_by(Order.order_id).limit(limit)
+    ).scalars().all()
+    if not order_ids:
+        return order_ids
+    # Also drops rows left behind for orders deleted in this id range
+    db.session.execute(
+        text("DELETE FROM order_search WHERE rowid > :after_id AND rowid <= :last_id"),
+        {'after_id': after_id, 'last_id': order_ids[-1]}
+    )
+    db.session.execute(text("""
+        INSERT INTO order_search (rowid, description, address, city, postal_code)
+        SELECT o.order_id, o.description, a.address, a.city, a.postal_code
+        FROM "order" AS o LEFT JOIN address AS a ON a.address_id = o.address_id
+        WHERE o.order_id > :after_id AND o.order_id <= :last_id
+    """), {'after_id': after_id, 'last_id': order_ids[-1]})
+    db.session.commit()
+    return order_ids
+
+
+def rebuild_index(batch_size: int = 5000) -> int:
+    """
+    Reindex every order in order_id batches with a commit per batch, then
+    merge the index segments. Each batch replaces its own rows, so searches
+    keep working while the rebuild runs, and orders scheduled meanwhile stay
+    indexed by the triggers.
+    Returns:
+        int: Number of orders indexed
+    """
+    if not is_fts_available():
+        return 0
+    for statement in SEARCH_DDL:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+    indexed = 0
+    last_id = 0
+    while True:
+        order_ids = _index_batch(last_id, batch_size)
+        if not order_ids:
+            break
+        indexed += len(order_ids)
+        last_id = order_ids[-1]
+        logger.info(f"🔎 Indexed {indexed} orders up to order_id {last_id}")
+
+    # Rows past the last batch that belong to no order
+    db.session.execute(
+        text('DELETE FROM order_search WHERE rowid > :last_id AND rowid NOT IN (SELECT order_id FROM "order")'),
+        {'last_id': last_id}
+    )
+    db.session.execute(text("INSERT INTO order_search (order_search) VALUES ('optimize')"))
+    db.session.commit()
+    return indexed
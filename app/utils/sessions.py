@@ -0,0 +1,261 @@
+import logging
+import secrets
+import threading
+import time
+from typing import Callable, Optional
+from flask import session as flask_session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from redis.exceptions import RedisError
+from .config import Config
+from .redis_store import redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+# Session data lives under session:{id} (Redis, or process memory without
+# Redis); the cookie only carries the id. Sessions of a signed-in user are
+# also listed under session:user:{email}, so they can be revoked together.
+# In Redis a session is a hash of its payload and email, so a lookup can
+# slide the expiry of both keys in one step: the index never lapses before
+# a session it lists.
+SESSION_KEY = 'session:{}'
+USER_SESSIONS_KEY = 'session:user:{}'
+
+# KEYS[1] session key; ARGV[1] ttl, ARGV[2] user index key prefix
+_LOAD_AND_TOUCH = """
+local session = redis.call('HMGET', KEYS[1], 'payload', 'email')
+if not session[1] then
+    return false
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+if session[2] and session[2] ~= '' then
+    redis.call('EXPIRE', ARGV[2] .. session[2], ARGV[1])
+end
+return session[1]
+"""
+
+# Fallback store: session id -> (expires at, payload, email)
+_local_sessions = {}
+_local_lock = threading.Lock()
+
+_serializer = TaggedJSONSerializer()
+_load_and_touch = redis_client.register_script(_LOAD_AND_TOUCH) if USE_REDIS else None
+
+
+def _new_sid() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def _load(sid: str, ttl: int) -> Optional[str]:
+    """Payload of a live session, sliding its expiry (and its user index's) by ttl seconds"""
+    if USE_REDIS:
+        try:
+            return _load_and_touch(keys=[SESSION_KEY.format(sid)], args=[ttl, USER_SESSIONS_KEY.format('')])
+        except RedisError as e:
+            logger.error(f"❌ Session lookup failed: {str(e)}")
+            return None
+
+    now = time.time()
+    with _local_lock:
+        entry = _local_sessions.get(sid)
+        if entry is None or entry[0] <= now:
+            _local_sessions.pop(sid, None)
+            return None
+        _local_sessions[sid] = (now + ttl, entry[1], entry[2])
+        return entry[1]
+
+
+def _store(sid: str, payload: str, ttl: int, email: Optional[str]):
+    if USE_REDIS:
+        try:
+            key = SESSION_KEY.format(sid)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hset(key, mapping={'payload': payload, 'email': email or ''})
+            pipe.expire(key, ttl)
+            if email:
+                pipe.sadd(USER_SESSIONS_KEY.format(email), sid)
+                pipe.expire(USER_SESSIONS_KEY.format(email), ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.error(f"❌ Session save failed: {str(e)}")
+        return
+
+    now = time.time()
+    with _local_lock:
+        _local_sessions[sid] = (now + ttl, payload, email)
+        if len(_local_sessions) > Config.SESSION_LOCAL_MAX_ENTRIES:
+            for expired in [s for s, entry in _local_sessions.items() if entry[0] <= now]:
+                del _local_sessions[expired]
+
+
+def _delete(sid: str):
+    if USE_REDIS:
+        try:
+            redis_client.delete(SESSION_KEY.format(sid))
+        except RedisError as e:
+            logger.error(f"❌ Session delete failed: {str(e)}")
+        return
+
+    with _local_lock:
+        _local_sessions.pop(sid, None)
+
+
+def revoke_user_sessions(email: str) -> int:
+    """
+    Sign a user out everywhere: delete every stored session of that email
+    Returns:
+        int: Number of sessions deleted
+    """
+    if USE_REDIS:
+        user_key = USER_SESSIONS_KEY.format(email)
+        sids = redis_client.smembers(user_key)
+        pipe = redis_client.pipeline(transaction=False)
+        for sid in sids:
+            pipe.delete(SESSION_KEY.format(sid))
+        pipe.delete(user_key)
+        return sum(pipe.execute()[:len(sids)])
+
+    with _local_lock:
+        sids = [sid for sid, entry in _local_sessions.items() if entry[2] == email]
+        for sid in sids:
+            del _local_sessions[sid]
+        return len(sids)
+
+
+class ServerSideSession(SessionMixin):
+    """
+    Session whose data is fetched on first use. Requests that never touch
+    `session` (static files, probes, token APIs) cost no store lookup.
+    """
+
+    def __init__(self, sid: Optional[str], loader: Callable[[str], Optional[dict]]):
+        self.sid = sid
+        self.cookie_sid = sid
+        self._loader = loader
+        self._data = None
+        self.modified = False
+        self.replaced_sid = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            data = self._loader(self.sid) if self.sid else None
+            if data is None:
+                # Unknown or expired id: start over with a fresh one, so a
+                # client can never choose its own session id
+                self.sid = None
+                data = {}
+            self._data = data
+        return self._data
+
+    @property
+    def new(self) -> bool:
+        return self.sid is None
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def regenerate(self):
+        """Move the data to a new session id (on sign-in, against session fixation)"""
+        if self.data and self.sid:
+            self.replaced_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keep session data server-side; the cookie holds an opaque random id"""
+
+    def _ttl(self, app) -> int:
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app)) or None
+        ttl = self._ttl(app)
+
+        def loader(sid):
+            payload = _load(sid, ttl)
+            if payload is None:
+                return None
+            try:
+                return _serializer.loads(payload)
+            except ValueError:
+                logger.warning("⚠️ Discarding unreadable session payload")
+                return None
+
+        return ServerSideSession(sid, loader)
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            # Never read nor written during this request
+            return
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.replaced_sid:
+            _delete(session.replaced_sid)
+
+        if not session:
+            if session.modified and session.sid:
+                # Cleared (logout): revoke it for every worker right away
+                _delete(session.sid)
+            if session.cookie_sid:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.modified or session.sid is None:
+            if session.sid is None:
+                session.sid = _new_sid()
+            _store(session.sid, _serializer.dumps(dict(session.data)), self._ttl(app), session.get('email'))
+        elif not self.should_set_cookie(app, session):
+            # Expiry already slid forward when the session was loaded
+            return
+
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def regenerate_session():
+    """Give the current session a new id; call when the user signs in"""
+    current = flask_session._get_current_object()
+    if isinstance(current, ServerSideSession):
+        current.regenerate()
+
+
+def init_sessions(app):
+    """Use server-side sessions unless SESSION_STORE is "cookie" """
+    if Config.SESSION_STORE == 'cookie':
+        return
+    app.session_interface = ServerSideSessionInterface()
+    logger.info(f"🍪 Server-side sessions in {'Redis' if USE_REDIS else 'process memory'}")
@@ -0,0 +1,170 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select, delete, exists, and_, or_
+from sqlalchemy.orm import aliased
+from .. import db
+from ..models import Order, Address, SyncChange
+from .config import Config
+
+
+class InvalidCursor(ValueError):
+    """Sync cursor could not be decoded"""
+
+
+class CursorExpired(ValueError):
+    """Cursor is older than the removal retention window; a full resync is needed"""
+
+
+def encode_cursor(position: int, issued_day: int) -> str:
+    """
+    Encode a sync position (a sync_change id) plus the day it was issued (a
+    proleptic ordinal; day granularity keeps an unchanged feed's cursor, and
+    ETag, stable)
+    """
+    raw = json.dumps([position, issued_day], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, Optional[int]]:
+    """
+    Decode an opaque cursor into (sync_change id, issued_day).
+    An empty cursor means sync from the start.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position, issued_day = json.loads(raw)
+        return int(position), int(issued_day)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed sync cursor')
+
+
+def record_change(collector: str, order_id: int, removed: bool = False, session=None):
+    """
+    Append an order change to the collector's feed, in the transaction that
+    makes the change. removed=True tells the collector's next sync to drop it.
+    """
+    session = session or db.session
+    session.add(SyncChange(collector=collector, order_id=order_id, removed=removed))
+
+
+def prune_changes() -> int:
+    """
+    Delete changes superseded by a newer one for the same order, which syncs
+    never read, and removals past the retention window
+    """
+    cutoff = datetime.utcnow() - timedelta(days=Config.SYNC_TOMBSTONE_RETENTION_DAYS)
+    newer = aliased(SyncChange)
+    superseded = exists().where(
+        newer.collector == SyncChange.collector,
+        newer.order_id == SyncChange.order_id,
+        newer.id > SyncChange.id
+    )
+    result = db.session.execute(
+        delete(SyncChange).where(or_(superseded, and_(SyncChange.removed, SyncChange.created_at < cutoff)))
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _serialize_order(order) -> dict:
+    item = {
+        'id': order.order_id,
+        'status': order.status,
+        'date': order.date.isoformat(),
+        'address_id': order.address_id,
+        'contact_number': order.contact_number,
+        'description': order.description,
+        'image_count': order.image_count,
+        'updated_at': order.updated_at.isoformat(),
+    }
+    return {k: v for k, v in item.items() if v is not None}
+
+
+def _serialize_address(address) -> dict:
+    item = {
+        'id': address.address_id,
+        'address': address.address,
+        'google_maps': address.google_maps,
+        'postal_code': address.postal_code,
+        'city': address.city,
+        'state': address.state,
+    }
+    return {k: v for k, v in item.items() if v}
+
+
+def changes_since(collector: str, cursor: Optional[str], limit: int) -> dict:
+    """
+    Orders assigned to (or removed from) a collector after the cursor.
+    The feed is the collector's sync_change log, whose ids follow commit
+    order, so a change that commits after a sync is never hidden behind its
+    cursor. Only the newest change per order is read, joined to the order's
+    current row, so each order appears once per response: in `orders` while
+    it is still assigned, otherwise in `removed`. Address rows are never
+    edited in place (an update inserts a new row), so returning the addresses
+    referenced by the changed orders is enough.
+    Args:
+        collector: Collector name from the API token
+        cursor: Opaque cursor from the previous sync, or None
+        limit: Maximum changes to return
+    Returns:
+        dict with orders, removed order ids, addresses, the next cursor and has_more
+    """
+    position, issued_day = decode_cursor(cursor)
+    today = datetime.utcnow().toordinal()
+    if issued_day is not None and today - issued_day > Config.SYNC_TOMBSTONE_RETENTION_DAYS:
+        # Removals this client needs may already be pruned
+        raise CursorExpired('Cursor is too old, resync from the beginning')
+
+    newer = aliased(SyncChange)
+    # One query for orders and removals; the heavy images column is skipped,
+    # only its length is needed
+    rows = db.session.execute(
+        select(
+            SyncChange.id.label('change_id'), SyncChange.order_id.label('changed_order_id'),
+            Order.order_id, Order.status, Order.date, Order.address_id, Order.contact_number,
+            Order.description, Order.updated_at, db.func.json_array_length(Order.images).label('image_count')
+        )
+        .join(Order, and_(
+            Order.order_id == SyncChange.order_id,
+            Order.assigned_collector == collector,
+            SyncChange.removed.is_(False)
+        ), isouter=True)
+        .where(
+            SyncChange.collector == collector,
+            SyncChange.id > position,
+            ~exists().where(
+                newer.collector == SyncChange.collector,
+                newer.order_id == SyncChange.order_id,
+                newer.id > SyncChange.id
+            )
+        )
+        .order_by(SyncChange.id)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # A change whose order is gone or no longer assigned (archived, or
+    # reassigned with its removal pruned) is a removal too
+    orders = [row for row in rows if row.order_id is not None]
+    removed = [row.changed_order_id for row in rows if row.order_id is None]
+    addresses = []
+    address_ids = {row.address_id for row in orders}
+    if address_ids:
+        addresses = db.session.execute(
+            select(Address).where(Address.address_id.in_(address_ids))
+        ).scalars().all()
+
+    next_position = rows[-1].change_id if rows else position
+    return {
+        'orders': [_serialize_order(row) for row in orders],
+        'removed': removed,
+        'addresses': [_serialize_address(a) for a in addresses],
+        'cursor': encode_cursor(next_position, today),
+        'has_more': has_more,
+    }
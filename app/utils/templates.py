@@ -0,0 +1,67 @@
+import logging
+import os
+import stat
+import time
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
+from .config import Config
+from .redis_store import create_redis_client, USE_REDIS
+
+logger = logging.getLogger(__name__)
+
+
+def _private_cache_dir(path: str) -> bool:
+    """
+    Create the bytecode cache directory owner-only (0700), like Jinja's own
+    default. Jinja unmarshals the .cache files it finds there and runs them
+    as template code, so a directory another user owns is refused.
+    Returns:
+        bool: True if the directory is safe to use
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        logger.error(f"❌ Template cache {path} is not a directory owned by this user; bytecode cache disabled")
+        return False
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return True
+
+
+def create_bytecode_cache(app):
+    """
+    Build the Jinja bytecode cache selected by TEMPLATE_CACHE.
+    The filesystem cache is shared by every worker on the host, under
+    TEMPLATE_CACHE_DIR or the app's instance folder; the Redis cache is
+    shared across hosts. Returns None when caching is disabled.
+    """
+    if Config.TEMPLATE_CACHE == 'redis' and USE_REDIS:
+        # MemcachedBytecodeCache only needs get/set(key, value, timeout), which
+        # redis-py provides; bytecode is binary so responses are not decoded
+        return MemcachedBytecodeCache(create_redis_client(decode_responses=False), prefix='jinja2:bytecode:')
+    if Config.TEMPLATE_CACHE in ('filesystem', 'redis'):
+        directory = Config.TEMPLATE_CACHE_DIR or os.path.join(app.instance_path, 'jinja-cache')
+        if _private_cache_dir(directory):
+            return FileSystemBytecodeCache(directory)
+    return None
+
+
+def warm_templates(app) -> int:
+    """
+    Compile every template into the environment's in-memory cache, reading
+    from (and filling) the bytecode cache
+    Returns:
+        int: Number of templates compiled
+    """
+    started = time.perf_counter()
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    logger.info(f"🧩 Warmed {len(names)} templates in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return len(names)
+
+
+def init_templates(app):
+    """Attach the bytecode cache and precompile templates before serving"""
+    app.jinja_env.bytecode_cache = create_bytecode_cache(app)
+    if Config.TEMPLATE_WARMUP:
+        warm_templates(app)
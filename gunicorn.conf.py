@@ -0,0 +1,40 @@
+# Gunicorn settings, read by `gunicorn -c gunicorn.conf.py "app:create_app()"`.
+# Every value can be overridden from the environment.
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle a worker after this many requests (0 = never); jitter keeps
+# workers from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Recycle a worker once its RSS crosses this watermark (0 = never)
+max_rss_mb = int(os.getenv('GUNICORN_MAX_RSS_MB', 512))
+
+# Heartbeat files on tmpfs, so a slow disk cannot make workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def post_request(worker, req, environ, resp):
+    """
+    Retire the worker gracefully once it has grown past max_rss_mb: it stops
+    accepting requests, finishes in-flight ones and exits, and the arbiter
+    starts a fresh one. Memory freed by Python is rarely returned to the OS,
+    so this is the only way to get it back after a large upload.
+    """
+    if not max_rss_mb or not worker.alive:
+        return
+    from app.utils.memory import rss_bytes
+    rss = rss_bytes()
+    if rss > max_rss_mb * 1024 * 1024:
+        worker.log.warning(
+            f"Worker {worker.pid} RSS {rss / 1048576:.0f} MiB exceeds {max_rss_mb} MiB "
+            f"after {req.method} {req.path}; recycling"
+        )
+        worker.alive = False
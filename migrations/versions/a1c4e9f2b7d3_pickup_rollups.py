@@ -0,0 +1,39 @@
+"""pickup rollups
+
+Revision ID: a1c4e9f2b7d3
+Revises: 6787e8dea2ba
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e9f2b7d3'
+down_revision = '6787e8dea2ba'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create pickup rollup table
+    op.create_table('pickup_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('city', sa.String(length=20), nullable=False),
+    sa.Column('state', sa.String(length=20), nullable=False),
+    sa.Column('pickups', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'city', 'state')
+    )
+
+    # Mark orders once they are counted; the catch-up job fills in history
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.add_column(sa.Column('rolled_up', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.create_index('ix_order_rollup_pending', ['rolled_up', 'order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.drop_index('ix_order_rollup_pending')
+        batch_op.drop_column('rolled_up')
+    op.drop_table('pickup_rollup')
@@ -0,0 +1,74 @@
+"""order full-text search index
+
+Revision ID: a8c3e6f0b2d4
+Revises: f2d8b5e1a7c9
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c3e6f0b2d4'
+down_revision = 'f2d8b5e1a7c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases fall back to substring search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE order_search USING fts5(
+            description, address, city, postal_code,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("INSERT INTO order_search (order_search, rank) VALUES ('rank', 'bm25(4.0, 2.0, 2.0, 1.0)')")
+    op.execute("""
+        CREATE TRIGGER order_search_ai AFTER INSERT ON "order" BEGIN
+            INSERT INTO order_search (rowid, description, address, city, postal_code)
+            SELECT new.order_id, new.description, a.address, a.city, a.postal_code
+            FROM (SELECT 1) LEFT JOIN address a ON a.address_id = new.address_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER order_search_au AFTER UPDATE OF description, address_id ON "order" BEGIN
+            DELETE FROM order_search WHERE rowid = old.order_id;
+            INSERT INTO order_search (rowid, description, address, city, postal_code)
+            SELECT new.order_id, new.description, a.address, a.city, a.postal_code
+            FROM (SELECT 1) LEFT JOIN address a ON a.address_id = new.address_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER order_search_ad AFTER DELETE ON "order" BEGIN
+            DELETE FROM order_search WHERE rowid = old.order_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER order_search_address_au AFTER UPDATE OF address, city, postal_code ON address BEGIN
+            UPDATE order_search SET address = new.address, city = new.city, postal_code = new.postal_code
+            WHERE rowid IN (SELECT order_id FROM "order" WHERE address_id = new.address_id);
+        END
+    """)
+
+    # Index existing orders
+    op.execute("""
+        INSERT INTO order_search (rowid, description, address, city, postal_code)
+        SELECT o.order_id, o.description, a.address, a.city, a.postal_code
+        FROM "order" AS o LEFT JOIN address AS a ON a.address_id = o.address_id
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS order_search_address_au")
+    op.execute("DROP TRIGGER IF EXISTS order_search_ad")
+    op.execute("DROP TRIGGER IF EXISTS order_search_au")
+    op.execute("DROP TRIGGER IF EXISTS order_search_ai")
+    op.execute("DROP TABLE IF EXISTS order_search")
@@ -0,0 +1,34 @@
+"""idempotency keys
+
+Revision ID: b7e2d5a9c3f1
+Revises: a1c4e9f2b7d3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d5a9c3f1'
+down_revision = 'a1c4e9f2b7d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create idempotency key table (dedup store when Redis is unavailable)
+    op.create_table('idempotency_key',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_idempotency_key_expires_at'), 'idempotency_key', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_idempotency_key_expires_at'), table_name='idempotency_key')
+    op.drop_table('idempotency_key')
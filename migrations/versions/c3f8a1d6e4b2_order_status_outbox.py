@@ -0,0 +1,47 @@
+"""order status and outbox
+
+Revision ID: c3f8a1d6e4b2
+Revises: b7e2d5a9c3f1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a1d6e4b2'
+down_revision = 'b7e2d5a9c3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add order status lifecycle columns
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=False, server_default='scheduled'))
+        batch_op.add_column(sa.Column('assigned_collector', sa.String(length=120), nullable=True))
+        batch_op.create_index(batch_op.f('ix_order_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_order_assigned_collector'), ['assigned_collector'], unique=False)
+
+    # Create transactional outbox table
+    op.create_table('outbox_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_event_published_at'), 'outbox_event', ['published_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_outbox_event_published_at'), table_name='outbox_event')
+    op.drop_table('outbox_event')
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_assigned_collector'))
+        batch_op.drop_index(batch_op.f('ix_order_status'))
+        batch_op.drop_column('assigned_collector')
+        batch_op.drop_column('status')
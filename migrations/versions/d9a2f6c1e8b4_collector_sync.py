@@ -0,0 +1,55 @@
+"""collector delta sync
+
+Revision ID: d9a2f6c1e8b4
+Revises: c3f8a1d6e4b2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a2f6c1e8b4'
+down_revision = 'c3f8a1d6e4b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add change timestamps; SQLite only allows constant defaults when adding
+    # NOT NULL columns, so existing rows are backfilled afterwards
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default='1970-01-01 00:00:00'))
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default='1970-01-01 00:00:00'))
+    op.execute('UPDATE "order" SET updated_at = date')
+    op.execute("UPDATE address SET updated_at = CURRENT_TIMESTAMP")
+
+    # Create the per-collector change feed, seeded with the orders assigned today
+    op.create_table('sync_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('collector', sa.String(length=120), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('removed', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_sync_change_feed', 'sync_change', ['collector', 'id'], unique=False)
+    op.create_index('ix_sync_change_order', 'sync_change', ['collector', 'order_id', 'id'], unique=False)
+    op.execute("""
+        INSERT INTO sync_change (collector, order_id, removed, created_at)
+        SELECT assigned_collector, order_id, 0, CURRENT_TIMESTAMP FROM "order"
+        WHERE assigned_collector IS NOT NULL ORDER BY updated_at, order_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_sync_change_order', table_name='sync_change')
+    op.drop_index('ix_sync_change_feed', table_name='sync_change')
+    op.drop_table('sync_change')
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.drop_column('updated_at')
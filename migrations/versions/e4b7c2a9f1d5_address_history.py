@@ -0,0 +1,50 @@
+"""address content hash and history
+
+Revision ID: e4b7c2a9f1d5
+Revises: d9a2f6c1e8b4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c2a9f1d5'
+down_revision = 'd9a2f6c1e8b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get their hash computed lazily on the next comparison
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Compaction looks up orders by address
+    op.create_index(op.f('ix_order_address_id'), 'order', ['address_id'], unique=False)
+
+    # Create history table for superseded addresses
+    op.create_table('address_history',
+    sa.Column('address_id', sa.Integer(), nullable=False),
+    sa.Column('user_email', sa.String(length=120), nullable=False),
+    sa.Column('google_maps', sa.String(length=2083), nullable=True),
+    sa.Column('address', sa.String(length=500), nullable=False),
+    sa.Column('postal_code', sa.String(length=6), nullable=True),
+    sa.Column('city', sa.String(length=20), nullable=True),
+    sa.Column('state', sa.String(length=20), nullable=True),
+    sa.Column('last_address', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('address_id')
+    )
+    op.create_index(op.f('ix_address_history_user_email'), 'address_history', ['user_email'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_address_history_user_email'), table_name='address_history')
+    op.drop_table('address_history')
+    op.drop_index(op.f('ix_order_address_id'), table_name='order')
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.drop_column('content_hash')
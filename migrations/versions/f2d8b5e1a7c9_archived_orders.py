@@ -0,0 +1,46 @@
+"""archived order index
+
+Revision ID: f2d8b5e1a7c9
+Revises: e4b7c2a9f1d5
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2d8b5e1a7c9'
+down_revision = 'e4b7c2a9f1d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Archiving deletes the highest order_ids too; without AUTOINCREMENT SQLite
+    # would hand them out again, colliding with archived_order, outbox events
+    # and sync changes
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('order', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+    # Create lookup index for orders moved to archive segments
+    op.create_table('archived_order',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('user_email', sa.String(length=120), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('segment', sa.String(length=255), nullable=False),
+    sa.Column('line', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('order_id')
+    )
+    op.create_index(op.f('ix_archived_order_user_email'), 'archived_order', ['user_email'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_archived_order_user_email'), table_name='archived_order')
+    op.drop_table('archived_order')
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('order', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+            pass
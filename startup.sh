@@ -7,6 +7,14 @@ sleep 2
 echo "Running database migrations..."
 alembic upgrade head
 
+# Rebuild static assets (the compose volume mount hides the image's build)
+echo "Building static assets..."
+flask assets build
+
+# Fill the shared template bytecode cache once so workers start warm
+echo "Precompiling templates..."
+flask templates compile
+
 # Start the Flask application
 echo "Starting Flask application..."
-exec gunicorn --bind 0.0.0.0:5000 --workers 1 --timeout 120 "app:create_app()" 
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py "app:create_app()" 
\ No newline at end of file
@@ -0,0 +1,93 @@
+import os
+from datetime import datetime, timedelta
+
+# Set before the app is imported: Config and the token table read them at import
+os.environ.setdefault('API_TOKENS', 'ops:staff-token,c1:collector-token:collector')
+os.environ.setdefault('TEMPLATE_CACHE', 'none')
+os.environ.setdefault('OUTBOX_RELAY_IN_PROCESS', 'False')
+
+import pytest
+from app import create_app, db
+from app.models import User, Address, Order, SyncChange
+from app.utils.config import Config
+from .query_budget import QueryRecorder
+
+STAFF_HEADERS = {'Authorization': 'Bearer staff-token'}
+COLLECTOR_HEADERS = {'Authorization': 'Bearer collector-token'}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # create_app() puts site.db in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, 'RATE_LIMIT_ENABLED', False)
+    monkeypatch.setattr(Config, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    monkeypatch.setattr(Config, 'POSTAL_INDEX_PATH', str(tmp_path / 'postal-codes.idx'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    if 'group_commit' in app.extensions:
+        app.extensions['group_commit'].stop()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def seed(app, orders: int = 10, addresses: int = 3) -> dict:
+    """A user with an address history and `orders` pickups, some assigned to collector c1"""
+    with app.app_context():
+        user = User(email='user@example.com', name='Test User')
+        db.session.add(user)
+        db.session.flush()
+        previous = None
+        address_ids = []
+        for i in range(addresses):
+            address = Address(
+                user_email=user.email, address=f'{i} Main Street', postal_code='560001',
+                city='Bangalore', state='KA', last_address=previous
+            )
+            db.session.add(address)
+            db.session.flush()
+            previous = address.address_id
+            address_ids.append(previous)
+        for i in range(orders):
+            # Spread orders over the address versions, so a per-order
+            # `order.address` lazy load shows up as repeated queries
+            db.session.add(Order(
+                user_email=user.email, address_id=address_ids[i % len(address_ids)], contact_number='9876543210',
+                description=f'Pickup {i}', images=['aGVsbG8='],
+                date=datetime.utcnow() - timedelta(days=i),
+                status='assigned' if i % 2 else 'scheduled',
+                assigned_collector='c1' if i % 2 else None
+            ))
+        db.session.flush()
+        # What the status changes that assigned them would have recorded
+        db.session.add_all(SyncChange(collector='c1', order_id=order_id) for order_id in db.session.execute(
+            db.select(Order.order_id).where(Order.assigned_collector == 'c1').order_by(Order.order_id)
+        ).scalars())
+        db.session.commit()
+        return {'user_id': user.id, 'email': user.email, 'address_id': previous}
+
+
+@pytest.fixture
+def seeded(app):
+    return seed(app)
+
+
+@pytest.fixture
+def client(app, seeded):
+    """Test client logged in as the seeded user"""
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = seeded['user_id']
+        s['email'] = seeded['email']
+    return client
+
+
+@pytest.fixture
+def queries():
+    """Fresh recorder; use `with queries:` around the request under test"""
+    return QueryRecorder()
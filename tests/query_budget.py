@@ -0,0 +1,57 @@
+import re
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WHITESPACE = re.compile(r'\s+')
+# Literal lists from IN (...) expansions differ per call; fold them so the
+# same statement with different id lists still counts as a repeat
+_IN_LIST = re.compile(r'IN \([^)]*\)', re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class QueryRecorder:
+    """
+    Record every SQL statement executed by any engine (primary and replicas)
+    while the context is active
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(normalize(statement))
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, allowed: int = 1) -> dict:
+        """Statements executed more than `allowed` times: the signature of an N+1 loop"""
+        return {sql: n for sql, n in Counter(self.statements).items() if n > allowed}
+
+    def report(self) -> str:
+        return '\n'.join(f"  {i + 1:>2}. {sql[:200]}" for i, sql in enumerate(self.statements))
+
+
+def assert_query_budget(recorder: QueryRecorder, budget: int, label: str, allowed_repeats: int = 1):
+    """Fail when a request ran more queries than its budget or repeated a statement (N+1)"""
+    repeated = recorder.repeated(allowed_repeats)
+    assert not repeated, (
+        f"{label}: possible N+1, statements repeated:\n"
+        + '\n'.join(f"  x{n} {sql[:200]}" for sql, n in repeated.items())
+        + f"\nAll queries:\n{recorder.report()}"
+    )
+    assert recorder.count <= budget, (
+        f"{label}: {recorder.count} queries, budget is {budget}\n{recorder.report()}"
+    )
@@ -0,0 +1,33 @@
+from app import db
+from app.models import Address
+
+FORM = {'address': '2 Main Street', 'postal_code': '560001', 'city': 'Bangalore', 'state': 'KA', 'google_maps': ''}
+
+
+def address_count(app, email):
+    with app.app_context():
+        return db.session.execute(db.select(db.func.count()).where(Address.user_email == email)).scalar()
+
+
+def update(client, **changes):
+    response = client.post('/update-address', data={**FORM, **changes})
+    assert response.status_code == 302
+    with client.session_transaction() as s:
+        return s['_flashes'][-1][1]
+
+
+def test_whitespace_only_edit_is_unchanged(app, client, seeded):
+    assert update(client) == 'Address is unchanged'
+    assert update(client, address='  2   Main Street ') == 'Address is unchanged'
+    assert address_count(app, seeded['email']) == 3
+
+
+def test_capitalization_fix_is_saved(app, client, seeded):
+    assert update(client, address='2 main street') != 'Address is unchanged'
+    assert address_count(app, seeded['email']) == 4
+
+
+def test_maps_link_is_compared_verbatim(app, client, seeded):
+    update(client, google_maps='https://maps.app.goo.gl/AbC')
+    assert update(client, google_maps='https://maps.app.goo.gl/abc') != 'Address is unchanged'
+    assert address_count(app, seeded['email']) == 5
@@ -0,0 +1,21 @@
+from app import db
+from app.models import Order, ArchivedOrder
+from app.utils import archive, rollups
+
+
+def test_archived_order_ids_are_never_reused(app, client):
+    with app.app_context():
+        rollups.catch_up()
+        assert archive.archive_orders(older_than_days=0, statuses=[]) == 10
+        assert db.session.execute(db.select(db.func.max(ArchivedOrder.order_id))).scalar() == 10
+
+    assert client.post('/schedule-pickup', data={'contact_number': '9876543210'}).status_code == 302
+    with app.app_context():
+        assert db.session.execute(db.select(Order.order_id)).scalars().all() == [11]
+
+
+def test_uncounted_orders_wait_for_rollup_catch_up(app, seeded):
+    with app.app_context():
+        assert archive.archive_orders(older_than_days=0, statuses=[]) == 0
+        rollups.catch_up()
+        assert archive.archive_orders(older_than_days=0, statuses=[]) == 10
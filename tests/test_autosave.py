@@ -0,0 +1,105 @@
+import threading
+import time
+import fakeredis
+import pytest
+from app import db
+from app.models import User
+from app.utils import autosave
+
+
+@pytest.fixture(autouse=True)
+def buffer(monkeypatch):
+    """A fresh in-memory buffer, flushed only by the test"""
+    monkeypatch.setattr(autosave, '_pending', {})
+    monkeypatch.setattr(autosave, '_ensure_flusher', lambda: None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(autosave, 'USE_REDIS', True)
+    monkeypatch.setattr(autosave, 'redis_client', client)
+    monkeypatch.setattr(autosave, '_compare_and_delete', client.register_script(autosave._COMPARE_AND_DELETE))
+    return client
+
+
+def saved_form_data(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).last_submitted_form_data
+
+
+def test_patches_merge_and_flush(app, client, seeded):
+    assert client.post('/api/form-submit', json={'name': 'A', 'address': {'city': 'Pune'}}).status_code == 204
+    assert client.post('/api/form-submit', json={'address': {'state': 'MH'}, 'name': None}).status_code == 204
+    assert client.get('/api/form-submit').get_json() == {'address': {'city': 'Pune', 'state': 'MH'}}
+    assert saved_form_data(app, seeded['user_id']) is None
+
+    with app.app_context():
+        assert autosave.flush() == 1
+        assert autosave.flush() == 0
+    assert saved_form_data(app, seeded['user_id']) == {'address': {'city': 'Pune', 'state': 'MH'}}
+    # The next patch starts from the saved document
+    client.post('/api/form-submit', json={'phone': '9876543210'})
+    assert client.get('/api/form-submit').get_json()['address'] == {'city': 'Pune', 'state': 'MH'}
+
+
+def test_concurrent_patches_for_one_user_all_land(app, seeded, monkeypatch):
+    merge = autosave.merge_patch
+
+    def slow_merge(target, patch):
+        time.sleep(0.01)
+        return merge(target, patch)
+
+    monkeypatch.setattr(autosave, 'merge_patch', slow_merge)
+
+    def patch(i):
+        with app.app_context():
+            autosave.buffer_patch(seeded['user_id'], {f'field{i}': i})
+
+    threads = [threading.Thread(target=patch, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with app.app_context():
+        assert autosave.get_form_data(seeded['user_id']) == {f'field{i}': i for i in range(8)}
+
+
+def test_redis_patches_merge_and_flush(app, seeded, fake_redis):
+    with app.app_context():
+        autosave.buffer_patch(seeded['user_id'], {'a': 1})
+        autosave.buffer_patch(seeded['user_id'], {'b': 2})
+        assert autosave.flush() == 1
+    assert saved_form_data(app, seeded['user_id']) == {'a': 1, 'b': 2}
+    assert fake_redis.hlen(autosave.PENDING_KEY) == 0
+
+
+def test_redis_flush_is_owned_by_one_flusher(app, seeded, fake_redis):
+    with app.app_context():
+        autosave.buffer_patch(seeded['user_id'], {'a': 1})
+        other = fake_redis.lock(autosave.FLUSH_LOCK_KEY, timeout=autosave.FLUSH_LOCK_TIMEOUT)
+        assert other.acquire(blocking=False)
+        # Another worker is flushing: this one leaves the buffer alone
+        assert autosave.flush() == 0
+        assert fake_redis.hlen(autosave.PENDING_KEY) == 1
+        other.release()
+        assert autosave.flush() == 1
+    assert saved_form_data(app, seeded['user_id']) == {'a': 1}
+
+
+def test_redis_flush_aborts_when_its_lock_expired(app, seeded, fake_redis, monkeypatch):
+    update = autosave.update
+
+    def lose_lock(*args, **kwargs):
+        # The lock expires mid-flush and another worker takes it over
+        fake_redis.delete(autosave.FLUSH_LOCK_KEY)
+        fake_redis.set(autosave.FLUSH_LOCK_KEY, 'other-worker')
+        return update(*args, **kwargs)
+
+    with app.app_context():
+        autosave.buffer_patch(seeded['user_id'], {'a': 1})
+        monkeypatch.setattr(autosave, 'update', lose_lock)
+        with pytest.raises(Exception, match='no longer own'):
+            autosave.flush()
+    assert saved_form_data(app, seeded['user_id']) is None
+    assert fake_redis.hlen(autosave.PENDING_KEY) == 1
@@ -0,0 +1,54 @@
+import json
+from datetime import date
+import pytest
+from app import db
+from app.cli import _coerce_value
+from app.models import Order, PickupRollup
+
+
+def order_rows(app):
+    with app.app_context():
+        return [dict(row._mapping) for row in db.session.execute(db.select(Order.__table__).order_by(Order.order_id))]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_orders_round_trip(app, seeded, tmp_path, fmt):
+    before = order_rows(app)
+    runner = app.test_cli_runner()
+    path = str(tmp_path / f'orders.{fmt}')
+    assert runner.invoke(args=['data', 'export', 'orders', path]).exit_code == 0
+    with app.app_context():
+        db.session.execute(db.delete(Order))
+        db.session.commit()
+
+    result = runner.invoke(args=['data', 'import', 'orders', path])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 10 orders rows' in result.output
+    assert order_rows(app) == before
+
+
+def test_rows_with_unknown_references_are_skipped(app, seeded, tmp_path):
+    base = {'contact_number': '9876543210', 'date': '2026-01-05T10:00:00', 'rolled_up': True}
+    records = [
+        dict(base, user_email=seeded['email'], address_id=seeded['address_id'], description='kept'),
+        dict(base, user_email='nobody@example.com', address_id=seeded['address_id'], description='unknown user'),
+        dict(base, user_email=seeded['email'], address_id=9999, description='unknown address'),
+    ]
+    path = tmp_path / 'orders.ndjson'
+    path.write_text(''.join(json.dumps(r) + '\n' for r in records))
+
+    result = app.test_cli_runner().invoke(args=['data', 'import', 'orders', str(path)])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 1 orders rows' in result.output and 'skipped 2' in result.output
+    with app.app_context():
+        order = db.session.execute(db.select(Order).where(Order.description == 'kept')).scalar_one()
+        assert order.rolled_up is False
+        assert db.session.execute(db.select(db.func.count()).select_from(Order)).scalar() == 11
+
+
+def test_coerce_booleans_and_dates():
+    rolled_up = Order.__table__.c.rolled_up
+    assert [_coerce_value(rolled_up, v) for v in ('True', 'false', '1', '0', True)] == [True, False, True, False, True]
+    with pytest.raises(ValueError):
+        _coerce_value(rolled_up, 'yes')
+    assert _coerce_value(PickupRollup.__table__.c.day, '2026-01-05') == date(2026, 1, 5)
@@ -0,0 +1,68 @@
+import pytest
+from flask import session as flask_session
+from sqlalchemy import select, text
+from app import db
+from app.models import Order
+from app.utils import search
+from app.utils.db_routing import STICKY_SESSION_KEY
+
+
+def bind_for(clause):
+    return db.session.get_bind(clause=clause)
+
+
+@pytest.fixture
+def engines(app):
+    with app.app_context():
+        yield db.engines[None], db.engines['replica_0']
+
+
+@pytest.mark.parametrize('clause', [
+    select(Order.order_id),
+    text('SELECT order_id FROM "order"'),
+    text('SELECT rowid FROM order_search').columns(),
+], ids=['select', 'text', 'textual-select'])
+def test_reads_on_get_go_to_the_replica(app, engines, clause):
+    primary, replica = engines
+    with app.test_request_context('/dashboard', method='GET'):
+        assert bind_for(clause) is replica
+        assert not db.session.info.get('wrote')
+
+
+def test_text_writes_go_to_the_primary_and_stick(app, engines):
+    primary, replica = engines
+    with app.test_request_context('/dashboard', method='GET'):
+        assert bind_for(text('DELETE FROM outbox_event WHERE id = 0')) is primary
+        assert db.session.info['wrote'] is True
+        assert bind_for(select(Order.order_id)) is primary
+
+
+def test_reads_outside_get_requests_stay_on_the_primary(app, engines):
+    primary, replica = engines
+    with app.test_request_context('/schedule-pickup', method='POST'):
+        assert bind_for(select(Order.order_id)) is primary
+    with app.app_context():
+        assert bind_for(text('SELECT 1')) is primary
+
+
+def test_search_reads_from_the_replica(app, seeded, engines):
+    with app.test_request_context('/api/search/orders', method='GET'):
+        assert len(search.search_orders('pickup')['results']) == 10
+        assert db.session.info.get('replica') == 'replica_0'
+        assert not db.session.info.get('wrote')
+
+
+def test_committed_write_makes_reads_sticky(app, seeded, engines):
+    primary, replica = engines
+    with app.test_request_context('/schedule-pickup', method='POST'):
+        flask_session['email'] = seeded['email']
+        db.session.execute(text("UPDATE \"order\" SET contact_number = '9999999999' WHERE order_id = 1"))
+        db.session.commit()
+        assert flask_session[STICKY_SESSION_KEY] > 0
+        sticky = flask_session[STICKY_SESSION_KEY]
+    with app.test_request_context('/dashboard', method='GET'):
+        flask_session[STICKY_SESSION_KEY] = sticky
+        assert bind_for(select(Order.order_id)) is primary
+        flask_session[STICKY_SESSION_KEY] = 0
+        db.session.info.clear()
+        assert bind_for(select(Order.order_id)) is replica
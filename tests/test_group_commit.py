@@ -0,0 +1,62 @@
+import threading
+import pytest
+from app import db
+from app.models import Order, User
+from app.utils.config import Config
+from app.utils.group_commit import run_write
+
+
+def add_order(email, address_id, description):
+    def unit(write_session):
+        order = Order(user_email=email, address_id=address_id, contact_number='9876543210', description=description)
+        write_session.add(order)
+        write_session.flush()
+        return order.order_id
+    return unit
+
+
+def failing_unit(write_session):
+    write_session.add(User(email='user@example.com'))  # duplicate email
+    write_session.flush()
+
+
+def test_concurrent_writes_share_commits(app, seeded, monkeypatch):
+    monkeypatch.setattr(Config, 'GROUP_COMMIT_WINDOW_MS', 50)
+    writer = app.extensions['group_commit']
+    start = threading.Barrier(8)
+    results, errors = [], []
+
+    def request(i):
+        with app.test_request_context():
+            start.wait()
+            try:
+                unit = failing_unit if i == 3 else add_order(seeded['email'], seeded['address_id'], f'batch {i}')
+                results.append(run_write(unit))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # The failing unit gets its own error; the others commit with their ids
+    assert len(errors) == 1 and 'UNIQUE' in str(errors[0])
+    assert len(set(results)) == 7
+    assert writer.units == 7 and writer.batches < 7
+    with app.app_context():
+        stored = db.session.execute(db.select(Order.order_id).where(Order.description.like('batch %'))).scalars()
+        assert sorted(stored) == sorted(results)
+
+
+def test_run_write_without_group_commit(app, seeded):
+    writer = app.extensions.pop('group_commit')
+    try:
+        with app.test_request_context():
+            order_id = run_write(add_order(seeded['email'], seeded['address_id'], 'inline'))
+            assert db.session.get(Order, order_id).description == 'inline'
+            with pytest.raises(Exception, match='UNIQUE'):
+                run_write(failing_unit)
+    finally:
+        app.extensions['group_commit'] = writer
@@ -0,0 +1,23 @@
+import socket
+import pytest
+import redis
+from app.utils import health
+from app.utils.config import Config
+
+
+def test_hung_redis_probe_gives_its_thread_back(monkeypatch):
+    # Accepts connections but never answers, like a wedged Redis
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    monkeypatch.setattr(Config, 'REDIS_HOST', '127.0.0.1')
+    monkeypatch.setattr(Config, 'REDIS_PORT', server.getsockname()[1])
+    monkeypatch.setattr(Config, 'HEALTH_CHECK_TIMEOUT', 0.2)
+    monkeypatch.setattr(health, 'USE_REDIS', True)
+    monkeypatch.setattr(health, '_redis_probe', health.create_redis_probe())
+    try:
+        future = health._executor.submit(health._check_redis, None)
+        with pytest.raises(redis.TimeoutError):
+            future.result(timeout=1)
+    finally:
+        server.close()
@@ -0,0 +1,81 @@
+import fakeredis
+import pytest
+from app import db, routes
+from app.models import Order
+from app.utils import idempotency, order_status
+from app.utils.config import Config
+
+KEY = 'k' * 32
+SCOPE = 'pickup:user@example.com'
+FORM = {'contact_number': '9876543210', 'description': 'Old newspapers'}
+
+
+@pytest.fixture(params=['database', 'redis'])
+def store(request, monkeypatch):
+    if request.param == 'redis':
+        monkeypatch.setattr(idempotency, 'USE_REDIS', True)
+        monkeypatch.setattr(idempotency, 'redis_client', fakeredis.FakeRedis(decode_responses=True))
+    monkeypatch.setattr(Config, 'IDEMPOTENCY_WAIT_SECONDS', 0.2)
+    return request.param
+
+
+def submit(client):
+    return client.post(f'/schedule-pickup?idempotency_key={KEY}', data=FORM)
+
+
+def order_count(app):
+    with app.app_context():
+        return db.session.execute(db.select(db.func.count()).select_from(Order)).scalar()
+
+
+def flashes(client):
+    with client.session_transaction() as s:
+        return [message for _, message in s.pop('_flashes', [])]
+
+
+def test_duplicate_submission_returns_the_original_result(app, client, store):
+    assert submit(client).status_code == 302
+    assert flashes(client) == ['Pickup scheduled successfully!']
+    response = submit(client)
+    assert response.status_code == 302 and response.location == '/dashboard'
+    assert flashes(client) == ['Pickup scheduled successfully!']
+    assert order_count(app) == 11
+
+
+def test_duplicate_while_in_flight_creates_nothing(app, client, store):
+    with app.app_context():
+        assert idempotency.claim(SCOPE, KEY) is None
+    response = submit(client)
+    assert response.status_code == 302 and response.location == '/dashboard'
+    assert flashes(client) == ['Your pickup request is being processed']
+    assert order_count(app) == 10
+
+
+def test_result_is_not_visible_before_the_commit(app, client, store, monkeypatch):
+    seen = []
+    record_created = order_status.record_created
+
+    def fail_after_write(order, session):
+        record_created(order, session)
+        seen.append(idempotency.get_record(SCOPE, KEY)['status'] if store == 'redis' else None)
+        raise RuntimeError('commit failed')
+
+    monkeypatch.setattr(order_status, 'record_created', fail_after_write)
+    response = submit(client)
+    assert response.status_code == 200 and b'An error occurred while scheduling pickup' in response.data
+    with app.app_context():
+        assert idempotency.get_record(SCOPE, KEY) is None
+    if store == 'redis':
+        assert seen == [idempotency.IN_FLIGHT]
+    assert order_count(app) == 10
+
+
+def test_timed_out_write_keeps_the_key_claimed(app, client, store, monkeypatch):
+    def timed_out(unit):
+        raise TimeoutError()
+
+    monkeypatch.setattr(routes, 'run_write', timed_out)
+    response = submit(client)
+    assert response.status_code == 302 and response.location == '/dashboard'
+    with app.app_context():
+        assert idempotency.get_record(SCOPE, KEY)['status'] == idempotency.IN_FLIGHT
@@ -0,0 +1,97 @@
+import base64
+import os
+import pytest
+from .conftest import STAFF_HEADERS, COLLECTOR_HEADERS
+from app import db
+from app.models import Order
+from app.utils import images
+from app.utils.config import Config
+
+# A PNG signature followed by enough bytes to span several decode chunks
+PHOTO = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 1000
+
+
+@pytest.fixture
+def photo_order(app, seeded):
+    with app.app_context():
+        order = db.session.get(Order, 1)
+        order.images = [base64.b64encode(b'other photo').decode(), base64.b64encode(PHOTO).decode()]
+        db.session.commit()
+    return '/orders/1/images/1'
+
+
+def test_inline_image_full_body(client, photo_order):
+    response = client.get(photo_order)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.data == PHOTO
+    assert response.content_length == len(PHOTO)
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'private' in response.headers['Cache-Control']
+
+
+def test_inline_image_conditional_get(client, photo_order):
+    etag = client.get(photo_order).headers['ETag']
+    response = client.get(photo_order, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+@pytest.mark.parametrize('header,start,stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=1-1', 1, 2),
+    ('bytes=70001-', 70001, len(PHOTO)),
+    ('bytes=-5', len(PHOTO) - 5, len(PHOTO)),
+])
+def test_inline_image_range(client, photo_order, header, start, stop):
+    response = client.get(photo_order, headers={'Range': header})
+    assert response.status_code == 206
+    assert response.data == PHOTO[start:stop]
+    assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{len(PHOTO)}'
+
+
+def test_inline_image_unsatisfiable_range(client, photo_order):
+    response = client.get(photo_order, headers={'Range': f'bytes={len(PHOTO)}-'})
+    assert response.status_code == 416
+
+
+def test_stale_if_range_sends_whole_image(client, photo_order):
+    response = client.get(photo_order, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert response.data == PHOTO
+
+
+def test_disk_image(app, client, photo_order, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'IMAGE_DIR', str(tmp_path / 'images'))
+    with app.app_context():
+        assert images.offload_inline_images() == 11  # the photo order plus the seeded ones
+        entry = db.session.get(Order, 1).images[1]
+    assert entry['sha256'] and os.path.exists(images.image_path(entry['sha256']))
+
+    response = client.get(photo_order, headers={'Range': 'bytes=8-15'})
+    assert response.status_code == 206
+    assert response.data == PHOTO[8:16]
+    assert client.get(photo_order, headers={'If-None-Match': f'"{entry["sha256"]}"'}).status_code == 304
+
+    monkeypatch.setattr(Config, 'IMAGE_ACCEL_REDIRECT_PREFIX', '/protected-images/')
+    response = client.get(photo_order)
+    assert response.headers['X-Accel-Redirect'] == f"/protected-images/{entry['sha256'][:2]}/{entry['sha256']}"
+    assert response.data == b''
+
+
+def test_image_access(app, client, photo_order):
+    anonymous = app.test_client()
+    assert anonymous.get(photo_order).status_code == 302
+    assert anonymous.get(photo_order, headers=STAFF_HEADERS).status_code == 200
+    # Order 1 is unassigned; order 2 belongs to collector c1
+    assert anonymous.get(photo_order, headers=COLLECTOR_HEADERS).status_code == 404
+    assert anonymous.get('/orders/2/images/0', headers=COLLECTOR_HEADERS).status_code == 200
+    assert client.get('/orders/1/images/5').status_code == 404
+    assert client.get('/orders/999/images/0').status_code == 404
+
+
+def test_dashboard_links_photos_without_loading_them(client, photo_order):
+    page = client.get('/dashboard').get_data(as_text=True)
+    assert f'href="{photo_order}"' in page
+    assert '<img' not in page
@@ -0,0 +1,55 @@
+import io
+import logging
+import os
+import runpy
+import tracemalloc
+from types import SimpleNamespace
+import pytest
+from .conftest import STAFF_HEADERS
+from app.utils import memory
+from app.utils.config import Config
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    monkeypatch.setattr(Config, 'MEMORY_TRACE_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(memory, '_endpoint_peaks', {})
+    tracemalloc.start(5)
+    yield
+    tracemalloc.stop()
+
+
+def test_debug_endpoint_requires_staff_token(client):
+    assert client.get('/debug/memory').status_code == 401
+
+
+def test_debug_endpoint_reports_worker_rss(client):
+    body = client.get('/debug/memory', headers=STAFF_HEADERS).get_json()
+    assert body['workers'][0]['pid'] == os.getpid()
+    assert body['workers'][0]['rss_bytes'] > 0
+    assert body['top_allocations'] is None and body['tracing'] is False
+
+
+def test_sampled_request_peak_and_top_allocations(client, tracing):
+    upload = (io.BytesIO(b'\xff\xd8\xff' + os.urandom(2 * 1024 * 1024)), 'photo.jpg')
+    response = client.post('/schedule-pickup', data={'contact_number': '9876543210', 'images': upload},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    body = client.get('/debug/memory?limit=5', headers=STAFF_HEADERS).get_json()
+    # The upload is buffered and base64-encoded in the worker
+    assert body['endpoints']['main.schedule_pickup']['max_peak_bytes'] > 2 * 1024 * 1024
+    assert len(body['top_allocations']) == 5
+    assert client.get('/debug/memory?group_by=bogus', headers=STAFF_HEADERS).status_code == 400
+
+
+@pytest.mark.parametrize('rss_mb,recycled', [(100, False), (600, True)])
+def test_gunicorn_recycles_worker_above_rss_watermark(monkeypatch, rss_mb, recycled):
+    monkeypatch.setenv('GUNICORN_MAX_RSS_MB', '512')
+    conf = runpy.run_path(GUNICORN_CONF)
+    monkeypatch.setattr(memory, 'rss_bytes', lambda: rss_mb * 1024 * 1024)
+    worker = SimpleNamespace(alive=True, pid=1234, log=logging.getLogger('gunicorn.error'))
+    conf['post_request'](worker, SimpleNamespace(method='POST', path='/schedule-pickup'), {}, None)
+    assert worker.alive is not recycled
@@ -0,0 +1,33 @@
+from .conftest import STAFF_HEADERS, COLLECTOR_HEADERS
+from app import db
+from app.models import Order
+
+
+def notify(client, headers, *updates):
+    response = client.post('/api/notify', json={'updates': list(updates)}, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+
+def test_collector_updates_only_orders_assigned_to_them(app, client):
+    # Orders 2, 4, ... are assigned to c1; 1, 3, ... are unassigned
+    results = notify(client, COLLECTOR_HEADERS,
+                     {'order_id': 2, 'status': 'collected'},
+                     {'order_id': 1, 'status': 'cancelled'},
+                     {'order_id': 3, 'status': 'assigned'})
+    assert results[0] == {'order_id': 2, 'ok': True, 'status': 'collected'}
+    assert results[1]['ok'] is False and results[1]['error'] == 'Order is not assigned to you'
+    assert results[2]['ok'] is False
+    with app.app_context():
+        assert db.session.get(Order, 1).status == 'scheduled'
+        assert db.session.get(Order, 3).assigned_collector is None
+
+
+def test_only_staff_assign(app, client):
+    results = notify(client, COLLECTOR_HEADERS, {'order_id': 2, 'status': 'assigned', 'collector': 'c2'})
+    assert results[0]['error'] == 'Only staff can assign orders'
+
+    results = notify(client, STAFF_HEADERS, {'order_id': 1, 'status': 'assigned', 'collector': 'c1'})
+    assert results[0]['ok'] is True
+    results = notify(client, COLLECTOR_HEADERS, {'order_id': 1, 'status': 'collected'})
+    assert results[0]['ok'] is True
@@ -0,0 +1,80 @@
+import fakeredis
+import pytest
+from app import routes
+from app.utils import otp
+from app.utils.config import Config
+
+EMAIL = 'otp@example.com'
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request, monkeypatch):
+    """Empty OTP store of either kind"""
+    for name in ('_otp_storage', '_otp_email_index', '_otp_resend_after'):
+        monkeypatch.setattr(otp, name, {})
+    if request.param == 'redis':
+        client = fakeredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(otp, 'USE_REDIS', True)
+        monkeypatch.setattr(otp, 'redis_client', client)
+    else:
+        monkeypatch.setattr(otp, 'USE_REDIS', False)
+    return request.param
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Codes emailed by /login"""
+    emails = []
+    monkeypatch.setattr(routes, 'send_otp_email_html', lambda email, code: emails.append(code) or True)
+    return emails
+
+
+def test_repeat_login_within_cooldown_sends_no_email(app, backend, sent):
+    client = app.test_client()
+    first = client.post('/login', data={'email': EMAIL})
+    assert b'OTP sent successfully' in first.data
+    second = client.post('/login', data={'email': EMAIL})
+    assert b'OTP already sent' in second.data
+    assert len(sent) == 1
+
+    # Whichever login the user answers, the one code works
+    response = client.post('/verify-otp', data={'otp': sent[0]})
+    assert response.status_code == 302
+
+
+def test_repeat_after_cooldown_resends_the_same_code(backend):
+    session_id, code, retry_after = otp.issue_otp(EMAIL)
+    assert retry_after == 0
+    assert otp.issue_otp(EMAIL)[2] > 0
+    otp.release_resend(EMAIL)
+    assert otp.issue_otp(EMAIL) == (session_id, code, 0)
+
+
+def test_near_expiry_code_is_replaced_and_sent(backend):
+    session_id, _, _ = otp.issue_otp(EMAIL, ttl_seconds=Config.OTP_REUSE_MIN_TTL_SECONDS - 1)
+    new_session_id, _, retry_after = otp.issue_otp(EMAIL)
+    # A new code is emailed at once, whatever the cooldown of the old one
+    assert new_session_id != session_id and retry_after == 0
+    assert otp.verify_otp(new_session_id, otp.get_otp_data(new_session_id)['otp_code'])[0]
+
+
+def test_verify_clears_the_index_and_cooldown(backend):
+    session_id, code, _ = otp.issue_otp(EMAIL)
+    wrong = '000000' if code != '000000' else '111111'
+    assert otp.verify_otp(session_id, wrong) == (False, 'Invalid OTP code')
+    assert otp.verify_otp(session_id, code) == (True, 'OTP verified successfully')
+    assert otp.verify_otp(session_id, code)[0] is False
+
+    # The next login issues and sends a fresh code
+    new_session_id, _, retry_after = otp.issue_otp(EMAIL)
+    assert new_session_id != session_id and retry_after == 0
+
+
+def test_failed_send_releases_the_cooldown(app, backend, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(routes, 'send_otp_email_html', lambda email, code: attempts.append(code) and False)
+    client = app.test_client()
+    assert b'Failed to send OTP' in client.post('/login', data={'email': EMAIL}).data
+    assert b'Failed to send OTP' in client.post('/login', data={'email': EMAIL}).data
+    # Retried straight away, with the same code
+    assert len(attempts) == 2 and attempts[0] == attempts[1]
@@ -0,0 +1,48 @@
+import fakeredis
+import pytest
+from app import db
+from app.models import OutboxEvent
+from app.utils import outbox
+from app.utils.config import Config
+
+
+def add_events(app, count=3):
+    with app.app_context():
+        for i in range(count):
+            outbox.add_event(i + 1, 'order.scheduled', {'order_id': i + 1})
+        db.session.commit()
+
+
+def unpublished(app):
+    with app.app_context():
+        return db.session.query(OutboxEvent).filter(OutboxEvent.published_at.is_(None)).count()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(outbox, 'USE_REDIS', True)
+    monkeypatch.setattr(outbox, 'redis_client', client)
+    return client
+
+
+def test_relay_without_redis_leaves_events_queued(app, monkeypatch):
+    monkeypatch.setattr(outbox, 'USE_REDIS', False)
+    add_events(app)
+    result = app.test_cli_runner().invoke(args=['outbox', 'relay', '--once'])
+    assert result.exit_code != 0 and 'USE_REDIS' in result.output
+    with app.app_context(), pytest.raises(outbox.StreamUnavailable):
+        outbox.relay_once()
+    assert unpublished(app) == 3
+
+
+def test_relay_publishes_to_the_stream(app, fake_redis):
+    add_events(app)
+    result = app.test_cli_runner().invoke(args=['outbox', 'relay', '--once', '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert unpublished(app) == 0
+
+    messages = outbox.consume('billing', 'worker-1', block_ms=10)
+    assert [fields['order_id'] for _, fields in messages] == ['1', '2', '3']
+    outbox.ack('billing', [message_id for message_id, _ in messages])
+    assert fake_redis.xpending(Config.OUTBOX_STREAM, 'billing')['pending'] == 0
@@ -0,0 +1,29 @@
+import os
+import stat
+from app.utils import postal
+from app.utils.config import Config
+
+
+def test_index_defaults_to_private_instance_dir(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'POSTAL_INDEX_PATH', '')
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path / 'instance'))
+    index_path = postal.index_path_for(app)
+    assert index_path == os.path.join(app.instance_path, 'postal-codes.idx')
+
+    directory = postal.load_directory(index_path)
+    assert stat.S_IMODE(os.stat(app.instance_path).st_mode) == 0o700
+    assert directory.lookup('560001')['city'] == 'Bengaluru'
+
+
+def test_lookup_endpoint(client):
+    response = client.get('/api/postal-codes/560001')
+    assert response.status_code == 200
+    assert response.get_json()['state_code'] == 'KA'
+    assert client.get('/api/postal-codes/999999').status_code == 404
+
+
+def test_build_command(app, tmp_path):
+    result = app.test_cli_runner().invoke(args=['postal', 'build'])
+    assert result.exit_code == 0, result.output
+    assert 'Indexed 36 postal code' in result.output
+    assert postal.PostalDirectory(postal.index_path_for(app)).lookup('560001')['state_code'] == 'KA'
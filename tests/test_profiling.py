@@ -0,0 +1,41 @@
+import os
+import stat
+import time
+from app.utils import profiling
+from app.utils.config import Config
+
+
+def test_verify_token(monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILE_SECRET', 'secret')
+    token = profiling.make_token(60)
+    assert profiling.verify_token(token)
+
+    expires, _, signature = token.partition('.')
+    assert not profiling.verify_token(f"{int(time.time()) - 1}.{profiling._signature(int(time.time()) - 1)}")
+    assert not profiling.verify_token(f"{int(expires) + 60}.{signature}")
+    assert not profiling.verify_token(f"{expires}.{'0' * len(signature)}")
+    assert not profiling.verify_token('not-a-token')
+    monkeypatch.setattr(Config, 'PROFILE_SECRET', 'other-secret')
+    assert not profiling.verify_token(token)
+
+
+def test_nothing_is_wrapped_when_disabled(app, monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILING_ENABLED', False)
+    views = dict(app.view_functions)
+    assert profiling.init_profiling(app) is None
+    assert app.view_functions == views
+
+
+def test_profiles_go_to_a_private_instance_dir(app, client, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(Config, 'PROFILE_SECRET', 'secret')
+    monkeypatch.setattr(Config, 'PROFILE_DIR', '')
+    monkeypatch.setattr(Config, 'PROFILE_ENDPOINTS', ['main.dashboard'])
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path / 'instance'))
+    assert profiling.init_profiling(app) == ['main.dashboard']
+
+    profile_dir = os.path.join(app.instance_path, 'profiles')
+    assert stat.S_IMODE(os.stat(profile_dir).st_mode) == 0o700
+    response = client.get('/dashboard', headers={profiling.PROFILE_HEADER: profiling.make_token(60)})
+    assert response.status_code == 200
+    assert [name.startswith('main-dashboard-') for name in os.listdir(profile_dir)] == [True]
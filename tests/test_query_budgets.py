@@ -0,0 +1,100 @@
+"""
+SQL query budgets per route.
+
+Each route runs against a seeded temporary database with every statement
+recorded. A request fails when it exceeds its budget, when it repeats a
+statement (the shape of an N+1 loop, e.g. touching `order.address` per
+order in a template), or when its query count grows with the number of
+rows it renders. Raise a budget only together with the change that
+needs the extra query.
+"""
+import pytest
+from .conftest import STAFF_HEADERS, COLLECTOR_HEADERS, seed
+from .query_budget import QueryRecorder, assert_query_budget
+from app import db
+from app.models import Address
+
+# (label, method, path, request kwargs, budget, expected status)
+ROUTES = [
+    ('index', 'GET', '/', {}, 0, 200),
+    ('login form', 'GET', '/login', {}, 0, 200),
+    ('dashboard', 'GET', '/dashboard', {}, 4, 200),
+    ('archived dashboard', 'GET', '/dashboard?archived=1', {}, 5, 200),
+    ('update address form', 'GET', '/update-address', {}, 1, 200),
+    ('schedule pickup form', 'GET', '/schedule-pickup', {}, 1, 200),
+    ('address form', 'GET', '/address-form', {}, 0, 200),
+    ('autosave read', 'GET', '/api/form-submit', {}, 1, 200),
+    ('collector sync', 'GET', '/api/collector/sync', {'headers': COLLECTOR_HEADERS}, 2, 200),
+    ('pickup report', 'GET', '/api/reports/pickups', {'headers': STAFF_HEADERS}, 1, 200),
+    ('order search', 'GET', '/api/search/orders?q=pickup', {'headers': STAFF_HEADERS}, 1, 200),
+    ('order image', 'GET', '/orders/1/images/0', {}, 2, 200),
+    ('healthz', 'GET', '/healthz', {}, 0, 200),
+]
+
+
+@pytest.mark.parametrize('label,method,path,kwargs,budget,status', ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_query_budget(client, queries, label, method, path, kwargs, budget, status):
+    with queries:
+        response = client.open(path, method=method, **kwargs)
+    assert response.status_code == status
+    assert_query_budget(queries, budget, label)
+
+
+def test_schedule_pickup_query_budget(client, queries):
+    data = {'contact_number': '9876543210', 'description': 'Old newspapers'}
+    with queries:
+        response = client.post('/schedule-pickup?idempotency_key=' + 'a' * 32, data=data)
+    assert response.status_code == 302
+    # Address lookup, idempotency claim (committed on its own, so the
+    # address is refreshed), then the group-commit writer's BEGIN IMMEDIATE,
+    # rollup upsert, order insert, outbox event, idempotency completion
+    assert_query_budget(queries, 10, 'schedule pickup')
+
+
+def test_notify_batch_query_budget(client, queries):
+    updates = [{'order_id': i, 'status': 'cancelled'} for i in range(1, 11)]
+    with queries:
+        response = client.post('/api/notify', json={'updates': updates}, headers=STAFF_HEADERS)
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 10
+    # One SELECT for the batch; the per-order UPDATEs and tombstone/outbox
+    # INSERTs are the writes themselves, not N+1 reads
+    reads = [sql for sql in queries.statements if sql.startswith('SELECT')]
+    assert len(reads) == 1, '\n'.join(reads)
+
+
+@pytest.mark.parametrize('path,kwargs', [
+    ('/dashboard', {}),
+    ('/api/collector/sync', {'headers': COLLECTOR_HEADERS}),
+    ('/api/reports/pickups', {'headers': STAFF_HEADERS}),
+])
+def test_query_count_does_not_grow_with_rows(app, path, kwargs):
+    """Rendering 2 or 40 orders must cost the same number of queries"""
+    counts = []
+    for orders in (2, 40):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        ids = seed(app, orders=orders)
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = ids['user_id']
+            s['email'] = ids['email']
+        with QueryRecorder() as recorder:
+            assert client.get(path, **kwargs).status_code == 200
+        counts.append(recorder.count)
+    assert counts[0] == counts[1], f"{path}: {counts[0]} queries for 2 orders, {counts[1]} for 40"
+
+
+def test_recorder_flags_lazy_relationship_loop(app, seeded):
+    """The harness itself catches the classic N+1 over a dynamic relationship"""
+    with app.app_context():
+        addresses = Address.query.all()
+        with QueryRecorder() as recorder:
+            # What `{% for a in addresses %}{{ a.orders.count() }}` would do:
+            # one query per row
+            for address in addresses:
+                address.orders.count()
+    assert recorder.repeated(), recorder.report()
+    with pytest.raises(AssertionError, match='possible N\\+1'):
+        assert_query_budget(recorder, 100, 'lazy loop')
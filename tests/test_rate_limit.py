@@ -0,0 +1,26 @@
+import pytest
+from app.utils import rate_limit
+from app.utils.config import Config
+
+
+@pytest.fixture
+def behind_proxy(monkeypatch):
+    monkeypatch.setattr(Config, 'TRUSTED_PROXY_HOPS', 1)
+    monkeypatch.setattr(rate_limit, '_buckets', {})
+
+
+def login_from(client, ip, i):
+    return client.post('/login', data={'email': f'user{i}@example.com'},
+                       headers={'X-Forwarded-For': ip}).status_code
+
+
+def test_ip_buckets_follow_the_forwarded_client(behind_proxy, app, monkeypatch):
+    from app import routes
+    monkeypatch.setattr(Config, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(routes, 'send_otp_email_html', lambda email, code: True)
+    client = app.test_client()
+    capacity = int(Config.RATE_LIMIT_LOGIN_IP.split('/')[0])
+
+    assert [login_from(client, '203.0.113.7', i) for i in range(capacity + 1)][-1] == 429
+    # Another client behind the same proxy keeps its own bucket
+    assert login_from(client, '198.51.100.9', capacity + 1) != 429
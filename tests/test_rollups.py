@@ -0,0 +1,67 @@
+from datetime import datetime
+from sqlalchemy import insert
+from app import db
+from app.models import Order, PickupRollup
+from app.utils import rollups
+
+
+def totals():
+    return {(r['city'], r['state']): r['pickups'] for r in rollups.pickup_report(['city', 'state'])}
+
+
+def test_catch_up_counts_each_order_once(app, seeded):
+    with app.app_context():
+        assert rollups.catch_up(batch_size=3) == 10
+        assert rollups.catch_up() == 0
+        assert totals() == {('Bangalore', 'KA'): 10}
+
+
+def test_new_order_is_counted_with_its_insert(client, app):
+    assert client.post('/schedule-pickup', data={'contact_number': '9876543210'}).status_code == 302
+    with app.app_context():
+        order = db.session.execute(db.select(Order).order_by(Order.order_id.desc())).scalar()
+        assert order.rolled_up is True
+        assert totals() == {('Bangalore', 'KA'): 1}
+        assert rollups.catch_up() == 10
+        assert totals() == {('Bangalore', 'KA'): 11}
+
+
+def test_orders_below_counted_ids_are_still_caught_up(app, seeded):
+    with app.app_context():
+        rollups.catch_up()
+        # An import that brings its own, lower order_id
+        db.session.execute(db.delete(Order).where(Order.order_id == 3))
+        db.session.execute(insert(Order), [{
+            'order_id': 3, 'user_email': seeded['email'], 'address_id': seeded['address_id'],
+            'contact_number': '9876543210', 'date': datetime.utcnow(),
+        }])
+        db.session.commit()
+        assert rollups.catch_up() == 1
+        assert totals() == {('Bangalore', 'KA'): 11}
+
+
+def test_rebuild_keeps_sync_timestamps(app, seeded):
+    with app.app_context():
+        rollups.catch_up()
+        before = dict(db.session.execute(db.select(Order.order_id, Order.updated_at)).all())
+        assert rollups.rebuild() == 10
+        assert totals() == {('Bangalore', 'KA'): 10}
+        db.session.expire_all()
+        assert dict(db.session.execute(db.select(Order.order_id, Order.updated_at)).all()) == before
+
+
+def test_reimported_orders_are_counted_again(app, seeded, tmp_path):
+    with app.app_context():
+        rollups.catch_up()
+    runner = app.test_cli_runner()
+    path = str(tmp_path / 'orders.ndjson')
+    assert runner.invoke(args=['data', 'export', 'orders', path]).exit_code == 0
+    with app.app_context():
+        db.session.execute(db.delete(Order))
+        db.session.execute(db.delete(PickupRollup))
+        db.session.commit()
+    result = runner.invoke(args=['data', 'import', 'orders', path])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert rollups.catch_up() == 10
+        assert totals() == {('Bangalore', 'KA'): 10}
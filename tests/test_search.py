@@ -0,0 +1,128 @@
+import os
+import pytest
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import create_engine, text
+from .conftest import STAFF_HEADERS
+from app import db
+from app.models import Order
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+
+def search(client, q, **params):
+    response = client.get('/api/search/orders', query_string={'q': q, **params}, headers=STAFF_HEADERS)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def add_order(app, email, address_id, description):
+    with app.app_context():
+        order = Order(user_email=email, address_id=address_id, contact_number='9876543210', description=description)
+        db.session.add(order)
+        db.session.commit()
+        return order.order_id
+
+
+def test_description_matches_rank_above_address_matches(app, client, seeded):
+    best = add_order(app, seeded['email'], seeded['address_id'], 'Bangalore bookshelf')
+    body = search(client, 'bangalore')
+    # Every order matches on its city; the description hit is weighted higher
+    assert body['results'][0]['order_id'] == best
+    assert len(body['results']) == 11
+    assert '[Bangalore]' in body['results'][0]['snippet']
+
+
+def test_last_word_matches_as_prefix(app, client, seeded):
+    order_id = add_order(app, seeded['email'], seeded['address_id'], 'Old refrigerator')
+    assert [r['order_id'] for r in search(client, 'refrig')['results']] == [order_id]
+    # Earlier words must match whole; every word must match
+    assert search(client, 'refrig old')['results'] == []
+    assert [r['order_id'] for r in search(client, 'old refrig')['results']] == [order_id]
+    assert search(client, 'refrigerator sofa')['results'] == []
+
+
+def test_paging(client):
+    first = search(client, 'pickup', per_page=4)
+    second = search(client, 'pickup', per_page=4, page=3)
+    assert len(first['results']) == 4 and first['has_more'] is True
+    assert len(second['results']) == 2 and second['has_more'] is False
+
+
+def migrated_engine(tmp_path):
+    """A database built by the Alembic migrations rather than create_all()"""
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = AlembicConfig()
+    config.set_main_option('script_location', MIGRATIONS)
+    config.set_main_option('sqlalchemy.url', url)
+    command.upgrade(config, 'head')
+    return create_engine(url)
+
+
+@pytest.fixture(params=['create_all', 'migrations'])
+def engine(request, app, tmp_path):
+    if request.param == 'migrations':
+        engine = migrated_engine(tmp_path)
+        yield engine
+        engine.dispose()
+    else:
+        with app.app_context():
+            yield db.engine
+
+
+def matches(conn, query):
+    return conn.execute(
+        text("SELECT rowid FROM order_search WHERE order_search MATCH :q ORDER BY rowid"), {'q': query}
+    ).scalars().all()
+
+
+def test_triggers_keep_the_index_in_sync(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (email, created_at) VALUES ('t@example.com', CURRENT_TIMESTAMP)"))
+        for address_id, (street, city) in enumerate([('MG Road', 'Pune'), ('Park Street', 'Kolkata')], start=101):
+            conn.execute(text(
+                "INSERT INTO address (address_id, user_email, address, city, postal_code, updated_at) "
+                "VALUES (:id, 't@example.com', :street, :city, '411001', CURRENT_TIMESTAMP)"
+            ), {'id': address_id, 'street': street, 'city': city})
+        conn.execute(text(
+            'INSERT INTO "order" (order_id, date, user_email, address_id, contact_number, description, status, updated_at) '
+            "VALUES (500, CURRENT_TIMESTAMP, 't@example.com', 101, '9876543210', 'washing machine', 'scheduled', CURRENT_TIMESTAMP)"
+        ))
+        # Insert indexes the description and the address fields
+        assert matches(conn, 'washing') == [500]
+        assert matches(conn, 'pune') == [500]
+
+        # Updating the description or the address_id reindexes the order
+        conn.execute(text('UPDATE "order" SET description = \'study table\', address_id = 102 WHERE order_id = 500'))
+        assert matches(conn, 'washing') == [] and matches(conn, 'pune') == []
+        assert matches(conn, 'table') == [500] and matches(conn, 'kolkata') == [500]
+
+        # An address edited in place is copied into its orders' rows
+        conn.execute(text("UPDATE address SET city = 'Howrah' WHERE address_id = 102"))
+        assert matches(conn, 'kolkata') == [] and matches(conn, 'howrah') == [500]
+
+        # Delete (archiving) drops the order from the index
+        conn.execute(text('DELETE FROM "order" WHERE order_id = 500'))
+        assert matches(conn, 'table') == [] and matches(conn, 'howrah') == []
+
+
+def test_rebuild_keeps_orders_scheduled_while_it_runs(app, seeded, monkeypatch):
+    from app.utils import search
+    index_batch = search._index_batch
+    added = []
+
+    def schedule_between_batches(after_id, limit):
+        order_ids = index_batch(after_id, limit)
+        if not added:
+            # Another worker schedules a pickup; its trigger indexes it first
+            added.append(add_order(app, seeded['email'], seeded['address_id'], 'Late sofa'))
+        return order_ids
+
+    monkeypatch.setattr(search, '_index_batch', schedule_between_batches)
+    with app.app_context():
+        db.session.execute(text('DELETE FROM order_search WHERE rowid = 5'))
+        db.session.execute(text("INSERT INTO order_search (rowid, description) VALUES (999, 'ghost')"))
+        db.session.commit()
+        assert search.rebuild_index(batch_size=3) == 11
+        indexed = db.session.execute(text('SELECT rowid FROM order_search ORDER BY rowid')).scalars().all()
+    assert indexed == list(range(1, 11)) + added
@@ -0,0 +1,122 @@
+import time
+import fakeredis
+import pytest
+from app.utils import sessions
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Count session store reads"""
+    calls = []
+    load = sessions._load
+
+    def counting_load(sid, ttl):
+        calls.append(sid)
+        return load(sid, ttl)
+
+    monkeypatch.setattr(sessions, '_load', counting_load)
+    return calls
+
+
+def session_cookie(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+
+def test_cookie_holds_only_an_opaque_id(client):
+    sid = session_cookie(client)
+    assert sid and 'user' not in sid and '.' not in sid
+    assert client.get('/dashboard').status_code == 200
+
+
+def test_requests_that_skip_the_session_skip_the_lookup(client, lookups):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert lookups == []
+    assert 'Set-Cookie' not in response.headers
+
+    client.get('/dashboard')
+    assert lookups == [session_cookie(client)]
+
+
+def test_logout_revokes_the_session_everywhere(app, client):
+    sid = session_cookie(client)
+    assert client.get('/logout').status_code == 302
+    # Replaying the old cookie from another client no longer signs in
+    other = app.test_client()
+    other.set_cookie('session', sid)
+    assert other.get('/dashboard').status_code == 302
+
+
+def test_unknown_session_id_is_replaced(app, seeded):
+    client = app.test_client()
+    client.set_cookie('session', 'attacker-chosen-id')
+    with client.session_transaction() as s:
+        s['user_id'] = seeded['user_id']
+        s['email'] = seeded['email']
+    assert session_cookie(client) != 'attacker-chosen-id'
+
+
+def test_revoke_user_sessions(app, client, seeded):
+    assert sessions.revoke_user_sessions(seeded['email']) >= 1
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_sliding_expiry(app, client, monkeypatch):
+    sid = session_cookie(client)
+    expires_before = sessions._local_sessions[sid][0]
+    monkeypatch.setattr(time, 'time', lambda: expires_before - 1)
+    assert client.get('/dashboard').status_code == 200
+    assert sessions._local_sessions[sid][0] == expires_before - 1 + 3600
+
+    monkeypatch.setattr(time, 'time', lambda: expires_before + 3600)
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_sign_in_moves_to_a_new_session_id(app, monkeypatch):
+    from app import routes
+    codes = {}
+    monkeypatch.setattr(routes, 'send_otp_email_html', lambda email, code: codes.setdefault(email, code) or True)
+    client = app.test_client()
+    client.post('/login', data={'email': 'new@example.com'})
+    before = session_cookie(client)
+    response = client.post('/verify-otp', data={'otp': codes['new@example.com']})
+    assert response.status_code == 302 and response.location == '/address-form'
+    assert session_cookie(client) != before
+    assert before not in sessions._local_sessions
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(sessions, 'USE_REDIS', True)
+    monkeypatch.setattr(sessions, 'redis_client', client)
+    monkeypatch.setattr(sessions, '_load_and_touch', client.register_script(sessions._LOAD_AND_TOUCH))
+    return client
+
+
+def test_redis_lookup_slides_the_user_index_too(app, seeded, fake_redis):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = seeded['user_id']
+        s['email'] = seeded['email']
+    sid = session_cookie(client)
+    user_key = sessions.USER_SESSIONS_KEY.format(seeded['email'])
+    assert fake_redis.smembers(user_key) == {sid}
+
+    fake_redis.expire(sessions.SESSION_KEY.format(sid), 5)
+    fake_redis.expire(user_key, 5)
+    assert client.get('/dashboard').status_code == 200
+    assert fake_redis.ttl(sessions.SESSION_KEY.format(sid)) > 5
+    assert fake_redis.ttl(user_key) > 5
+
+    # The index still finds the session, so revocation still reaches it
+    assert sessions.revoke_user_sessions(seeded['email']) == 1
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_cli_revoke_refuses_without_redis(app, monkeypatch):
+    monkeypatch.setattr(sessions, 'USE_REDIS', False)
+    result = app.test_cli_runner().invoke(args=['sessions', 'revoke', 'user@example.com'])
+    assert result.exit_code != 0
+    assert 'USE_REDIS' in result.output
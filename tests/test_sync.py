@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from .conftest import STAFF_HEADERS, COLLECTOR_HEADERS
+from .query_budget import assert_query_budget
+from app import db
+from app.models import Order, SyncChange
+from app.utils import sync
+
+
+def sync_page(client, cursor=None, limit=100):
+    query = f'?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+    response = client.get('/api/collector/sync' + query, headers=COLLECTOR_HEADERS)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def notify(client, *updates):
+    response = client.post('/api/notify', json={'updates': list(updates)}, headers=STAFF_HEADERS)
+    assert all(r['ok'] for r in response.get_json()['results'])
+
+
+def test_cursor_pages_through_every_change_once(client):
+    seen, cursor = [], None
+    while True:
+        page = sync_page(client, cursor, limit=2)
+        assert len(page['orders']) <= 2
+        seen += [o['id'] for o in page['orders']]
+        cursor = page['cursor']
+        if not page['has_more']:
+            break
+    assert seen == [2, 4, 6, 8, 10]
+    assert {a['id'] for a in sync_page(client)['addresses']} == {1, 2, 3}
+
+    final = sync_page(client, cursor)
+    assert final['orders'] == [] and final['removed'] == [] and final['cursor'] == cursor
+
+
+def test_reassigned_order_is_removed_once(client):
+    cursor = sync_page(client)['cursor']
+    notify(client, {'order_id': 2, 'status': 'assigned', 'collector': 'c2'},
+           {'order_id': 4, 'status': 'collected'})
+    page = sync_page(client, cursor)
+    assert page['removed'] == [2]
+    assert [(o['id'], o['status']) for o in page['orders']] == [(4, 'collected')]
+
+    # Assigned back: the order replaces its removal in a fresh sync
+    notify(client, {'order_id': 2, 'status': 'assigned', 'collector': 'c1'})
+    page = sync_page(client, page['cursor'])
+    assert page['removed'] == [] and [o['id'] for o in page['orders']] == [2]
+    assert 2 not in sync_page(client)['removed']
+
+
+def test_late_commit_with_older_timestamp_is_delivered(app, client):
+    cursor = sync_page(client)['cursor']
+    with app.app_context():
+        # A transaction that stamped its change before the last sync but
+        # committed after it
+        order = db.session.get(Order, 1)
+        order.status, order.assigned_collector = 'assigned', 'c1'
+        order.updated_at = datetime.utcnow() - timedelta(minutes=5)
+        sync.record_change('c1', order.order_id)
+        db.session.commit()
+    assert [o['id'] for o in sync_page(client, cursor)['orders']] == [1]
+
+
+def test_unchanged_sync_is_one_query(client, queries):
+    cursor = sync_page(client)['cursor']
+    with queries:
+        page = sync_page(client, cursor)
+    assert page['orders'] == []
+    assert_query_budget(queries, 1, 'unchanged collector sync')
+
+
+def test_prune_keeps_the_newest_change_per_order(app, client):
+    notify(client, {'order_id': 2, 'status': 'collected'}, {'order_id': 4, 'status': 'assigned', 'collector': 'c2'})
+    with app.app_context():
+        db.session.execute(db.update(SyncChange).values(created_at=datetime.utcnow() - timedelta(days=60)))
+        db.session.commit()
+        # Order 2's first change is superseded, order 4's removal has expired
+        assert sync.prune_changes() == 3
+    page = sync_page(client)
+    assert [o['id'] for o in page['orders']] == [6, 8, 10, 2]
+    assert page['removed'] == []
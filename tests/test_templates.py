@@ -0,0 +1,30 @@
+import os
+import stat
+from jinja2 import FileSystemBytecodeCache
+from app.utils import templates
+from app.utils.config import Config
+
+
+def test_filesystem_cache_defaults_to_private_instance_dir(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE', 'filesystem')
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path / 'instance'))
+    cache = templates.create_bytecode_cache(app)
+    assert isinstance(cache, FileSystemBytecodeCache)
+    assert cache.directory == os.path.join(app.instance_path, 'jinja-cache')
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+
+
+def test_shared_cache_dir_is_locked_down_or_refused(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE', 'filesystem')
+    shared = tmp_path / 'shared'
+    shared.mkdir(mode=0o777)
+    os.chmod(shared, 0o777)
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE_DIR', str(shared))
+    assert templates.create_bytecode_cache(app) is not None
+    assert stat.S_IMODE(os.stat(shared).st_mode) == 0o700
+
+    # A planted symlink is never followed
+    link = tmp_path / 'link'
+    link.symlink_to(shared)
+    monkeypatch.setattr(Config, 'TEMPLATE_CACHE_DIR', str(link))
+    assert templates.create_bytecode_cache(app) is None